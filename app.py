@@ -1,18 +1,45 @@
+import importlib
 import os
 import logging
-from flask import Flask, request, redirect, session, url_for, render_template, flash, jsonify
+import uuid
+from flask import Flask, Response, request, redirect, session, url_for, render_template, stream_template, flash, jsonify
 from config.settings import config, Config
-from services.youtube_service import YouTubeService
+from services.youtube_service import YouTubeService, load_discovery_document
 from services.spotify_service import SpotifyService
-from utils.helpers import validate_youtube_url, generate_playlist_name, extract_artist_from_title
+from services.transfer_service import TransferService, TransferError
+from services.reverse_transfer_service import ReverseTransferService
+from services.job_service import JobManager, stream_events
+from services.task_queue import QueuedJobManager, create_task_queue
+from services.result_store import create_result_store, RESULT_KINDS
+from services.health_service import HealthMonitor
+from services.checkpoint_store import create_checkpoint_store, is_interrupted
+from services.profiler import create_profiler, PROFILE_HEADER
+from utils.helpers import validate_youtube_url, validate_spotify_url
+from utils.logging_setup import setup_logging
+from utils.result_io import EXPORT_FORMATS, iter_result_rows, export_csv, export_jsonl, export_columnar, load_results
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+def warm_up():
+    """
+    Load the heavy client libraries and shared read-only state up front.
+    
+    Services import these lazily on first use. With gunicorn --preload this
+    runs once in the master, so every forked worker starts with them loaded.
+    """
+    for module in ('spotipy', 'google_auth_oauthlib.flow', 'googleapiclient.discovery'):
+        importlib.import_module(module)
+    load_discovery_document()
+    logger.info("Preloaded API client libraries and discovery document")
+
+def check_youtube():
+    """Health check: the YouTube API answers a lookup made with the configured API key."""
+    if not Config.YOUTUBE_API_KEY or Config.YOUTUBE_API_KEY == 'your_youtube_api_key_here':
+        return False
+    return YouTubeService().ping()
+
 def create_app(config_name=None):
     """Application factory pattern."""
     app = Flask(__name__)
@@ -24,6 +51,7 @@ def create_app(config_name=None):
     # Validate configuration
     try:
         Config.validate_config()
+        Config.validate_tuning()
     except ValueError as e:
         logger.error(f"Configuration error: {e}")
         raise
@@ -31,11 +59,51 @@ def create_app(config_name=None):
     # Initialize services
     youtube_service = YouTubeService()
     spotify_service = SpotifyService()
+    result_store = create_result_store()
+    checkpoint_store = create_checkpoint_store()
+    transfer_service = TransferService(youtube_service, spotify_service, result_store,
+                                       checkpoint_store=checkpoint_store)
+    # Spotify to YouTube conversions write with the user's OAuth token, not the API key
+    youtube_account = YouTubeService()
+    reverse_transfer_service = ReverseTransferService(spotify_service, youtube_account, result_store)
+    jobs = JobManager()
+    
+    # With a task queue, JSON clients' conversions are spread over the queue workers
+    task_queue = create_task_queue()
+    queued_jobs = QueuedJobManager(task_queue) if task_queue else None
+    
+    # Upstream health is checked in the background; /status only reads the cache
+    health_monitor = HealthMonitor()
+    health_monitor.register_check('youtube', check_youtube)
+    health_monitor.register_check('spotify', spotify_service.ping)
+    health_monitor.register_stats('query_planner', spotify_service.query_planner.get_stats)
+    health_monitor.register_stats('channel_artists', spotify_service.channel_artists.get_stats)
+    health_monitor.register_stats('artist_catalogs', spotify_service.catalog_cache.get_stats)
+    health_monitor.register_stats('spotify_rate_limit', spotify_service.rate_limiter.get_stats)
+    health_monitor.register_stats('youtube_rate_limit', youtube_service.rate_limiter.get_stats)
+    health_monitor.register_stats('youtube_searches', youtube_service.search_cache.get_stats)
+    health_monitor.register_stats('spotify_concurrency', spotify_service.concurrency_limiter.get_stats)
+    health_monitor.register_stats('youtube_concurrency', youtube_service.concurrency_limiter.get_stats)
+    if task_queue:
+        health_monitor.register_stats('task_queue', task_queue.get_stats)
+    
+    @app.before_request
+    def start_background_threads():
+        # Started per worker on first request so it also works after a preload fork
+        if not app.config.get('TESTING'):
+            health_monitor.start()
     
     @app.route('/')
     def index():
         """Home page."""
-        return render_template('index.html')
+        interrupted = []
+        if 'spotify_user_id' in session:
+            interrupted = [
+                checkpoint for checkpoint in checkpoint_store.find_for_user(session['spotify_user_id'])
+                if is_interrupted(checkpoint_store, checkpoint)
+            ]
+        youtube_connected = youtube_account.load_credentials(session.get('spotify_user_id')) is not None
+        return render_template('index.html', interrupted=interrupted, youtube_connected=youtube_connected)
     
     @app.route('/login')
     def login():
@@ -64,8 +132,10 @@ def create_app(config_name=None):
             return redirect(url_for('index'))
         
         try:
-            if spotify_service.get_access_token(code):
-                user = spotify_service.get_current_user()
+            # A client of its own, so concurrent logins never see each other's token
+            account = spotify_service.fork()
+            if account.get_access_token(code):
+                user = account.get_current_user()
                 session['spotify_user_id'] = user['id']
                 session['spotify_user_name'] = user.get('display_name', user['id'])
                 flash(f'Successfully logged in as {session["spotify_user_name"]}!', 'success')
@@ -77,6 +147,50 @@ def create_app(config_name=None):
         
         return redirect(url_for('index'))
     
+    @app.route('/youtube/login')
+    def youtube_login():
+        """Initiate YouTube OAuth flow (needed to create YouTube playlists)."""
+        # The YouTube account is connected to the logged-in Spotify user
+        if 'spotify_user_id' not in session:
+            flash('Please login to Spotify first.', 'error')
+            return redirect(url_for('index'))
+        
+        try:
+            auth_url, state = youtube_account.get_authorization_url(url_for('youtube_callback', _external=True))
+            session['youtube_oauth_state'] = state
+            return redirect(auth_url)
+        except Exception as e:
+            logger.error(f"YouTube login error: {e}")
+            flash('Failed to initiate YouTube login. Please try again.', 'error')
+            return redirect(url_for('index'))
+    
+    @app.route('/youtube/callback')
+    def youtube_callback():
+        """Handle OAuth callback from Google."""
+        code = request.args.get('code')
+        error = request.args.get('error')
+        state = session.pop('youtube_oauth_state', None)
+        
+        if 'spotify_user_id' not in session:
+            flash('Please login to Spotify first.', 'error')
+            return redirect(url_for('index'))
+        
+        if error:
+            logger.warning(f"YouTube OAuth error: {error}")
+            flash('YouTube authorization denied. Please try again.', 'error')
+            return redirect(url_for('index'))
+        
+        if not code or not state or request.args.get('state') != state:
+            flash('Invalid YouTube authorization response.', 'error')
+            return redirect(url_for('index'))
+        
+        if youtube_account.fork().fetch_token(url_for('youtube_callback', _external=True), code,
+                                              session['spotify_user_id'], state=state):
+            flash('YouTube account connected!', 'success')
+        else:
+            flash('Failed to connect your YouTube account.', 'error')
+        return redirect(url_for('index'))
+    
     @app.route('/logout')
     def logout():
         """Logout user."""
@@ -86,187 +200,353 @@ def create_app(config_name=None):
     
     @app.route('/transfer', methods=['POST'])
     def transfer():
-        """Transfer YouTube playlist to Spotify."""
+        """
+        Transfer YouTube playlist to Spotify.
+        
+        Clients that accept JSON get a background job and follow its progress
+        over /transfer/<job_id>/events; plain form posts block and render the
+        result page as before.
+        """
         logger.info("=== TRANSFER REQUEST STARTED ===")
+        wants_job = request.accept_mimetypes.best == 'application/json'
+        
+        def reject(message, category='error', endpoint='index', status_code=400):
+            if wants_job:
+                return jsonify({'error': message, 'category': category,
+                                'redirect': url_for(endpoint)}), status_code
+            flash(message, category)
+            return redirect(url_for(endpoint))
         
         # Check if user is authenticated
-        logger.info(f"Session contents: {dict(session)}")
         if 'spotify_user_id' not in session:
             logger.warning("User not authenticated - redirecting to login")
-            flash('Please login to Spotify first.', 'error')
-            return redirect(url_for('index'))
+            return reject('Please login to Spotify first.', status_code=401)
         
-        logger.info(f"User authenticated: {session.get('spotify_user_name')}")
+        logger.info("User authenticated: %s", session.get('spotify_user_name'))
         
         playlist_url = request.form.get('playlist_url', '').strip()
         custom_name = request.form.get('playlist_name', '').strip()
+        update_existing = request.form.get('update_existing') == 'on'
         
-        logger.info(f"Playlist URL: {playlist_url}")
-        logger.info(f"Custom name: {custom_name}")
+        logger.info("Playlist URL: %s", playlist_url)
+        logger.info("Custom name: %s", custom_name)
         
         # Validate input
         if not playlist_url:
             logger.warning("No playlist URL provided")
-            flash('Please provide a YouTube playlist URL.', 'error')
-            return redirect(url_for('index'))
+            return reject('Please provide a YouTube playlist URL.')
         
         if not validate_youtube_url(playlist_url):
-            logger.warning(f"Invalid YouTube URL: {playlist_url}")
-            flash('Invalid YouTube playlist URL.', 'error')
-            return redirect(url_for('index'))
+            logger.warning("Invalid YouTube URL: %s", playlist_url)
+            return reject('Invalid YouTube playlist URL.')
         
         logger.info("URL validation passed")
         
-        try:
-            # Extract playlist ID
-            playlist_id = youtube_service.extract_playlist_id(playlist_url)
-            logger.info(f"Extracted playlist ID: {playlist_id}")
-            
-            # Authenticate YouTube with API key (simpler for read-only access)
-            if not youtube_service.authenticate():
-                logger.error("YouTube authentication failed")
-                flash('Failed to authenticate with YouTube. Please check your API configuration.', 'error')
-                return redirect(url_for('index'))
-            
-            logger.info("YouTube authentication successful")
-            
-            # Get playlist info
-            playlist_info = youtube_service.get_playlist_info(playlist_id)
-            logger.info(f"Processing playlist: {playlist_info['title']} ({playlist_info['item_count']} items)")
-            
-            # Get videos
-            videos = youtube_service.get_playlist_videos(playlist_id)
-            logger.info(f"Retrieved {len(videos)} videos")
-            
-            if not videos:
-                logger.warning("No videos found in playlist")
-                flash('No videos found in the playlist.', 'warning')
-                return redirect(url_for('index'))
-            
-            # Re-authenticate Spotify service using cached token
-            auth_manager = spotify_service.get_auth_manager()
-            token_info = auth_manager.cache_handler.get_cached_token()
-            
-            if token_info:
-                logger.info("Using cached Spotify token")
-                # Check if token needs refresh and refresh if necessary
-                if auth_manager.is_token_expired(token_info):
-                    logger.info("Token expired, refreshing...")
-                    token_info = auth_manager.refresh_access_token(token_info['refresh_token'])
-                
-                import spotipy
-                spotify_service.sp = spotipy.Spotify(auth_manager=auth_manager)
-            else:
-                logger.error("No cached Spotify token found")
-                flash('Spotify session expired. Please login again.', 'error')
-                return redirect(url_for('login'))
-            
-            # Create Spotify playlist
-            playlist_name = custom_name or generate_playlist_name(playlist_info['title'])
-            logger.info(f"Creating Spotify playlist: {playlist_name}")
-            
-            spotify_playlist = spotify_service.create_playlist(
-                session['spotify_user_id'],
-                playlist_name,
-                description=f"Converted from YouTube playlist: {playlist_info['title']}"
-            )
-            logger.info(f"Created Spotify playlist: {spotify_playlist['id']}")
-            
-            # Search for tracks and collect results
-            found_tracks = []
-            successful_matches = []
-            failed_matches = []
-            
-            logger.info("Starting track search...")
-            for i, video in enumerate(videos):
-                video_title = video['snippet']['title']
-                channel_title = video['snippet']['channelTitle']
-                
-                logger.debug(f"Processing {i+1}/{len(videos)}: {video_title}")
-                
-                # Try to extract artist from title
-                clean_title, artist = extract_artist_from_title(video_title)
-                
-                # Create track data object
-                track_data = {
-                    'title': video_title,
-                    'artist': artist or channel_title
-                }
-                
-                # Search on Spotify
-                track_id = spotify_service.search_track(
-                    clean_title, 
-                    artist or channel_title
-                )
-                
-                if track_id:
-                    found_tracks.append(track_id)
-                    successful_matches.append(track_data)
-                    logger.debug(f"Found: {video_title}")
-                else:
-                    track_data['reason'] = 'Not found on Spotify'
-                    failed_matches.append(track_data)
-                    logger.debug(f"Not found: {video_title}")
-            
-            logger.info(f"Track search complete: {len(found_tracks)} found, {len(failed_matches)} failed")
-            
-            # Add tracks to playlist
-            if found_tracks:
-                logger.info("Adding tracks to Spotify playlist...")
-                success = spotify_service.add_tracks_to_playlist(
-                    spotify_playlist['id'], 
-                    found_tracks
-                )
-                
-                if success:
-                    logger.info("Playlist creation successful!")
-                    
-                    # Calculate success rate
-                    total_videos = len(videos)
-                    success_rate = (len(found_tracks) / total_videos) * 100 if total_videos > 0 else 0
-                    
-                    # Pass variables directly to template (not in a results dict)
-                    return render_template('result.html',
-                                         playlist_name=playlist_name,
-                                         spotify_playlist_url=spotify_playlist['url'],
-                                         successful_matches=successful_matches,
-                                         failed_matches=failed_matches,
-                                         success_rate=success_rate)
-                else:
-                    logger.error("Failed to add tracks to playlist")
-                    flash('Failed to add tracks to Spotify playlist.', 'error')
-            else:
-                logger.warning("No tracks found on Spotify")
-                flash('No tracks could be found on Spotify.', 'warning')
-                
-        except Exception as e:
-            logger.error(f"Transfer error: {e}")
-            import traceback
-            traceback.print_exc()
-            flash(f'An error occurred during conversion: {str(e)}', 'error')
+        unavailable = unavailable_upstream('youtube', 'spotify')
+        if unavailable:
+            return reject(f'{unavailable} is not responding right now. Please try again in a few minutes.',
+                          category='warning', status_code=503)
         
+        if wants_job and queued_jobs:
+            job = queued_jobs.create(session['spotify_user_id'])
+            queued_jobs.submit(job, 'transfer', playlist_url=playlist_url, user_id=session['spotify_user_id'],
+                               custom_name=custom_name, update_existing=update_existing)
+            return job_accepted(job)
+        
+        response = dispatch_job(wants_job, transfer_service.fork().run, playlist_url,
+                                session['spotify_user_id'], custom_name, update_existing)
         logger.info("=== TRANSFER REQUEST ENDED ===")
+        return response
+    
+    @app.route('/transfer/reverse', methods=['POST'])
+    def reverse_transfer():
+        """Transfer Spotify playlist to YouTube."""
+        wants_job = request.accept_mimetypes.best == 'application/json'
+        
+        def reject(message, category='error', endpoint='index', status_code=400):
+            if wants_job:
+                return jsonify({'error': message, 'category': category,
+                                'redirect': url_for(endpoint)}), status_code
+            flash(message, category)
+            return redirect(url_for(endpoint))
+        
+        if 'spotify_user_id' not in session:
+            return reject('Please login to Spotify first.', status_code=401)
+        
+        if youtube_account.load_credentials(session['spotify_user_id']) is None:
+            return reject('Please connect your YouTube account first.', endpoint='youtube_login', status_code=401)
+        
+        playlist_url = request.form.get('playlist_url', '').strip()
+        custom_name = request.form.get('playlist_name', '').strip()
+        
+        if not validate_spotify_url(playlist_url):
+            logger.warning("Invalid Spotify URL: %s", playlist_url)
+            return reject('Invalid Spotify playlist URL.')
+        
+        unavailable = unavailable_upstream('spotify', 'youtube')
+        if unavailable:
+            return reject(f'{unavailable} is not responding right now. Please try again in a few minutes.',
+                          category='warning', status_code=503)
+        
+        logger.info("Reverse transfer of %s", playlist_url)
+        # Not queued: YouTube's daily quota allows about 100 searches, which one thread gets through
+        # quickly, so spreading a reverse job over workers would not make it finish any sooner
+        return dispatch_job(wants_job, reverse_transfer_service.fork().run, playlist_url,
+                            session['spotify_user_id'], custom_name)
+    
+    @app.route('/import', methods=['POST'])
+    def import_results():
+        """Re-create a conversion in a new playlist from an exported results file."""
+        wants_job = request.accept_mimetypes.best == 'application/json'
+        
+        def reject(message, category='error', status_code=400):
+            if wants_job:
+                return jsonify({'error': message, 'category': category,
+                                'redirect': url_for('index')}), status_code
+            flash(message, category)
+            return redirect(url_for('index'))
+        
+        if 'spotify_user_id' not in session:
+            return reject('Please login to Spotify first.', status_code=401)
+        
+        upload = request.files.get('results_file')
+        if not upload or not upload.filename:
+            return reject('Please choose an exported results file.')
+        
+        try:
+            rows = load_results(upload.read())
+        except ValueError as e:
+            logger.warning(f"Rejected results import: {e}")
+            return reject('That file is not a results export from this site.')
+        
+        if unavailable_upstream('spotify'):
+            return reject('Spotify is not responding right now. Please try again in a few minutes.',
+                          category='warning', status_code=503)
+        
+        playlist_name = request.form.get('playlist_name', '').strip() or Config.DEFAULT_PLAYLIST_NAME
+        logger.info("Importing %s result rows into '%s'", len(rows), playlist_name)
+        
+        return dispatch_job(wants_job, transfer_service.fork().apply_mapping, rows,
+                            session['spotify_user_id'], playlist_name)
+    
+    @app.route('/transfer/<job_id>/resume', methods=['POST'])
+    def resume_transfer(job_id):
+        """Continue an interrupted conversion from its last checkpoint."""
+        wants_job = request.accept_mimetypes.best == 'application/json'
+        
+        if 'spotify_user_id' not in session:
+            if wants_job:
+                return jsonify({'error': 'Please login to Spotify first.', 'category': 'error',
+                                'redirect': url_for('index')}), 401
+            flash('Please login to Spotify first.', 'error')
+            return redirect(url_for('index'))
+        
+        checkpoint = checkpoint_store.get(job_id)
+        resumable = (checkpoint and checkpoint['user_id'] == session['spotify_user_id']
+                     and is_interrupted(checkpoint_store, checkpoint))
+        if not resumable:
+            if wants_job:
+                return jsonify({'error': 'Conversion not found or still running'}), 404
+            flash('That conversion cannot be resumed.', 'warning')
+            return redirect(url_for('index'))
+        
+        unavailable = unavailable_upstream('youtube', 'spotify')
+        if unavailable:
+            message = f'{unavailable} is not responding right now. Please try again in a few minutes.'
+            if wants_job:
+                return jsonify({'error': message, 'category': 'warning', 'redirect': url_for('index')}), 503
+            flash(message, 'warning')
+            return redirect(url_for('index'))
+        
+        # Claimed here, atomically, so two resume requests cannot both start a run
+        owner = uuid.uuid4().hex
+        if not checkpoint_store.claim(job_id, owner):
+            if wants_job:
+                return jsonify({'error': 'Conversion not found or still running'}), 404
+            flash('That conversion cannot be resumed.', 'warning')
+            return redirect(url_for('index'))
+        
+        return dispatch_job(wants_job, transfer_service.fork().resume, job_id, session['spotify_user_id'], owner)
+    
+    def unavailable_upstream(*names):
+        """Display name of the first upstream whose health circuit is open, or None."""
+        for name in names:
+            if health_monitor.circuit_open(name):
+                return 'YouTube' if name == 'youtube' else 'Spotify'
+        return None
+    
+    def dispatch_job(wants_job, target, *args):
+        """
+        Run a conversion job for the logged-in user.
+        
+        target must be a method of a fork() of a conversion service, so the
+        job's API clients are its own. JSON clients get the job started in the background and a 202 with
+        its event and result URLs; form posts block and get the result page.
+        """
+        job = jobs.create(session['spotify_user_id'])
+        job.profiler = create_profiler(requested=request.headers.get(PROFILE_HEADER) == '1')
+        
+        if wants_job:
+            jobs.start(job, target, *args, job_id=job.id)
+            logger.info("Started job %s", job.id)
+            return job_accepted(job)
+        
+        jobs.run(job, target, *args, job_id=job.id)
+        return render_job_result(job)
+    
+    def job_accepted(job):
+        """202 response pointing a JSON client at a job's event and result URLs."""
+        response = {
+            'job_id': job.id,
+            'events_url': url_for('transfer_events', job_id=job.id),
+            'result_url': url_for('transfer_result', job_id=job.id)
+        }
+        if getattr(job, 'profiler', None):
+            response['profile_url'] = url_for('transfer_profile', job_id=job.id)
+        return jsonify(response), 202
+    
+    def get_user_job(job_id):
+        """Get a job owned by the logged-in user, or None."""
+        job = jobs.get(job_id)
+        if not job and queued_jobs:
+            job = queued_jobs.get(job_id)
+        if not job or job.user_id != session.get('spotify_user_id'):
+            return None
+        return job
+    
+    @app.route('/transfer/<job_id>/events')
+    def transfer_events(job_id):
+        """Server-Sent Events stream of conversion progress."""
+        job = get_user_job(job_id)
+        if not job:
+            return jsonify({'error': 'Unknown conversion job'}), 404
+        
+        try:
+            last_id = int(request.headers.get('Last-Event-ID', 0))
+        except ValueError:
+            last_id = 0
+        
+        return Response(
+            stream_events(job.events, last_id, heartbeat=Config.SSE_HEARTBEAT_SECONDS),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    def render_job_result(job):
+        """Render a finished job, or flash its error and redirect."""
+        if job.status == 'complete':
+            return render_summary(job.result)
+        
+        if job.status == 'failed':
+            if isinstance(job.error, TransferError):
+                flash(str(job.error), job.error.category)
+                return redirect(url_for(job.error.endpoint))
+            logger.error("Transfer error: %s", job.error)
+            flash(f'An error occurred during conversion: {str(job.error)}', 'error')
+            return redirect(url_for('index'))
+        
+        flash('Your conversion is still running.', 'info')
+        return redirect(url_for('index'))
+    
+    def render_summary(summary):
+        """Stream the result page for a stored conversion summary."""
+        # Only the first page of rows is rendered; the rest is paged in over the results API
+        failed_page = result_store.get_page(summary['job_id'], 'failed', 1, Config.RESULTS_PAGE_SIZE)
+        return stream_template('result.html', failed_page=failed_page['items'], **summary)
+    
+    def get_user_summary(job_id):
+        """Get the stored summary of a conversion owned by the logged-in user, or None."""
+        summary = result_store.get_summary(job_id)
+        if not summary or summary.get('user_id') != session.get('spotify_user_id'):
+            return None
+        return summary
+    
+    @app.route('/transfer/<job_id>/profile')
+    def transfer_profile(job_id):
+        """Download the profile captured for a profiled conversion job."""
+        job = get_user_job(job_id)
+        profile = getattr(job, 'profile', None)
+        if not profile:
+            return jsonify({'error': 'No profile for this conversion job'}), 404
+        
+        return Response(
+            profile['data'],
+            mimetype=profile['content_type'],
+            headers={'Content-Disposition': f"attachment; filename=profile-{job_id[:8]}.{profile['extension']}"}
+        )
+    
+    @app.route('/transfer/<job_id>/result')
+    def transfer_result(job_id):
+        """Render the result page of a conversion job."""
+        job = get_user_job(job_id)
+        if job:
+            return render_job_result(job)
+        
+        # Jobs are pruned before their stored results expire
+        summary = get_user_summary(job_id)
+        if summary:
+            return render_summary(summary)
+        
+        flash('Conversion not found or expired.', 'error')
         return redirect(url_for('index'))
     
+    @app.route('/transfer/<job_id>/results')
+    def transfer_results(job_id):
+        """Paginated JSON API over the stored per-track results of a job."""
+        if not get_user_summary(job_id):
+            return jsonify({'error': 'Unknown conversion job'}), 404
+        
+        kind = request.args.get('kind', 'failed')
+        if kind not in RESULT_KINDS:
+            return jsonify({'error': f"kind must be one of: {', '.join(RESULT_KINDS)}"}), 400
+        
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', Config.RESULTS_PAGE_SIZE, type=int), 1), 200)
+        
+        result = result_store.get_page(job_id, kind, page, per_page)
+        result['kind'] = kind
+        return jsonify(result)
+    
+    @app.route('/transfer/<job_id>/export')
+    def transfer_export(job_id):
+        """Download every video to track decision of a conversion."""
+        if not get_user_summary(job_id):
+            flash('Conversion not found or expired.', 'error')
+            return redirect(url_for('index'))
+        
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        rows = iter_result_rows(result_store, job_id)
+        if export_format == 'csv':
+            body = export_csv(rows)
+        elif export_format == 'jsonl':
+            body = export_jsonl(rows)
+        else:
+            body = export_columnar(rows)
+        
+        return Response(
+            body,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=conversion-{job_id[:8]}.{extension}'}
+        )
+    
     @app.route('/status')
     def status():
-        """API endpoint for application status."""
-        # Check YouTube API availability
-        youtube_available = False
-        try:
-            if Config.YOUTUBE_API_KEY and Config.YOUTUBE_API_KEY != 'your_youtube_api_key_here':
-                # Test authentication
-                test_yt = YouTubeService()
-                youtube_available = test_yt.authenticate()
-        except:
-            youtube_available = False
-            
+        """API endpoint for application status, served from cached health checks."""
+        health = health_monitor.report()
+        
         return jsonify({
             'status': 'healthy',
             'services': {
-                'youtube': youtube_available,
-                'spotify': spotify_service.sp is not None
+                'youtube': health_monitor.is_healthy('youtube'),
+                'spotify': health_monitor.is_healthy('spotify')
             },
+            'upstreams': health['upstreams'],
+            'caches': health['caches'],
+            'stats': health['stats'],
             'user_authenticated': 'spotify_user_id' in session
         })
     
@@ -276,6 +556,14 @@ def create_app(config_name=None):
                              error_code=404, 
                              error_message="Page not found"), 404
     
+    @app.errorhandler(413)
+    def request_too_large(error):
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify({'error': 'The uploaded file is too large.', 'category': 'error',
+                            'redirect': url_for('index')}), 413
+        flash('The uploaded file is too large.', 'error')
+        return redirect(url_for('index'))
+    
     @app.errorhandler(500)
     def internal_error(error):
         logger.error(f"Internal server error: {error}")
@@ -0,0 +1,95 @@
+"""
+Match confidence scoring benchmark.
+
+Scores K Spotify candidates for each of N synthetic YouTube titles, once
+with calculate_match_confidence() pair by pair and once with the batch
+scorer, checks that every score is identical, and reports both timings.
+Run from the repository root:
+
+    python benchmarks/scoring_benchmark.py --videos 2000 --candidates 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.helpers import calculate_match_confidence
+from utils.match_scoring import batch_match_confidence
+
+WORDS = ['love', 'night', 'fire', 'heart', 'dance', 'rain', 'gold', 'summer', 'dream', 'light',
+         'wild', 'home', 'blue', 'river', 'city', 'ghost', 'stars', 'run', 'echo', 'paper']
+DECORATIONS = ['', ' (Official Video)', ' (Official Music Video)', ' [HD]', ' (Lyrics)', ' | Live 2019']
+
+def make_workload(videos, candidates, seed):
+    """Build N YouTube titles and K (title, artist) candidates for each."""
+    rng = random.Random(seed)
+    youtube_titles = []
+    candidate_rows = []
+    for _ in range(videos):
+        artist = f"Artist {rng.randint(1, 200)}"
+        song = ' '.join(rng.sample(WORDS, rng.randint(1, 4)))
+        youtube_titles.append(f"{artist} - {song.title()}{rng.choice(DECORATIONS)}")
+
+        row = [(song.title(), artist)]
+        while len(row) < candidates:
+            other = ' '.join(rng.sample(WORDS, rng.randint(1, 4)))
+            row.append((other.title(), rng.choice([artist, f"Artist {rng.randint(1, 200)}"])))
+        rng.shuffle(row)
+        candidate_rows.append(row)
+    return youtube_titles, candidate_rows
+
+def score_scalar(youtube_titles, candidate_rows):
+    """Score every pair with calculate_match_confidence()."""
+    return [
+        [calculate_match_confidence(youtube_title, title, artist) for title, artist in row]
+        for youtube_title, row in zip(youtube_titles, candidate_rows)
+    ]
+
+def time_runs(function, args, runs):
+    """Median wall time of function(*args) in milliseconds, and its last result."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--videos', type=int, default=2000, help='number of YouTube titles (N)')
+    parser.add_argument('--candidates', type=int, default=10, help='Spotify candidates per title (K)')
+    parser.add_argument('--runs', type=int, default=5, help='timed runs per scorer')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', action='store_true', help='print machine-readable output')
+    args = parser.parse_args()
+
+    workload = make_workload(args.videos, args.candidates, args.seed)
+    scalar_ms, expected = time_runs(score_scalar, workload, args.runs)
+    batch_ms, actual = time_runs(batch_match_confidence, workload, args.runs)
+
+    if actual != expected:
+        raise SystemExit("Batch scores differ from calculate_match_confidence()")
+
+    report = {
+        'pairs': args.videos * args.candidates,
+        'scalar_ms': round(scalar_ms, 1),
+        'batch_ms': round(batch_ms, 1),
+        'speedup': round(scalar_ms / batch_ms, 1)
+    }
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"Scored {report['pairs']} pairs ({args.videos} titles x {args.candidates} candidates), "
+          f"median of {args.runs} runs; scores identical")
+    print(f"  scalar {report['scalar_ms']:>9} ms")
+    print(f"  batch  {report['batch_ms']:>9} ms  ({report['speedup']}x)")
+
+if __name__ == '__main__':
+    main()
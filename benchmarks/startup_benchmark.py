@@ -0,0 +1,78 @@
+"""
+Cold-start benchmark for the web app.
+
+Each run starts a fresh interpreter and measures how long it takes to import
+``app`` (which runs create_app()), and then how long the first lazily loaded
+client build costs. Run from the repository root:
+
+    python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.warm_up()
+warmed = time.perf_counter()
+print(json.dumps({
+    'import_app_ms': (imported - started) * 1000,
+    'warm_up_ms': (warmed - imported) * 1000,
+    'total_ms': (warmed - started) * 1000,
+}))
+"""
+
+def run_once():
+    """Measure one cold start in a fresh interpreter."""
+    env = dict(os.environ)
+    env.setdefault('SPOTIPY_CLIENT_ID', 'benchmark')
+    env.setdefault('SPOTIPY_CLIENT_SECRET', 'benchmark')
+    env['PYTHONPATH'] = ROOT
+    
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(samples):
+    """Median, p95 and min of a list of timings."""
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        'median': round(statistics.median(ordered), 1),
+        'p95': round(ordered[p95_index], 1),
+        'min': round(ordered[0], 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='number of cold starts to measure')
+    parser.add_argument('--json', action='store_true', help='print machine-readable output')
+    args = parser.parse_args()
+    
+    runs = [run_once() for _ in range(args.runs)]
+    report = {key: summarize([run[key] for run in runs]) for key in runs[0]}
+    
+    if args.json:
+        print(json.dumps(report))
+        return
+    
+    print(f"Cold start over {args.runs} runs (ms)")
+    for key, stats in report.items():
+        print(f"  {key:<14} median {stats['median']:>7}  p95 {stats['p95']:>7}  min {stats['min']:>7}")
+
+if __name__ == '__main__':
+    main()
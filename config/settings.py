@@ -5,6 +5,95 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# Presets for the pipeline tuning knobs in Config, one per deployment environment;
+# a preset only lists the knobs it changes from the defaults
+TUNING_PRESETS = {
+    'production': {},
+    'development': {
+        'SPOTIFY_CONCURRENCY': 2,
+        'YOUTUBE_CONCURRENCY': 2,
+        'CONCURRENCY_MAX': 8,
+        'WORKER_THREADS': 2,
+        'PLAYLIST_CACHE_SECONDS': 60,
+        'RESULT_TTL_SECONDS': 3600
+    },
+    'testing': {
+        'WORKER_THREADS': 1,
+        'NETWORK_RETRIES': 1,
+        'RATE_LIMIT_RETRIES': 1,
+        'HTTP_TIMEOUT': 5,
+        'FALLBACK_HTTP_TIMEOUT': 5,
+        'PLAYLIST_CACHE_SECONDS': 0
+    }
+}
+TUNING_PRESETS['default'] = TUNING_PRESETS['development']
+# An explicit TUNING_PROFILE picks the preset; otherwise FLASK_ENV does, and an unset FLASK_ENV
+# means production, as it does for Config.ENV. Either must name a preset (see validate_tuning)
+TUNING_PROFILE_SOURCE = 'TUNING_PROFILE' if os.getenv('TUNING_PROFILE') else 'FLASK_ENV'
+TUNING_PROFILE = os.getenv(TUNING_PROFILE_SOURCE, 'production')
+
+# Knobs whose environment value could not be parsed, reported by Config.validate_tuning
+TUNING_ERRORS = []
+
+# Allowed range of each tuning knob (None = unbounded); the API limits are hard caps
+TUNING_BOUNDS = {
+    'SPOTIFY_CONCURRENCY': (1, None),
+    'YOUTUBE_CONCURRENCY': (1, None),
+    'CONCURRENCY_MAX': (1, None),
+    'WORKER_THREADS': (1, None),
+    'PAGE_FETCH_WORKERS': (1, None),
+    'FAIR_SHARE_QUANTUM': (1, None),
+    'USER_MAX_RUNNING_TASKS': (1, None),
+    'TASK_LEASE_SECONDS': (10, None),
+    'TASK_MAX_ATTEMPTS': (1, None),
+    'MAX_TRACKS_PER_REQUEST': (1, 100),
+    'YOUTUBE_PAGE_SIZE': (1, 50),
+    'SPOTIFY_SEARCH_LIMIT': (1, 50),
+    'MAX_SEARCHES_PER_VIDEO': (1, None),
+    'YOUTUBE_SEARCH_RESULTS': (1, 50),
+    'SEARCH_CHUNK_SIZE': (1, None),
+    'RESULT_FLUSH_SIZE': (1, None),
+    'RESULTS_PAGE_SIZE': (1, None),
+    'HTTP_TIMEOUT': (1, None),
+    'FALLBACK_HTTP_TIMEOUT': (1, None),
+    'SPOTIFY_TIMEOUT': (1, None),
+    'NETWORK_RETRIES': (1, None),
+    'RETRY_BACKOFF_BASE': (1, None),
+    'RATE_LIMIT_RETRIES': (1, None),
+    'MAX_RETRY_AFTER_SECONDS': (0, None),
+    'PLAYLIST_CACHE_SECONDS': (0, None),
+    'SNAPSHOT_CACHE_SIZE': (1, None),
+    'RESULT_TTL_SECONDS': (1, None),
+    'JOB_RETENTION_SECONDS': (1, None),
+    'CHECKPOINT_STALE_SECONDS': (1, None),
+    'CHANNEL_ARTIST_REFRESH_SECONDS': (1, None),
+    'ARTIST_CATALOG_CACHE_SIZE': (1, None),
+    'ARTIST_CATALOG_TTL_SECONDS': (1, None),
+    'ARTIST_CATALOG_MAX_ALBUMS': (1, None),
+    'SPOTIFY_RATE_LIMIT': (0.1, None),
+    'YOUTUBE_RATE_LIMIT': (0.1, None),
+    'RATE_LIMIT_BURST': (0, None),
+    'SSE_MAX_EVENTS': (1, None),
+    'HEALTH_CHECK_INTERVAL': (1, None),
+    'HEALTH_CHECK_TTL': (1, None),
+    'HEALTH_CHECK_TIMEOUT': (1, None),
+    'YOUTUBE_SEARCH_CACHE_SIZE': (1, None),
+    'YOUTUBE_SEARCH_TTL_SECONDS': (1, None)
+}
+
+def _tuned(name, default):
+    """Read a tuning knob: the environment, then the TUNING_PROFILE preset, then the default."""
+    preset = TUNING_PRESETS.get(TUNING_PROFILE, {}).get(name, default)
+    value = os.getenv(name)
+    if value is None:
+        return preset
+    try:
+        return type(default)(value)
+    except ValueError:
+        # Keep importing with the preset so validate_tuning can report every bad knob at once
+        TUNING_ERRORS.append(f"{name}='{value}' is not a valid {type(default).__name__}")
+        return preset
+
 class Config:
     """Application configuration class."""
     
@@ -17,21 +106,139 @@ class Config:
     SPOTIPY_CLIENT_ID = os.getenv('SPOTIPY_CLIENT_ID')
     SPOTIPY_CLIENT_SECRET = os.getenv('SPOTIPY_CLIENT_SECRET')
     SPOTIPY_REDIRECT_URI = os.getenv('SPOTIPY_REDIRECT_URI', 'http://localhost:5000/callback')
-    SPOTIFY_SCOPE = 'playlist-modify-public playlist-modify-private'
+    SPOTIFY_SCOPE = 'playlist-modify-public playlist-modify-private playlist-read-private playlist-read-collaborative'
     
     # Google OAuth Configuration
     GOOGLE_CLIENT_SECRETS_FILE = os.getenv('GOOGLE_CLIENT_SECRETS_FILE', 'config/client_secret.json')
-    YOUTUBE_SCOPES = ['https://www.googleapis.com/auth/youtube.readonly']
+    YOUTUBE_SCOPES = ['https://www.googleapis.com/auth/youtube']  # Spotify to YouTube conversions create playlists
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
     
     # Application Settings
     APP_NAME = os.getenv('APP_NAME', 'YouTube to Spotify Converter')
     DEFAULT_PLAYLIST_NAME = os.getenv('DEFAULT_PLAYLIST_NAME', 'Converted from YouTube')
-    MAX_TRACKS_PER_REQUEST = 100  # Spotify API limit
     
     # SSL Configuration for network issues
     SSL_VERIFY = os.getenv('SSL_VERIFY', 'true').lower() == 'true'
-    HTTP_TIMEOUT = int(os.getenv('HTTP_TIMEOUT', '30'))
+    
+    # Largest request body accepted (enforced by Flask with a 413), which bounds results imports
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', str(16 * 1024 * 1024)))
+    
+    # Background conversion jobs and progress streaming
+    SSE_MAX_EVENTS = _tuned('SSE_MAX_EVENTS', 500)
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+    
+    # Conversion results (stored in Redis when REDIS_URL is set, memory otherwise)
+    REDIS_URL = os.getenv('REDIS_URL')
+    
+    # Distributed conversions: with TASK_QUEUE on (and REDIS_URL set), JSON
+    # clients' conversions run as queued tasks on the `worker` process type
+    TASK_QUEUE = os.getenv('TASK_QUEUE', 'false').lower() == 'true'
+    
+    # Logging: text (the default) or json. JSON mode adds job/user/stage fields,
+    # writes from a background thread and keeps 1 in LOG_ITEM_SAMPLE_EVERY per-item records
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_ITEM_SAMPLE_EVERY = int(os.getenv('LOG_ITEM_SAMPLE_EVERY', '100'))
+    
+    # Opt-in profiling of conversion stages: a fraction of in-process jobs (and,
+    # if allowed, requests sending X-Profile: 1) get a profile attached
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))  # 0.01 = 1% of jobs
+    PROFILE_ALLOW_HEADER = os.getenv('PROFILE_ALLOW_HEADER', 'False').lower() == 'true'
+    PROFILE_FORMAT = os.getenv('PROFILE_FORMAT', 'collapsed')  # collapsed (sampled stacks) or pstats (cProfile)
+    PROFILE_INTERVAL_MS = int(os.getenv('PROFILE_INTERVAL_MS', '10'))
+    
+    # Cluster-wide API rate limits in requests per second, shared through
+    # Redis when REDIS_URL is set; 429s lower them until calls succeed again
+    SPOTIFY_RATE_LIMIT = _tuned('SPOTIFY_RATE_LIMIT', 10.0)
+    YOUTUBE_RATE_LIMIT = _tuned('YOUTUBE_RATE_LIMIT', 10.0)
+    RATE_LIMIT_BURST = _tuned('RATE_LIMIT_BURST', 0)  # 0 = one second's worth
+    
+    # Upload each matched Spotify track only once, even if the playlist repeats it
+    DROP_DUPLICATE_TRACKS = os.getenv('DROP_DUPLICATE_TRACKS', 'true').lower() == 'true'
+    # Conversions that update an existing playlist add only its missing tracks; this
+    # inserts them at their place in the YouTube order (one call per gap) instead of appending
+    UPDATE_PRESERVE_POSITIONS = os.getenv('UPDATE_PRESERVE_POSITIONS', 'false').lower() == 'true'
+    # Playlists dominated by a few artists are matched against those artists' catalogues,
+    # fetched once through the album endpoints, before any track is searched
+    CATALOG_MATCHING = os.getenv('CATALOG_MATCHING', 'true').lower() == 'true'
+    
+    # A Spotify search result below this match confidence does not end the search
+    # for a video; the next planned query is tried, and it counts as a planner miss
+    SPOTIFY_MIN_CONFIDENCE = float(os.getenv('SPOTIFY_MIN_CONFIDENCE', '0.3'))
+    
+    # Spotify to YouTube conversions: a search result needs this match confidence to be used
+    YOUTUBE_MIN_CONFIDENCE = float(os.getenv('YOUTUBE_MIN_CONFIDENCE', '0.3'))
+    YOUTUBE_PLAYLIST_PRIVACY = os.getenv('YOUTUBE_PLAYLIST_PRIVACY', 'private')
+    
+    # Channel ID -> Spotify artist table learned from confirmed matches (a Redis hash
+    # when REDIS_URL is set, this file otherwise)
+    CHANNEL_ARTIST_FILE = os.getenv('CHANNEL_ARTIST_FILE', 'channel_artists.json')
+    
+    # Record/replay of Spotify and YouTube HTTP traffic for offline load tests:
+    # 'record' writes anonymized exchanges and their timings to CASSETTE_DIR,
+    # 'replay' answers from them with no network, CASSETTE_SPEED times faster than recorded
+    CASSETTE_MODE = os.getenv('CASSETTE_MODE', 'off')
+    CASSETTE_DIR = os.getenv('CASSETTE_DIR', 'cassettes')
+    CASSETTE_SPEED = float(os.getenv('CASSETTE_SPEED', '1.0'))  # 0 = no delay
+    
+    # Pipeline tuning. Each knob comes from the environment if set there, otherwise
+    # from the TUNING_PROFILE preset, otherwise from the default below.
+    TUNING_PROFILE = TUNING_PROFILE
+    
+    # Concurrency: requests in flight per upstream and process start at the *_CONCURRENCY
+    # limits, grow while latency holds and are cut on 429s, 5xx and latency spikes
+    SPOTIFY_CONCURRENCY = _tuned('SPOTIFY_CONCURRENCY', 4)
+    YOUTUBE_CONCURRENCY = _tuned('YOUTUBE_CONCURRENCY', 4)
+    CONCURRENCY_MAX = _tuned('CONCURRENCY_MAX', 32)
+    WORKER_THREADS = _tuned('WORKER_THREADS', 4)  # Task loops per queue worker process
+    PAGE_FETCH_WORKERS = _tuned('PAGE_FETCH_WORKERS', 4)  # Spotify pages fetched at once
+    # Queued tasks are shared fairly: users take turns, each turn worth FAIR_SHARE_QUANTUM
+    # videos of searching, with at most USER_MAX_RUNNING_TASKS tasks in flight per user
+    FAIR_SHARE_QUANTUM = _tuned('FAIR_SHARE_QUANTUM', 25)
+    USER_MAX_RUNNING_TASKS = _tuned('USER_MAX_RUNNING_TASKS', 8)
+    # A dequeued task is redelivered if its worker stops renewing it for TASK_LEASE_SECONDS,
+    # and its job fails after TASK_MAX_ATTEMPTS deliveries
+    TASK_LEASE_SECONDS = _tuned('TASK_LEASE_SECONDS', 120)
+    TASK_MAX_ATTEMPTS = _tuned('TASK_MAX_ATTEMPTS', 3)
+    
+    # Batch sizes
+    MAX_TRACKS_PER_REQUEST = _tuned('MAX_TRACKS_PER_REQUEST', 100)  # Spotify API limit
+    YOUTUBE_PAGE_SIZE = _tuned('YOUTUBE_PAGE_SIZE', 50)  # YouTube API limit
+    SPOTIFY_SEARCH_LIMIT = _tuned('SPOTIFY_SEARCH_LIMIT', 1)  # Only the top result is used
+    MAX_SEARCHES_PER_VIDEO = _tuned('MAX_SEARCHES_PER_VIDEO', 3)  # Best-ranked planned queries tried per video
+    YOUTUBE_SEARCH_RESULTS = _tuned('YOUTUBE_SEARCH_RESULTS', 5)  # 100 quota units per search, whatever the size
+    SEARCH_CHUNK_SIZE = _tuned('SEARCH_CHUNK_SIZE', 25)  # Videos per queued search task
+    RESULT_FLUSH_SIZE = _tuned('RESULT_FLUSH_SIZE', 100)  # Result rows buffered per result store write
+    RESULTS_PAGE_SIZE = _tuned('RESULTS_PAGE_SIZE', 50)
+    
+    # Timeouts in seconds
+    HTTP_TIMEOUT = _tuned('HTTP_TIMEOUT', 30)  # YouTube API requests
+    FALLBACK_HTTP_TIMEOUT = _tuned('FALLBACK_HTTP_TIMEOUT', 60)  # YouTube client with relaxed SSL
+    SPOTIFY_TIMEOUT = _tuned('SPOTIFY_TIMEOUT', 5)  # Spotify API requests
+    
+    # Retry budgets
+    NETWORK_RETRIES = _tuned('NETWORK_RETRIES', 3)  # Attempts on SSL/network errors and Spotify 5xx
+    RETRY_BACKOFF_BASE = _tuned('RETRY_BACKOFF_BASE', 2.0)  # Retry n waits BASE ** n seconds
+    RATE_LIMIT_RETRIES = _tuned('RATE_LIMIT_RETRIES', 5)  # Attempts per API call while rate limited
+    MAX_RETRY_AFTER_SECONDS = _tuned('MAX_RETRY_AFTER_SECONDS', 60)  # Longest Retry-After slept through
+    
+    # Cache sizes and TTLs in seconds
+    PLAYLIST_CACHE_SECONDS = _tuned('PLAYLIST_CACHE_SECONDS', 300)  # A user's Spotify playlist list
+    SNAPSHOT_CACHE_SIZE = _tuned('SNAPSHOT_CACHE_SIZE', 128)  # Playlists whose track IDs are kept for diffing
+    RESULT_TTL_SECONDS = _tuned('RESULT_TTL_SECONDS', 86400)
+    JOB_RETENTION_SECONDS = _tuned('JOB_RETENTION_SECONDS', 3600)
+    CHECKPOINT_STALE_SECONDS = _tuned('CHECKPOINT_STALE_SECONDS', 300)  # Lease a running conversion renews
+    CHANNEL_ARTIST_REFRESH_SECONDS = _tuned('CHANNEL_ARTIST_REFRESH_SECONDS', 300)  # Re-read of the shared table
+    ARTIST_CATALOG_CACHE_SIZE = _tuned('ARTIST_CATALOG_CACHE_SIZE', 32)  # Artists whose catalogue is kept
+    ARTIST_CATALOG_TTL_SECONDS = _tuned('ARTIST_CATALOG_TTL_SECONDS', 86400)
+    ARTIST_CATALOG_MAX_ALBUMS = _tuned('ARTIST_CATALOG_MAX_ALBUMS', 200)  # Albums fetched per catalogue
+    YOUTUBE_SEARCH_CACHE_SIZE = _tuned('YOUTUBE_SEARCH_CACHE_SIZE', 1024)  # Queries whose YouTube results are kept
+    YOUTUBE_SEARCH_TTL_SECONDS = _tuned('YOUTUBE_SEARCH_TTL_SECONDS', 86400)
+    
+    # Background health checks reported by /status
+    HEALTH_CHECK_INTERVAL = _tuned('HEALTH_CHECK_INTERVAL', 60)
+    HEALTH_CHECK_TTL = _tuned('HEALTH_CHECK_TTL', 180)
+    HEALTH_CHECK_TIMEOUT = _tuned('HEALTH_CHECK_TIMEOUT', 5)
     
     @staticmethod
     def get_ssl_context():
@@ -62,6 +269,33 @@ class Config:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
         
         return True
+    
+    @staticmethod
+    def validate_tuning():
+        """Validate the pipeline tuning profile and knobs."""
+        problems = list(TUNING_ERRORS)
+        if TUNING_PROFILE not in TUNING_PRESETS:
+            presets = ', '.join(TUNING_PRESETS)
+            problems.append(f"unknown {TUNING_PROFILE_SOURCE} '{TUNING_PROFILE}' (use one of {presets})")
+        
+        for name, (low, high) in TUNING_BOUNDS.items():
+            value = getattr(Config, name)
+            if value < low or (high is not None and value > high):
+                allowed = f"{low}-{high}" if high is not None else f"at least {low}"
+                problems.append(f"{name}={value} (allowed: {allowed})")
+        
+        for name in ('SPOTIFY_CONCURRENCY', 'YOUTUBE_CONCURRENCY'):
+            if getattr(Config, name) > Config.CONCURRENCY_MAX:
+                problems.append(f"{name} is above CONCURRENCY_MAX ({Config.CONCURRENCY_MAX})")
+        
+        # A turn must pay for a whole search chunk, or busy users need several rounds per task
+        if Config.FAIR_SHARE_QUANTUM < Config.SEARCH_CHUNK_SIZE:
+            problems.append(f"FAIR_SHARE_QUANTUM is below SEARCH_CHUNK_SIZE ({Config.SEARCH_CHUNK_SIZE})")
+        
+        if problems:
+            raise ValueError(f"Invalid pipeline tuning: {'; '.join(problems)}")
+        
+        return True
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -0,0 +1,16 @@
+import os
+
+# Conversion jobs and their event streams live in the worker that accepted them,
+# so scale with threads rather than processes
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Import the app once in the master and fork workers from it
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+def when_ready(server):
+    """Build shared read-only state in the master before workers are forked."""
+    if server.cfg.preload_app:
+        from app import warm_up
+        warm_up()
@@ -0,0 +1,267 @@
+import logging
+import threading
+import time
+from collections import Counter
+from config.settings import Config
+from utils.helpers import (
+    clean_title, extract_video_metadata, normalize_artist_name, split_title_parts, strip_channel_suffix
+)
+from utils.match_scoring import MAX_CACHED_TITLES, BatchScorer
+
+logger = logging.getLogger(__name__)
+
+# An artist whose name appears on this share of a playlist's videos (and on at
+# least DOMINANT_ARTIST_MIN_VIDEOS of them) gets their catalogue fetched
+DOMINANT_ARTIST_SHARE = 0.3
+DOMINANT_ARTIST_MIN_VIDEOS = 10
+MAX_CATALOG_ARTISTS = 3
+# A catalogue track must score this well against the video's song title to be
+# used without a search; anything less falls through to the normal search
+CATALOG_MIN_CONFIDENCE = 0.8
+
+def video_artist_names(metadata):
+    """
+    Get the names that may be a video's artist.
+    
+    Either side of an "A - B" title can be the artist, so both count, along
+    with YouTube Music artists and the channel name.
+    
+    Args:
+        metadata (dict): Output of extract_video_metadata()
+        
+    Returns:
+        dict: normalize_artist_name() key -> name
+    """
+    names = []
+    music = metadata['music']
+    if music:
+        names.extend(music['artists'])
+    parts = split_title_parts(metadata['title'])
+    if parts:
+        names.extend(clean_title(part) for part in parts)
+    names.append(strip_channel_suffix(metadata['channel_title']))
+    
+    keys = {}
+    for name in names:
+        key = normalize_artist_name(name)
+        if key:
+            keys.setdefault(key, name)
+    return keys
+
+def find_dominant_artists(videos, share=DOMINANT_ARTIST_SHARE, min_videos=DOMINANT_ARTIST_MIN_VIDEOS,
+                          limit=MAX_CATALOG_ARTISTS):
+    """
+    Spot the artists that account for much of a playlist.
+    
+    Args:
+        videos (list): YouTube playlistItem resources
+        share (float): Fraction of the videos an artist must appear on
+        min_videos (int): Fewest videos an artist must appear on
+        limit (int): Most artists to return
+        
+    Returns:
+        list: (artist name, number of videos) tuples, most frequent first
+    """
+    counts = Counter()
+    names = {}
+    for video in videos:
+        for key, name in video_artist_names(extract_video_metadata(video)).items():
+            counts[key] += 1
+            names.setdefault(key, name)
+    
+    threshold = max(min_videos, share * len(videos))
+    return [(names[key], count) for key, count in counts.most_common(limit) if count >= threshold]
+
+class CatalogMatcher:
+    """
+    Matches videos locally against the catalogues of a playlist's dominant artists.
+    
+    `catalogs` maps normalize_artist_name() keys to the tracks returned by
+    SpotifyService.get_artist_catalog(). Catalogue titles are tokenized
+    once by a shared BatchScorer and indexed by token, so each video is
+    only scored against the tracks that share a word with its song title.
+    A matcher can be reused for later videos of the same playlist until
+    its scorer holds MAX_CACHED_TITLES video titles (see `exhausted`).
+    """
+    
+    def __init__(self, catalogs):
+        self.scorer = BatchScorer()
+        self.catalogs = {}
+        for key, tracks in catalogs.items():
+            index = {}
+            for position, track in enumerate(tracks):
+                for token_id in self.scorer.spotify_title(track['name']).token_ids:
+                    index.setdefault(token_id, []).append(position)
+            self.catalogs[key] = (tracks, index)
+        self._videos_matched = 0
+    
+    @property
+    def exhausted(self):
+        """Whether the scorer has cached enough video titles that the matcher should be rebuilt."""
+        return self._videos_matched >= MAX_CACHED_TITLES
+    
+    def match(self, metadata):
+        """
+        Find a video's track in the catalogue of one of its candidate artists.
+        
+        Args:
+            metadata (dict): Output of extract_video_metadata()
+            
+        Returns:
+            dict: Track 'id', 'name', 'artist', 'artist_id' and 'method'
+                ('catalog'), or None if no catalogue track is close enough
+        """
+        self._videos_matched += 1
+        for key in video_artist_names(metadata):
+            if key not in self.catalogs:
+                continue
+            tracks, index = self.catalogs[key]
+            youtube = self.scorer.youtube_title(_song_title(metadata, key))
+            candidates = sorted({
+                position for token_id in youtube.token_ids for position in index.get(token_id, ())
+            })
+            
+            best_track, best_confidence = None, 0.0
+            for position in candidates:
+                confidence = self.scorer.score(youtube, self.scorer.spotify_title(tracks[position]['name']))
+                if confidence > best_confidence:
+                    best_track, best_confidence = tracks[position], confidence
+            
+            if best_confidence >= CATALOG_MIN_CONFIDENCE:
+                return dict(best_track, method='catalog')
+        return None
+
+def _song_title(metadata, artist_key):
+    """The part of a video's title that names the song, given the artist it is by."""
+    music = metadata['music']
+    if music and music['track']:
+        return music['track']
+    
+    parts = split_title_parts(metadata['title'])
+    if parts:
+        part1, part2 = [clean_title(part) for part in parts]
+        if normalize_artist_name(part1) == artist_key:
+            return part2
+        if normalize_artist_name(part2) == artist_key:
+            return part1
+    return metadata['title']
+
+class ArtistCatalogCache:
+    """
+    Process-wide cache of artist lookups, catalogues and top tracks.
+    
+    Catalogues and top tracks expire after ttl_seconds; once max_size
+    artists are cached, the oldest one is dropped for each new one.
+    Top tracks are small, so those of max_size * 8 artists are kept.
+    Album counts are kept until max_size * 8 artists have one.
+    """
+    
+    def __init__(self, max_size=32, ttl_seconds=86400):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # normalize_artist_name() key -> artist dict or None (not found)
+        self._artists = {}
+        # artist ID -> number of albums and singles
+        self._album_counts = {}
+        # artist ID -> (fetched at, tracks)
+        self._catalogs = {}
+        self._top_tracks = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def get_artist(self, name):
+        """
+        Get a cached artist lookup.
+        
+        Returns:
+            tuple: (found, artist), where artist is None if the lookup found nothing
+        """
+        with self._lock:
+            key = normalize_artist_name(name)
+            return key in self._artists, self._artists.get(key)
+    
+    def put_artist(self, name, artist):
+        """Cache the result of an artist lookup (None if nothing was found)."""
+        with self._lock:
+            if len(self._artists) >= self.max_size * 8:
+                self._artists.clear()
+            self._artists[normalize_artist_name(name)] = artist
+    
+    def get_album_count(self, artist_id):
+        """Get an artist's cached number of albums and singles, or None if unknown."""
+        with self._lock:
+            return self._album_counts.get(artist_id)
+    
+    def put_album_count(self, artist_id, count):
+        """Cache an artist's number of albums and singles."""
+        with self._lock:
+            if len(self._album_counts) >= self.max_size * 8:
+                self._album_counts.clear()
+            self._album_counts[artist_id] = count
+    
+    def get_catalog(self, artist_id):
+        """Get an artist's cached catalogue, or None if it is missing or expired."""
+        with self._lock:
+            cached = self._catalogs.get(artist_id)
+            if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+                self._hits += 1
+                return cached[1]
+            self._misses += 1
+            return None
+    
+    def put_catalog(self, artist_id, tracks):
+        """Cache an artist's catalogue."""
+        with self._lock:
+            self._catalogs.pop(artist_id, None)
+            if len(self._catalogs) >= self.max_size:
+                del self._catalogs[next(iter(self._catalogs))]
+            self._catalogs[artist_id] = (time.monotonic(), tracks)
+    
+    def get_top_tracks(self, artist_id):
+        """Get an artist's cached top tracks, or None if they are missing or expired."""
+        with self._lock:
+            cached = self._top_tracks.get(artist_id)
+            if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+                return cached[1]
+            return None
+    
+    def put_top_tracks(self, artist_id, tracks):
+        """Cache an artist's top tracks."""
+        with self._lock:
+            self._top_tracks.pop(artist_id, None)
+            if len(self._top_tracks) >= self.max_size * 8:
+                del self._top_tracks[next(iter(self._top_tracks))]
+            self._top_tracks[artist_id] = (time.monotonic(), tracks)
+    
+    def get_stats(self):
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: Cached artists and tracks, and catalogue hits and misses
+        """
+        with self._lock:
+            return {
+                'artists': len(self._catalogs),
+                'tracks': sum(len(tracks) for _, tracks in self._catalogs.values()),
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+_catalog_cache = None
+_catalog_cache_lock = threading.Lock()
+
+def get_artist_catalog_cache():
+    """
+    Get the process-wide artist catalogue cache.
+    
+    Returns:
+        ArtistCatalogCache: Cache shared by every service instance in the process
+    """
+    global _catalog_cache
+    with _catalog_cache_lock:
+        if _catalog_cache is None:
+            config = Config()
+            _catalog_cache = ArtistCatalogCache(config.ARTIST_CATALOG_CACHE_SIZE, config.ARTIST_CATALOG_TTL_SECONDS)
+        return _catalog_cache
@@ -0,0 +1,341 @@
+import atexit
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config.settings import Config
+
+# requests and httplib2 are imported on first use, like in the services
+
+logger = logging.getLogger(__name__)
+
+# Query parameters and response fields that never reach a cassette
+SENSITIVE_PARAMS = ('key', 'access_token', 'client_secret', 'code', 'refresh_token')
+SENSITIVE_FIELDS = ('access_token', 'refresh_token', 'id_token', 'display_name', 'email', 'birthdate', 'country')
+REDACTED = 'redacted'
+# Response headers worth replaying; the rest are dropped to keep cassettes small
+KEPT_HEADERS = ('content-type', 'retry-after')
+# User IDs in paths and bodies are replaced by a stable hash, so replays still match:
+# /v1/users/<id>, open.spotify.com/user/<id> and spotify:user:<id>
+USER_REFERENCE_PATTERN = re.compile(r'(/users?/|spotify:user:)([^/?#:\s]+)')
+# Hashed user IDs look like this and are left alone, so a replayed client that
+# requests /users/<hashed ID> (taken from a replayed body) still matches
+HASHED_USER_ID_PATTERN = re.compile(r'user-[0-9a-f]{12}')
+# Keys of user objects nested in other objects (e.g. a playlist's owner)
+USER_OBJECT_FIELDS = ('owner', 'added_by')
+
+class CassetteMissError(Exception):
+    """Raised in replay mode for a request the cassette has no response for."""
+
+class Cassette:
+    """
+    Records HTTP exchanges to disk, or replays them without a network.
+    
+    Each process records into its own gzipped JSON-lines file in the
+    cassette directory, one line per exchange: the anonymized request,
+    the response status, kept headers and scrubbed body, and how long it
+    took. Secrets and personal fields are redacted and user IDs hashed.
+    Replay loads every file in the directory and answers each request with
+    the recorded responses for the same method and URL in turn, sleeping
+    for the recorded time divided by the speed multiplier.
+    """
+    
+    def __init__(self, mode, directory, speed=1.0):
+        self.mode = mode
+        self.directory = directory
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._file = None
+        self._responses = {}
+        self._by_path = {}
+        if mode == 'replay':
+            self._load()
+    
+    def record(self, service, method, uri, status, headers, body, elapsed):
+        """
+        Append one exchange to this process's cassette file.
+        
+        Args:
+            service (str): Upstream name, e.g. 'spotify'
+            method (str): HTTP method
+            uri (str): Request URL
+            status (int): Response status code
+            headers (dict): Response headers
+            body (bytes): Response body
+            elapsed (float): Seconds from sending the request to the full response
+        """
+        entry = {
+            'service': service,
+            'method': method.upper(),
+            'uri': anonymize_uri(uri),
+            'status': status,
+            'headers': {name.lower(): value for name, value in headers.items() if name.lower() in KEPT_HEADERS},
+            'elapsed': round(elapsed, 4)
+        }
+        text = body.decode('utf-8', 'replace') if body else ''
+        try:
+            body_json = json.loads(text)
+            # /me is the user object itself, without a type on some upstreams
+            entry['json'] = scrub(body_json, user_object=_path(uri).endswith('/me'))
+        except ValueError:
+            entry['body'] = text
+        
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.directory, exist_ok=True)
+                path = os.path.join(self.directory, f'cassette-{os.getpid()}.jsonl.gz')
+                self._file = gzip.open(path, 'at', encoding='utf-8')
+                logger.info("Recording HTTP traffic to %s", path)
+            self._file.write(line)
+            self._file.flush()
+    
+    def replay(self, service, method, uri):
+        """
+        Get the next recorded response for a request, after its recorded latency.
+        
+        Requests are matched on method and anonymized URL, or failing that
+        on method and path. Responses for a request are returned in
+        recorded order and start over once all have been used.
+        
+        Args:
+            service (str): Upstream name, e.g. 'spotify'
+            method (str): HTTP method
+            uri (str): Request URL
+            
+        Returns:
+            tuple: (status code, headers dict, body bytes)
+            
+        Raises:
+            CassetteMissError: If nothing was recorded for the request
+        """
+        uri = anonymize_uri(uri)
+        key = (service, method.upper(), uri)
+        with self._lock:
+            responses = self._responses.get(key) or self._by_path.get(key[:2] + (_path(uri),))
+            if not responses:
+                raise CassetteMissError(f"No recorded {service} response for {method} {uri}")
+            entry = responses[0]
+            responses.rotate(-1)
+        
+        if self.speed > 0:
+            time.sleep(entry['elapsed'] / self.speed)
+        
+        if 'json' in entry:
+            body = json.dumps(entry['json']).encode('utf-8')
+        else:
+            body = entry['body'].encode('utf-8')
+        return entry['status'], dict(entry['headers']), body
+    
+    def close(self):
+        """Close the recording file, if one is open."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+    
+    def _load(self):
+        paths = sorted(glob.glob(os.path.join(self.directory, '*.jsonl.gz')))
+        count = 0
+        for path in paths:
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as cassette_file:
+                    for line in cassette_file:
+                        entry = json.loads(line)
+                        key = (entry['service'], entry['method'], entry['uri'])
+                        self._responses.setdefault(key, deque()).append(entry)
+                        self._by_path.setdefault(key[:2] + (_path(entry['uri']),), deque()).append(entry)
+                        count += 1
+            except (EOFError, ValueError) as e:
+                # A recording process that was killed leaves a truncated file; keep what was read
+                logger.warning("Cassette %s is truncated: %s", path, e)
+        logger.info("Replaying %s recorded HTTP exchanges from %s files at %sx speed", count, len(paths), self.speed)
+
+def anonymize_uri(uri):
+    """Drop credentials from a URL's query and hash the user IDs in its path."""
+    parts = urlsplit(uri)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in SENSITIVE_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, anonymize_user_references(parts.path), urlencode(query), ''))
+
+def anonymize_user_id(user_id):
+    """Stable hash of a user ID (already hashed IDs are returned as they are)."""
+    if HASHED_USER_ID_PATTERN.fullmatch(user_id):
+        return user_id
+    return 'user-' + hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:12]
+
+def anonymize_user_references(text):
+    """Hash the user IDs in the user paths and URIs within a string."""
+    return USER_REFERENCE_PATTERN.sub(lambda match: match.group(1) + anonymize_user_id(match.group(2)), text)
+
+def scrub(value, user_object=False):
+    """
+    Replace personal and secret fields anywhere in a decoded JSON body.
+    
+    User IDs are hashed like in anonymize_uri: in user paths and URIs
+    inside any string, and as the 'id' of user objects (/me, playlist
+    owners, and anything with type 'user').
+    """
+    if isinstance(value, dict):
+        user_object = user_object or value.get('type') == 'user'
+        scrubbed = {}
+        for name, item in value.items():
+            if name in SENSITIVE_FIELDS and item is not None:
+                scrubbed[name] = REDACTED
+            elif name == 'id' and user_object and isinstance(item, str):
+                scrubbed[name] = anonymize_user_id(item)
+            else:
+                scrubbed[name] = scrub(item, user_object=name in USER_OBJECT_FIELDS)
+        return scrubbed
+    if isinstance(value, list):
+        return [scrub(item) for item in value]
+    if isinstance(value, str):
+        return anonymize_user_references(value)
+    return value
+
+def _path(uri):
+    parts = urlsplit(uri)
+    return parts.netloc + parts.path
+
+class CassetteHttp:
+    """
+    httplib2.Http stand-in that records or replays through a cassette.
+    
+    Anything other than request() is passed through to the wrapped Http.
+    """
+    
+    def __init__(self, http, cassette, service):
+        self.http = http
+        self.cassette = cassette
+        self.service = service
+    
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        import httplib2
+        
+        if self.cassette.mode == 'replay':
+            status, response_headers, content = self.cassette.replay(self.service, method, uri)
+            return httplib2.Response(dict(response_headers, status=str(status))), content
+        
+        started_at = time.perf_counter()
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        self.cassette.record(self.service, method, uri, response.status, response, content,
+                             time.perf_counter() - started_at)
+        return response, content
+    
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+def _cassette_adapter_class():
+    import requests
+    
+    class CassetteAdapter(requests.adapters.HTTPAdapter):
+        """requests transport adapter that records or replays through a cassette."""
+        
+        def __init__(self, cassette, service, **kwargs):
+            super().__init__(**kwargs)
+            self.cassette = cassette
+            self.service = service
+        
+        def send(self, request, **kwargs):
+            if self.cassette.mode == 'replay':
+                status, headers, content = self.cassette.replay(self.service, request.method, request.url)
+                response = requests.Response()
+                response.status_code = status
+                response.headers = requests.structures.CaseInsensitiveDict(headers)
+                response._content = content
+                response.encoding = 'utf-8'
+                response.url = request.url
+                response.request = request
+                response.connection = self
+                return response
+            
+            started_at = time.perf_counter()
+            response = super().send(request, **kwargs)
+            self.cassette.record(self.service, request.method, request.url, response.status_code,
+                                 response.headers, response.content, time.perf_counter() - started_at)
+            return response
+    
+    return CassetteAdapter
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+def get_cassette():
+    """
+    Get the process-wide cassette.
+    
+    Returns:
+        Cassette: The cassette for CASSETTE_MODE 'record' or 'replay', or
+            None when record/replay is off
+    """
+    global _cassette
+    config = Config()
+    if config.CASSETTE_MODE not in ('record', 'replay'):
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(config.CASSETTE_MODE, config.CASSETTE_DIR, config.CASSETTE_SPEED)
+            atexit.register(_cassette.close)
+        return _cassette
+
+def wrap_http(http, service):
+    """
+    Route an httplib2.Http through the cassette, if record/replay is on.
+    
+    Args:
+        http (httplib2.Http): Transport to wrap
+        service (str): Upstream name the exchanges are filed under
+        
+    Returns:
+        The cassette-backed transport, or http itself when it is off
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return http
+    return CassetteHttp(http, cassette, service)
+
+def create_adapter(service, **kwargs):
+    """
+    Create a requests transport adapter, cassette-backed if record/replay is on.
+    
+    Args:
+        service (str): Upstream name the exchanges are filed under
+        **kwargs: Arguments for requests.adapters.HTTPAdapter
+        
+    Returns:
+        requests.adapters.HTTPAdapter: Adapter to mount on a session
+    """
+    import requests
+    
+    cassette = get_cassette()
+    if cassette is None:
+        return requests.adapters.HTTPAdapter(**kwargs)
+    return _cassette_adapter_class()(cassette, service, **kwargs)
+
+def create_session(service):
+    """
+    Create a requests session that goes through the cassette.
+    
+    Args:
+        service (str): Upstream name the exchanges are filed under
+        
+    Returns:
+        requests.Session: Cassette-backed session, or None when record/replay
+            is off (callers then use their default session)
+    """
+    if get_cassette() is None:
+        return None
+    import requests
+    
+    session = requests.Session()
+    adapter = create_adapter(service)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
@@ -0,0 +1,195 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from config.settings import Config
+from utils.helpers import normalize_artist_name, strip_channel_suffix
+from utils.logging_setup import PER_ITEM
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of channel ID -> JSON [artist ID, artist name]
+CHANNEL_ARTISTS_KEY = 'channel_artists'
+
+class ChannelArtistMap:
+    """
+    Table of YouTube channel ID -> Spotify artist, learned from confirmed matches.
+    
+    A match confirms a channel when the matched track's artist has the
+    channel's name once suffixes like "VEVO" and " - Topic" are stripped,
+    so label and compilation channels, which upload many artists, never
+    get an entry. Searches for a mapped channel's videos then go by the
+    artist's ID rather than the channel name. The whole table is held in
+    memory as a dict of (artist ID, artist name) tuples and written through
+    to a Redis hash when REDIS_URL is set, or to a JSON file otherwise.
+    Entries learned by other processes are picked up every refresh_seconds,
+    and a file is merged with its current contents on each write, under an
+    exclusive lock on a "<path>.lock" file, so processes sharing it do not
+    drop each other's entries. The lock needs fcntl; where it is missing
+    (Windows), the file must only be used by one process.
+    """
+    
+    def __init__(self, redis_url=None, path=None, refresh_seconds=300):
+        self.redis = None
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self._artists = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._learned = 0
+    
+    def get(self, channel_id):
+        """
+        Look up the Spotify artist learned for a channel.
+        
+        Args:
+            channel_id (str): YouTube channel ID
+            
+        Returns:
+            tuple: (artist ID, artist name), or None if the channel is not mapped
+        """
+        if not channel_id:
+            return None
+        
+        with self._lock:
+            self._refresh()
+            artist = self._artists.get(channel_id)
+            if artist:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return artist
+    
+    def record(self, channel_id, channel_title, artist_id, artist_name):
+        """
+        Learn a channel's artist from a match, if the match confirms it.
+        
+        Args:
+            channel_id (str): YouTube channel that uploaded the matched video
+            channel_title (str): The channel's name
+            artist_id (str): Spotify artist of the matched track
+            artist_name (str): The artist's name
+            
+        Returns:
+            bool: True if the table gained or changed an entry
+        """
+        if not channel_id or not artist_id or not normalize_artist_name(artist_name):
+            return False
+        if normalize_artist_name(strip_channel_suffix(channel_title)) != normalize_artist_name(artist_name):
+            return False
+        
+        artist = (artist_id, artist_name)
+        with self._lock:
+            self._refresh()
+            if self._artists.get(channel_id) == artist:
+                return False
+            self._artists[channel_id] = artist
+            self._learned += 1
+            self._save(channel_id, artist)
+        
+        logger.debug("Mapped channel %s (%s) to Spotify artist %s", channel_id, channel_title, artist_name,
+                     extra=PER_ITEM)
+        return True
+    
+    def get_stats(self):
+        """
+        Get table counters.
+        
+        Returns:
+            dict: Mapped channels, lookup hits and misses, and entries learned here
+        """
+        with self._lock:
+            return {
+                'backend': 'redis' if self.redis else 'file',
+                'channels': len(self._artists),
+                'hits': self._hits,
+                'misses': self._misses,
+                'learned': self._learned
+            }
+    
+    def _refresh(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_seconds:
+            return
+        self._loaded_at = now
+        
+        try:
+            if self.redis:
+                rows = {
+                    channel_id: json.loads(raw)
+                    for channel_id, raw in self.redis.hgetall(CHANNEL_ARTISTS_KEY).items()
+                }
+            else:
+                rows = self._read_file()
+        except Exception as e:
+            logger.warning(f"Could not load channel artist mappings: {e}")
+            return
+        
+        self._artists = {channel_id: tuple(artist) for channel_id, artist in rows.items()}
+    
+    def _read_file(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save(self, channel_id, artist):
+        try:
+            if self.redis:
+                self.redis.hset(CHANNEL_ARTISTS_KEY, channel_id, json.dumps(artist))
+            elif self.path:
+                with self._file_lock():
+                    # Merged into what other processes wrote since the last refresh, and written
+                    # to a temporary file first, so a crash never leaves a truncated table
+                    rows = self._read_file()
+                    rows[channel_id] = artist
+                    self._artists = {channel_id: tuple(artist) for channel_id, artist in rows.items()}
+                    temp_path = f"{self.path}.{os.getpid()}.tmp"
+                    with open(temp_path, 'w', encoding='utf-8') as f:
+                        json.dump(rows, f)
+                    os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Could not save channel artist mapping: {e}")
+
+    @contextmanager
+    def _file_lock(self):
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        
+        with open(f"{self.path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+_channel_artists = None
+_channel_artists_lock = threading.Lock()
+
+def get_channel_artist_map():
+    """
+    Get the process-wide channel to artist table.
+    
+    Returns:
+        ChannelArtistMap: Table shared by every service instance in the process
+    """
+    global _channel_artists
+    with _channel_artists_lock:
+        if _channel_artists is None:
+            config = Config()
+            _channel_artists = ChannelArtistMap(
+                redis_url=config.REDIS_URL,
+                path=config.CHANNEL_ARTIST_FILE,
+                refresh_seconds=config.CHANNEL_ARTIST_REFRESH_SECONDS
+            )
+        return _channel_artists
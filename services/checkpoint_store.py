@@ -0,0 +1,279 @@
+import copy
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Save a checkpoint only while the saver still holds the conversion's lease
+_SAVE_LUA = """
+if ARGV[4] ~= '' and redis.call('GET', KEYS[4]) ~= ARGV[4] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('SADD', KEYS[3], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[2])
+return 1
+"""
+
+# Extend (ARGV[2] set) or drop a conversion's lease, if ARGV[1] still holds it
+_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] then
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+else
+    redis.call('DEL', KEYS[1])
+end
+return 1
+"""
+
+class CheckpointLeaseLost(Exception):
+    """The conversion was claimed by another run while this one was saving it."""
+
+class MemoryCheckpointStore:
+    """
+    Keeps conversion checkpoints in process memory.
+    
+    Survives failed conversions but not the process itself; set REDIS_URL
+    for checkpoints that outlive a killed worker.
+    
+    A running conversion holds a lease on its checkpoint, renewed while its
+    worker is alive; only a conversion whose lease has run out can be
+    claimed again and resumed.
+    """
+    
+    def __init__(self, ttl_seconds=86400, lease_seconds=None):
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds or Config.CHECKPOINT_STALE_SECONDS
+        self._checkpoints = {}
+        self._videos = {}
+        # job ID -> (owner, lease deadline)
+        self._leases = {}
+        self._lock = threading.Lock()
+    
+    def save(self, job_id, checkpoint):
+        """
+        Store the progress of a conversion, replacing any earlier checkpoint.
+        
+        Raises:
+            CheckpointLeaseLost: If the checkpoint's owner no longer holds its lease
+        """
+        with self._lock:
+            self._prune()
+            if checkpoint.get('owner') and self._owner(job_id) != checkpoint['owner']:
+                raise CheckpointLeaseLost(job_id)
+            self._checkpoints[job_id] = copy.deepcopy(dict(checkpoint, updated_at=time.time()))
+    
+    def get(self, job_id):
+        """Get the checkpoint of a conversion, or None if there is none."""
+        with self._lock:
+            checkpoint = self._checkpoints.get(job_id)
+            return copy.deepcopy(checkpoint) if checkpoint else None
+    
+    def claim(self, job_id, owner):
+        """
+        Take the lease of a conversion, unless a live run already holds it.
+        
+        Returns:
+            bool: True if owner now holds the lease
+        """
+        with self._lock:
+            if self._owner(job_id) not in (None, owner):
+                return False
+            self._leases[job_id] = (owner, time.time() + self.lease_seconds)
+            return True
+    
+    def renew(self, job_id, owner):
+        """Extend a held lease; False if owner no longer holds it."""
+        with self._lock:
+            if self._owner(job_id) != owner:
+                return False
+            self._leases[job_id] = (owner, time.time() + self.lease_seconds)
+            return True
+    
+    def release(self, job_id, owner):
+        """Give up a held lease, so the conversion can be resumed straight away."""
+        with self._lock:
+            if self._owner(job_id) == owner:
+                self._leases.pop(job_id, None)
+    
+    def get_owner(self, job_id):
+        """Get the run holding a conversion's lease, or None if nothing is running it."""
+        with self._lock:
+            return self._owner(job_id)
+    
+    def append_videos(self, job_id, videos):
+        """Add a fetched page of playlist items to a conversion's checkpoint."""
+        with self._lock:
+            self._videos.setdefault(job_id, []).extend(videos)
+    
+    def get_videos(self, job_id):
+        """Get every playlist item checkpointed for a conversion, in order."""
+        with self._lock:
+            return list(self._videos.get(job_id, []))
+    
+    def delete(self, job_id):
+        """Drop the checkpoint of a finished conversion."""
+        with self._lock:
+            self._checkpoints.pop(job_id, None)
+            self._videos.pop(job_id, None)
+            self._leases.pop(job_id, None)
+    
+    def find_for_user(self, user_id):
+        """Get the checkpoints of every unfinished conversion of a user."""
+        with self._lock:
+            return [copy.deepcopy(checkpoint) for checkpoint in self._checkpoints.values()
+                    if checkpoint.get('user_id') == user_id]
+    
+    def _owner(self, job_id):
+        owner, deadline = self._leases.get(job_id, (None, 0))
+        return owner if deadline > time.time() else None
+    
+    def _prune(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, checkpoint in self._checkpoints.items() if checkpoint['updated_at'] < cutoff]
+        for job_id in expired:
+            self._checkpoints.pop(job_id, None)
+            self._videos.pop(job_id, None)
+
+class RedisCheckpointStore:
+    """Keeps conversion checkpoints in Redis, so a conversion can resume on any worker."""
+    
+    def __init__(self, redis_url, ttl_seconds=86400, lease_seconds=None):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds or Config.CHECKPOINT_STALE_SECONDS
+        self._save = self.redis.register_script(_SAVE_LUA)
+        self._lease = self.redis.register_script(_LEASE_LUA)
+    
+    def save(self, job_id, checkpoint):
+        """
+        Store the progress of a conversion, replacing any earlier checkpoint.
+        
+        Raises:
+            CheckpointLeaseLost: If the checkpoint's owner no longer holds its lease
+        """
+        checkpoint = dict(checkpoint, updated_at=time.time())
+        saved = self._save(
+            keys=[self._key(job_id, 'state'), self._key(job_id, 'videos'),
+                  self._user_key(checkpoint.get('user_id')), self._key(job_id, 'owner')],
+            args=[json.dumps(checkpoint), self.ttl_seconds, job_id, checkpoint.get('owner') or '']
+        )
+        if not saved:
+            raise CheckpointLeaseLost(job_id)
+    
+    def claim(self, job_id, owner):
+        """
+        Take the lease of a conversion, unless a live run already holds it.
+        
+        Returns:
+            bool: True if owner now holds the lease
+        """
+        return bool(self.redis.set(self._key(job_id, 'owner'), owner, nx=True, ex=self.lease_seconds))
+    
+    def renew(self, job_id, owner):
+        """Extend a held lease; False if owner no longer holds it."""
+        return bool(self._lease(keys=[self._key(job_id, 'owner')], args=[owner, self.lease_seconds]))
+    
+    def release(self, job_id, owner):
+        """Give up a held lease, so the conversion can be resumed straight away."""
+        self._lease(keys=[self._key(job_id, 'owner')], args=[owner])
+    
+    def get_owner(self, job_id):
+        """Get the run holding a conversion's lease, or None if nothing is running it."""
+        owner = self.redis.get(self._key(job_id, 'owner'))
+        return owner.decode('utf-8') if owner else None
+    
+    def get(self, job_id):
+        """Get the checkpoint of a conversion, or None if there is none."""
+        raw = self.redis.get(self._key(job_id, 'state'))
+        return json.loads(raw) if raw else None
+    
+    def append_videos(self, job_id, videos):
+        """Add a fetched page of playlist items to a conversion's checkpoint."""
+        if not videos:
+            return
+        key = self._key(job_id, 'videos')
+        pipe = self.redis.pipeline()
+        pipe.rpush(key, *[json.dumps(video) for video in videos])
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+    
+    def get_videos(self, job_id):
+        """Get every playlist item checkpointed for a conversion, in order."""
+        return [json.loads(video) for video in self.redis.lrange(self._key(job_id, 'videos'), 0, -1)]
+    
+    def delete(self, job_id):
+        """Drop the checkpoint of a finished conversion."""
+        checkpoint = self.get(job_id)
+        pipe = self.redis.pipeline()
+        pipe.delete(self._key(job_id, 'state'), self._key(job_id, 'videos'), self._key(job_id, 'owner'))
+        if checkpoint:
+            pipe.srem(self._user_key(checkpoint.get('user_id')), job_id)
+        pipe.execute()
+    
+    def find_for_user(self, user_id):
+        """Get the checkpoints of every unfinished conversion of a user."""
+        job_ids = [job_id.decode('utf-8') for job_id in self.redis.smembers(self._user_key(user_id))]
+        checkpoints = [self.get(job_id) for job_id in job_ids]
+        return [checkpoint for checkpoint in checkpoints if checkpoint]
+    
+    @staticmethod
+    def _key(job_id, name):
+        return f"checkpoint:{job_id}:{name}"
+    
+    @staticmethod
+    def _user_key(user_id):
+        return f"checkpoints:user:{user_id}"
+
+def is_interrupted(checkpoint_store, checkpoint):
+    """
+    Check whether a checkpointed conversion has stopped and can be resumed.
+    
+    A conversion counts as interrupted once no run holds its lease: it
+    failed, or its worker was killed and stopped renewing the lease.
+    """
+    return checkpoint_store.get_owner(checkpoint['job_id']) is None
+
+@contextmanager
+def hold_lease(checkpoint_store, job_id, owner):
+    """
+    Keep a conversion's lease renewed while the block runs, and release it after.
+    
+    A run that stalls for longer than the lease (or is killed) loses it,
+    and its next checkpoint save raises CheckpointLeaseLost.
+    """
+    done = threading.Event()
+    
+    def heartbeat():
+        while not done.wait(checkpoint_store.lease_seconds / 3):
+            if not checkpoint_store.renew(job_id, owner):
+                logger.warning("Lost the lease of conversion %s", job_id)
+                return
+    
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+        checkpoint_store.release(job_id, owner)
+
+def create_checkpoint_store():
+    """
+    Create the checkpoint store for this deployment.
+    
+    Uses Redis when REDIS_URL is configured, process memory otherwise.
+    """
+    config = Config()
+    if config.REDIS_URL:
+        return RedisCheckpointStore(config.REDIS_URL, config.RESULT_TTL_SECONDS)
+    return MemoryCheckpointStore(config.RESULT_TTL_SECONDS)
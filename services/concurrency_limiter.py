@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Recent latency above this multiple of the baseline counts as the upstream queueing our requests
+LATENCY_TOLERANCE = 2.0
+# Multiplicative decrease on a 429 or 5xx, and the gentler one on a latency spike
+BACKOFF_RATIO = 0.5
+LATENCY_BACKOFF_RATIO = 0.9
+# Weight of the newest sample in an endpoint's recent latency, and in its
+# baseline; the baseline moves slowly, so jitter averages out of both, and
+# slower still while the endpoint looks congested, so queueing doesn't become
+# the new normal while a permanently slower upstream is still re-learned
+LATENCY_SMOOTHING = 0.1
+BASELINE_SMOOTHING = 0.01
+CONGESTED_BASELINE_SMOOTHING = 0.001
+# Samples an endpoint needs before its latency is judged at all
+WARMUP_SAMPLES = 20
+# Endpoint class of requests whose caller doesn't name one
+DEFAULT_ENDPOINT = 'default'
+
+class ConcurrencyLimiter:
+    """
+    Caps the requests in flight to one upstream, adapting the cap (AIMD).
+    
+    Every completed request reports its latency, outcome and endpoint
+    class (searches, playlist writes and page fetches take very different
+    times). While an endpoint's recent average latency stays within
+    LATENCY_TOLERANCE of its baseline, a slow moving average of the same
+    endpoint, the limit grows by about one per limit's worth of successful
+    requests; a 429 or server error halves it, and recent latency beyond
+    the band trims it. Single slow responses never count on their own.
+    Cuts happen at most once per average latency, so a burst of failures
+    from one round of requests counts once.
+    """
+    
+    def __init__(self, api, initial_limit, max_limit, min_limit=1):
+        self.api = api
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self._limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        # endpoint class -> {'baseline', 'latency', 'samples'}
+        self._endpoints = {}
+        self._average_latency = None
+        self._decreased_at = 0.0
+        self._completed = 0
+        self._dropped = 0
+        self._decreases = 0
+        self._waited_seconds = 0.0
+    
+    def acquire(self):
+        """
+        Block until a request slot is free and take it.
+        
+        Returns:
+            float: Start time to pass back to release()
+        """
+        with self._condition:
+            if self._in_flight >= int(self._limit):
+                waiting_since = time.monotonic()
+                while self._in_flight >= int(self._limit):
+                    self._condition.wait()
+                self._waited_seconds += time.monotonic() - waiting_since
+            self._in_flight += 1
+        return time.monotonic()
+    
+    def release(self, started_at, outcome='ok', endpoint=None):
+        """
+        Free a request slot and adjust the limit from how the request went.
+        
+        Args:
+            started_at (float): Value returned by acquire()
+            outcome (str): 'ok' for a response, 'dropped' for a 429 or server
+                error, or 'ignore' for a result that says nothing about load
+                (e.g. a 404)
+            endpoint (str): Endpoint class the latency is compared within,
+                e.g. 'search'
+        """
+        now = time.monotonic()
+        latency = now - started_at
+        
+        with self._condition:
+            self._in_flight -= 1
+            if outcome == 'dropped':
+                self._dropped += 1
+                self._decrease(now, BACKOFF_RATIO)
+            elif outcome == 'ok':
+                self._completed += 1
+                if self._observe(endpoint or DEFAULT_ENDPOINT, latency):
+                    self._decrease(now, LATENCY_BACKOFF_RATIO)
+                elif self._in_flight + 1 >= int(self._limit):
+                    # Only grow while the limit is what holds requests back
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            self._condition.notify_all()
+    
+    def current_limit(self):
+        """Get the current in-flight request limit."""
+        with self._condition:
+            return int(self._limit)
+    
+    def get_stats(self):
+        """
+        Get limiter counters.
+        
+        Returns:
+            dict: Current limit, requests in flight, latencies and outcome counts
+        """
+        with self._condition:
+            return {
+                'limit': int(self._limit),
+                'max_limit': self.max_limit,
+                'in_flight': self._in_flight,
+                'average_latency_ms': round(self._average_latency * 1000, 1) if self._average_latency else None,
+                'endpoints': {
+                    name: {'baseline_ms': round(stats['baseline'] * 1000, 1),
+                           'latency_ms': round(stats['latency'] * 1000, 1)}
+                    for name, stats in self._endpoints.items()
+                },
+                'completed': self._completed,
+                'dropped': self._dropped,
+                'decreases': self._decreases,
+                'waited_seconds': round(self._waited_seconds, 1)
+            }
+    
+    def _observe(self, endpoint, latency):
+        """Fold a latency sample into the averages; True if the endpoint looks congested."""
+        if self._average_latency is None:
+            self._average_latency = latency
+        else:
+            self._average_latency += LATENCY_SMOOTHING * (latency - self._average_latency)
+        
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            self._endpoints[endpoint] = {'baseline': latency, 'latency': latency, 'samples': 1}
+            return False
+        stats['latency'] += LATENCY_SMOOTHING * (latency - stats['latency'])
+        stats['samples'] += 1
+        congested = stats['samples'] >= WARMUP_SAMPLES and stats['latency'] > stats['baseline'] * LATENCY_TOLERANCE
+        smoothing = CONGESTED_BASELINE_SMOOTHING if congested else BASELINE_SMOOTHING
+        stats['baseline'] += smoothing * (latency - stats['baseline'])
+        return congested
+    
+    def _decrease(self, now, ratio):
+        if now - self._decreased_at < (self._average_latency or 0.0):
+            return
+        limit = max(self.min_limit, self._limit * ratio)
+        if int(limit) < int(self._limit):
+            logger.info("%s concurrency limit lowered to %s", self.api, int(limit))
+        self._limit = limit
+        self._decreased_at = now
+        self._decreases += 1
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_concurrency_limiter(api, initial_limit):
+    """
+    Get the process-wide concurrency limiter for an upstream API.
+    
+    Args:
+        api (str): Upstream name, e.g. 'spotify'
+        initial_limit (int): In-flight requests allowed before any latency is known
+        
+    Returns:
+        ConcurrencyLimiter: Limiter shared by every service instance in the process
+    """
+    with _limiters_lock:
+        if api not in _limiters:
+            _limiters[api] = ConcurrencyLimiter(api, initial_limit, Config().CONCURRENCY_MAX)
+        return _limiters[api]
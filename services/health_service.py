@@ -0,0 +1,177 @@
+import logging
+import threading
+import time
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failed checks before an upstream's circuit is reported open
+CIRCUIT_FAILURE_THRESHOLD = 3
+
+class HealthMonitor:
+    """
+    Runs upstream health checks on a background thread and caches the results.
+    
+    Registered stats are gathered on the same thread and cached next to the
+    check results, so reporting health never makes an outbound call.
+    """
+    
+    def __init__(self, interval_seconds=None, ttl_seconds=None):
+        config = Config()
+        self.interval_seconds = interval_seconds or config.HEALTH_CHECK_INTERVAL
+        self.ttl_seconds = ttl_seconds or config.HEALTH_CHECK_TTL
+        self._checks = {}
+        self._stats_providers = {}
+        self._results = {}
+        self._stats = {}
+        self._failures = {}
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def register_check(self, name, check):
+        """
+        Register an upstream check.
+        
+        Args:
+            name (str): Upstream name reported by /status
+            check (callable): Returns True if healthy; may raise
+        """
+        self._checks[name] = check
+    
+    def register_stats(self, name, provider):
+        """
+        Register a callable whose return value is included in reports.
+        
+        The provider is called by the check loop, never by report().
+        
+        Args:
+            name (str): Key in the report's 'stats' section
+            provider (callable): Returns a JSON-serializable dict
+        """
+        self._stats_providers[name] = provider
+    
+    def start(self):
+        """
+        Start the background check loop (no-op if already running).
+        
+        Threads do not survive fork(), so with a preloaded app this has to be
+        called from the worker process, not at import time.
+        """
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+            self._thread.start()
+    
+    def stop(self):
+        """Stop the background check loop."""
+        self._stop.set()
+    
+    def run_checks(self):
+        """Run every registered check once and cache the outcome."""
+        for name, check in self._checks.items():
+            started = time.monotonic()
+            error = None
+            try:
+                healthy = bool(check())
+            except Exception as e:
+                healthy = False
+                error = str(e)
+            latency_ms = (time.monotonic() - started) * 1000
+            
+            with self._lock:
+                self._failures[name] = 0 if healthy else self._failures.get(name, 0) + 1
+                self._results[name] = {
+                    'healthy': healthy,
+                    'latency_ms': round(latency_ms, 1),
+                    'checked_at': time.time(),
+                    'error': error
+                }
+            
+            if not healthy:
+                logger.warning(f"Health check failed for {name}: {error or 'unhealthy'}")
+    
+    def collect_stats(self):
+        """Call every registered stats provider once and cache the outcome."""
+        for name, provider in self._stats_providers.items():
+            try:
+                stats = provider()
+            except Exception as e:
+                stats = {'error': str(e)}
+            
+            with self._lock:
+                self._stats[name] = stats
+    
+    def is_healthy(self, name):
+        """Get the cached health of an upstream; False if unknown or stale."""
+        result = self._read(name)
+        return bool(result and result['healthy'] and not result['stale'])
+    
+    def circuit_open(self, name):
+        """
+        Check whether an upstream's circuit is open.
+        
+        It opens after CIRCUIT_FAILURE_THRESHOLD consecutive failed checks
+        and closes again on the first check that passes.
+        
+        Returns:
+            bool: True if new work that needs the upstream should be refused
+        """
+        with self._lock:
+            return self._failures.get(name, 0) >= CIRCUIT_FAILURE_THRESHOLD
+    
+    def report(self):
+        """
+        Build a health report from cached results only.
+        
+        Returns:
+            dict: Per-upstream health, latency and circuit state, the
+                health cache hit rate and the stats gathered by the last
+                collection (providers not yet collected are omitted)
+        """
+        upstreams = {name: self._read(name) for name in self._checks}
+        
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = self._hits + self._misses
+            cache = {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': self._hits / lookups if lookups else 0.0
+            }
+        
+        return {'upstreams': upstreams, 'caches': {'health': cache}, 'stats': stats}
+    
+    def _read(self, name):
+        with self._lock:
+            result = self._results.get(name)
+            if result is None:
+                self._misses += 1
+                return None
+            
+            age = time.time() - result['checked_at']
+            stale = age > self.ttl_seconds
+            if stale:
+                self._misses += 1
+            else:
+                self._hits += 1
+            
+            return dict(
+                result,
+                age_seconds=round(age, 1),
+                stale=stale,
+                circuit='open' if self._failures.get(name, 0) >= CIRCUIT_FAILURE_THRESHOLD else 'closed'
+            )
+    
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_checks()
+                self.collect_stats()
+            except Exception as e:
+                logger.error(f"Health check loop error: {e}")
+            self._stop.wait(self.interval_seconds)
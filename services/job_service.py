@@ -0,0 +1,209 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from config.settings import Config
+from utils.logging_setup import log_context, set_log_context
+
+logger = logging.getLogger(__name__)
+
+class EventBuffer:
+    """
+    Bounded, thread-safe buffer of job events.
+    
+    Publishers never block: once the buffer is full the oldest events are
+    dropped. Progress events carry cumulative counts, so a reader that falls
+    behind only loses intermediate updates, never the current state.
+    """
+    
+    def __init__(self, max_events=500):
+        self._events = deque(maxlen=max_events)
+        self._condition = threading.Condition()
+        self._next_id = 1
+        self.closed = False
+    
+    def publish(self, event_type, data):
+        """
+        Append an event and wake up any waiting readers.
+        
+        Args:
+            event_type (str): SSE event name
+            data (dict): JSON-serializable payload
+        
+        Returns:
+            dict: The stored event
+        """
+        with self._condition:
+            event = {'id': self._next_id, 'event': event_type, 'data': data}
+            self._next_id += 1
+            self._events.append(event)
+            self._condition.notify_all()
+            return event
+    
+    def close(self):
+        """Mark the stream as finished; readers drain and stop."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+    
+    def wait(self, last_id=0, timeout=15.0):
+        """
+        Get events newer than last_id, blocking until one arrives.
+        
+        Args:
+            last_id (int): ID of the last event the reader has seen
+            timeout (float): Seconds to wait before returning empty-handed
+        
+        Returns:
+            list: Buffered events with an ID greater than last_id
+        """
+        with self._condition:
+            if not self.closed and self._next_id - 1 <= last_id:
+                self._condition.wait(timeout)
+            return [event for event in self._events if event['id'] > last_id]
+
+class TransferJob:
+    """State of one background playlist conversion."""
+    
+    def __init__(self, user_id, max_events=500):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.events = EventBuffer(max_events)
+        self.created_at = time.time()
+        self.finished_at = None
+        self.profiler = None
+        self.profile = None
+    
+    def emit(self, event_type, **data):
+        """Publish a progress event for this job."""
+        if event_type == 'stage':
+            set_log_context(stage=data['stage'])
+        self.events.publish(event_type, data)
+
+class JobManager:
+    """In-process registry of conversion jobs running on background threads."""
+    
+    def __init__(self, retention_seconds=None, max_events=None):
+        config = Config()
+        self.retention_seconds = retention_seconds or config.JOB_RETENTION_SECONDS
+        self.max_events = max_events or config.SSE_MAX_EVENTS
+        self._jobs = {}
+        self._lock = threading.Lock()
+    
+    def create(self, user_id):
+        """
+        Register a new job.
+        
+        Args:
+            user_id (str): Spotify user that owns the job
+        
+        Returns:
+            TransferJob: The new job
+        """
+        job = TransferJob(user_id, self.max_events)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+    
+    def get(self, job_id):
+        """Get a job by ID, or None if unknown or expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def run(self, job, target, *args, **kwargs):
+        """
+        Run target(*args, emit=job.emit, **kwargs) for a job in this thread.
+        
+        The return value becomes job.result; an exception is stored on
+        job.error. Either way a final 'complete' or 'failed' event is
+        published and the event stream is closed. If the job has a
+        profiler, its output is attached as job.profile.
+        """
+        with log_context(job_id=job.id, user_id=job.user_id):
+            job.status = 'running'
+            if job.profiler:
+                job.profiler.start()
+            try:
+                job.result = target(*args, emit=job.emit, **kwargs)
+                job.status = 'complete'
+                job.emit('complete', status=job.status)
+            except Exception as e:
+                logger.error("Job %s failed: %s", job.id, e)
+                job.error = e
+                job.status = 'failed'
+                job.emit('failed', status=job.status, message=str(e),
+                         category=getattr(e, 'category', 'error'))
+            finally:
+                if job.profiler:
+                    job.profile = job.profiler.stop()
+                    logger.info("Profiled job %s (%s): stage seconds %s",
+                                job.id, job.profile['format'], job.profile['stage_seconds'])
+                job.finished_at = time.time()
+                job.events.close()
+    
+    def start(self, job, target, *args, **kwargs):
+        """Like run(), but on a background thread."""
+        thread = threading.Thread(
+            target=self.run,
+            args=(job, target) + args,
+            kwargs=kwargs,
+            name=f"transfer-{job.id[:8]}",
+            daemon=True
+        )
+        thread.start()
+        return thread
+    
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+def format_sse(event):
+    """Serialize an event in text/event-stream format."""
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+def stream_events(buffer, last_id=0, heartbeat=15.0):
+    """
+    Generate SSE frames from an event buffer until it is closed.
+    
+    Events are pulled only as fast as the client consumes them. When a
+    reader is behind, consecutive 'track' events are coalesced into the
+    latest one, since each carries cumulative progress.
+    
+    Args:
+        buffer (EventBuffer): Buffer to read from
+        last_id (int): Last event ID the client has already seen
+        heartbeat (float): Seconds between keep-alive comments
+    
+    Yields:
+        str: SSE frames
+    """
+    yield "retry: 3000\n\n"
+    
+    while True:
+        events = buffer.wait(last_id, timeout=heartbeat)
+        if not events:
+            if buffer.closed:
+                return
+            yield ": keep-alive\n\n"
+            continue
+        
+        for i, event in enumerate(events):
+            next_event = events[i + 1] if i + 1 < len(events) else None
+            if event['event'] == 'track' and next_event and next_event['event'] == 'track':
+                continue
+            yield format_sse(event)
+        last_id = events[-1]['id']
+        
+        if buffer.closed and buffer.wait(last_id, timeout=0) == []:
+            return
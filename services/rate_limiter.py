@@ -0,0 +1,250 @@
+import hashlib
+import logging
+import threading
+import time
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# A 429 halves the rate (once per back-off window, however many requests
+# were rejected in it); it then recovers by this fraction of the configured rate per second
+RECOVERY_PER_SECOND = 0.05
+# The rate never drops below this fraction of the configured rate
+MIN_RATE_FRACTION = 0.05
+# After a Redis error, use the local bucket for this long before trying Redis again
+SHARED_RETRY_SECONDS = 30
+
+class LocalTokenBucket:
+    """
+    In-process token bucket whose refill rate adapts to throttling.
+    
+    Used on its own without Redis, and as the fallback when Redis is down.
+    """
+    
+    def __init__(self, rate, capacity):
+        self.max_rate = rate
+        self.capacity = capacity
+        self._rate = rate
+        self._tokens = capacity
+        self._updated_at = time.time()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+    
+    def reserve(self, tokens=1):
+        """
+        Take tokens if available.
+        
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            if self._blocked_until > now:
+                return self._blocked_until - now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self._rate
+    
+    def penalize(self, retry_after):
+        """Halve the rate and stop handing out tokens for retry_after seconds."""
+        with self._lock:
+            now = time.time()
+            self._refill(now)
+            if self._blocked_until <= now:
+                self._rate = max(self.max_rate * MIN_RATE_FRACTION, self._rate / 2)
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, now + retry_after)
+    
+    def current_rate(self):
+        """Get the current refill rate in requests per second."""
+        with self._lock:
+            self._refill(time.time())
+            return self._rate
+    
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated_at)
+        self._rate = min(self.max_rate, self._rate + self.max_rate * RECOVERY_PER_SECOND * elapsed)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self._rate)
+        self._updated_at = now
+
+# Same arithmetic as LocalTokenBucket, run atomically in Redis.
+# Numbers are returned as strings because Redis truncates Lua numbers to integers.
+_REFILL_LUA = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'rate', 'blocked_until')
+local now = tonumber(ARGV[1])
+local max_rate = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local rate = tonumber(state[3]) or max_rate
+local tokens = tonumber(state[1]) or capacity
+local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+local blocked_until = tonumber(state[4]) or 0
+rate = math.min(max_rate, rate + max_rate * tonumber(ARGV[4]) * elapsed)
+tokens = math.min(capacity, tokens + elapsed * rate)
+"""
+
+_RESERVE_LUA = _REFILL_LUA + """
+local requested = tonumber(ARGV[6])
+local wait = 0
+if blocked_until > now then
+    wait = blocked_until - now
+elseif tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now, 'rate', rate, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {tostring(wait), tostring(rate)}
+"""
+
+_PENALIZE_LUA = _REFILL_LUA + """
+if blocked_until <= now then
+    rate = math.max(max_rate * tonumber(ARGV[7]), rate / 2)
+end
+blocked_until = math.max(blocked_until, now + tonumber(ARGV[6]))
+redis.call('HSET', KEYS[1], 'tokens', 0, 'updated_at', now, 'rate', rate, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return {'0', tostring(rate)}
+"""
+
+class RedisTokenBucket:
+    """Token bucket shared by every process that uses the same Redis key."""
+    
+    def __init__(self, redis_url, key, rate, capacity):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.key = key
+        self.max_rate = rate
+        self.capacity = capacity
+        self._rate = rate
+        self._reserve = self.redis.register_script(_RESERVE_LUA)
+        self._penalize = self.redis.register_script(_PENALIZE_LUA)
+    
+    def reserve(self, tokens=1):
+        """
+        Take tokens if available.
+        
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds to wait before retrying
+        """
+        wait, rate = self._reserve(keys=[self.key], args=self._args(tokens))
+        self._rate = float(rate)
+        return float(wait)
+    
+    def penalize(self, retry_after):
+        """Halve the shared rate and stop handing out tokens for retry_after seconds."""
+        _, rate = self._penalize(keys=[self.key], args=self._args(retry_after) + [MIN_RATE_FRACTION])
+        self._rate = float(rate)
+    
+    def current_rate(self):
+        """Get the shared refill rate as of this process's last call."""
+        return self._rate
+    
+    def _args(self, value):
+        # Idle buckets expire once they would have refilled completely
+        ttl = int(self.capacity / self.max_rate) + 60
+        return [time.time(), self.max_rate, self.capacity, RECOVERY_PER_SECOND, ttl, value]
+
+class RateLimiter:
+    """
+    Rate limiter for one upstream API and client ID.
+    
+    Backed by Redis when REDIS_URL is set, so every worker and node shares
+    one budget; falls back to a local bucket if Redis cannot be reached.
+    Reporting 429s through throttled() lowers the rate for everyone, and
+    it climbs back while requests succeed.
+    """
+    
+    def __init__(self, api, client_id, rate, burst=None, redis_url=None):
+        self.api = api
+        capacity = burst or rate
+        self.local = LocalTokenBucket(rate, capacity)
+        self.shared = None
+        if redis_url:
+            client_hash = hashlib.sha256((client_id or '').encode('utf-8')).hexdigest()[:12]
+            self.shared = RedisTokenBucket(redis_url, f"ratelimit:{api}:{client_hash}", rate, capacity)
+        
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._throttled = 0
+        self._waited_seconds = 0.0
+        self._shared_retry_at = 0.0
+    
+    def acquire(self, tokens=1):
+        """Block until the request may be sent."""
+        waited = 0.0
+        while True:
+            wait = self._bucket_call('reserve', tokens)
+            if wait <= 0:
+                break
+            wait = min(wait, 1.0)
+            time.sleep(wait)
+            waited += wait
+        
+        with self._lock:
+            self._requests += 1
+            self._waited_seconds += waited
+    
+    def throttled(self, retry_after=1.0):
+        """
+        Report a 429 from the upstream.
+        
+        Args:
+            retry_after (float): Seconds the upstream asked us to wait
+        """
+        logger.warning(f"{self.api} rate limited; pausing {retry_after:.1f}s")
+        with self._lock:
+            self._throttled += 1
+        self._bucket_call('penalize', retry_after)
+    
+    def get_stats(self):
+        """
+        Get limiter counters.
+        
+        Returns:
+            dict: Request, throttle and wait counts plus the current rate
+        """
+        bucket = self.shared or self.local
+        with self._lock:
+            return {
+                'backend': 'redis' if self.shared else 'local',
+                'rate': round(bucket.current_rate(), 2),
+                'max_rate': bucket.max_rate,
+                'requests': self._requests,
+                'throttled': self._throttled,
+                'waited_seconds': round(self._waited_seconds, 1)
+            }
+    
+    def _bucket_call(self, method, value):
+        if self.shared and time.time() >= self._shared_retry_at:
+            try:
+                return getattr(self.shared, method)(value)
+            except Exception as e:
+                logger.warning(f"Shared rate limiter unavailable, using local bucket: {e}")
+                self._shared_retry_at = time.time() + SHARED_RETRY_SECONDS
+        return getattr(self.local, method)(value)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(api, client_id, rate):
+    """
+    Get the process-wide rate limiter for an API and client ID.
+    
+    Args:
+        api (str): Upstream name, e.g. 'spotify'
+        client_id (str): Credential the upstream counts requests against
+        rate (float): Sustained requests per second allowed
+        
+    Returns:
+        RateLimiter: Limiter shared by every service instance in the process
+    """
+    with _limiters_lock:
+        key = (api, client_id)
+        if key not in _limiters:
+            config = Config()
+            _limiters[key] = RateLimiter(api, client_id, rate, burst=config.RATE_LIMIT_BURST or None,
+                                         redis_url=config.REDIS_URL)
+        return _limiters[key]
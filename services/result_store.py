@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+RESULT_KINDS = ('successful', 'failed')
+
+class MemoryResultStore:
+    """Keeps conversion results in process memory until they expire."""
+    
+    def __init__(self, ttl_seconds=86400):
+        self.ttl_seconds = ttl_seconds
+        self._results = {}
+        self._lock = threading.Lock()
+    
+    def save_summary(self, job_id, summary):
+        """Store the summary (counts, playlist URL) of a conversion."""
+        with self._lock:
+            self._prune()
+            self._entry(job_id)['summary'] = dict(summary)
+    
+    def get_summary(self, job_id):
+        """Get the summary of a conversion, or None if unknown or expired."""
+        with self._lock:
+            entry = self._results.get(job_id)
+            return dict(entry['summary']) if entry and entry['summary'] else None
+    
+    def append(self, job_id, kind, rows):
+        """
+        Append result rows for a conversion.
+        
+        Args:
+            job_id (str): Conversion job ID
+            kind (str): 'successful' or 'failed'
+            rows (list): Track data dicts
+        """
+        if not rows:
+            return
+        with self._lock:
+            self._entry(job_id)[kind].extend(rows)
+    
+    def get_page(self, job_id, kind, page=1, per_page=50):
+        """
+        Get one page of result rows.
+        
+        Args:
+            job_id (str): Conversion job ID
+            kind (str): 'successful' or 'failed'
+            page (int): 1-based page number
+            per_page (int): Rows per page
+        
+        Returns:
+            dict: Rows plus paging metadata
+        """
+        start = (page - 1) * per_page
+        with self._lock:
+            entry = self._results.get(job_id)
+            rows = entry[kind] if entry else []
+            return _page(rows[start:start + per_page], len(rows), page, per_page)
+    
+    def _entry(self, job_id):
+        entry = self._results.get(job_id)
+        if entry is None:
+            entry = {'summary': None, 'successful': [], 'failed': [], 'expires_at': 0}
+            self._results[job_id] = entry
+        entry['expires_at'] = time.time() + self.ttl_seconds
+        return entry
+    
+    def _prune(self):
+        now = time.time()
+        expired = [job_id for job_id, entry in self._results.items() if entry['expires_at'] < now]
+        for job_id in expired:
+            del self._results[job_id]
+
+class RedisResultStore:
+    """Keeps conversion results in Redis lists so any worker can serve them."""
+    
+    def __init__(self, redis_url, ttl_seconds=86400):
+        import redis
+        self.redis = redis.Redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+    
+    def save_summary(self, job_id, summary):
+        """Store the summary (counts, playlist URL) of a conversion."""
+        self.redis.set(self._key(job_id, 'summary'), json.dumps(summary), ex=self.ttl_seconds)
+    
+    def get_summary(self, job_id):
+        """Get the summary of a conversion, or None if unknown or expired."""
+        raw = self.redis.get(self._key(job_id, 'summary'))
+        return json.loads(raw) if raw else None
+    
+    def append(self, job_id, kind, rows):
+        """
+        Append result rows for a conversion.
+        
+        Args:
+            job_id (str): Conversion job ID
+            kind (str): 'successful' or 'failed'
+            rows (list): Track data dicts
+        """
+        if not rows:
+            return
+        key = self._key(job_id, kind)
+        pipe = self.redis.pipeline()
+        pipe.rpush(key, *[json.dumps(row) for row in rows])
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+    
+    def get_page(self, job_id, kind, page=1, per_page=50):
+        """
+        Get one page of result rows.
+        
+        Args:
+            job_id (str): Conversion job ID
+            kind (str): 'successful' or 'failed'
+            page (int): 1-based page number
+            per_page (int): Rows per page
+        
+        Returns:
+            dict: Rows plus paging metadata
+        """
+        key = self._key(job_id, kind)
+        start = (page - 1) * per_page
+        pipe = self.redis.pipeline()
+        pipe.lrange(key, start, start + per_page - 1)
+        pipe.llen(key)
+        raw_rows, total = pipe.execute()
+        return _page([json.loads(row) for row in raw_rows], total, page, per_page)
+    
+    @staticmethod
+    def _key(job_id, name):
+        return f"results:{job_id}:{name}"
+
+def _page(items, total, page, per_page):
+    return {
+        'items': items,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    }
+
+def create_result_store():
+    """
+    Create the result store for this deployment.
+    
+    Uses Redis when REDIS_URL is configured, process memory otherwise.
+    """
+    config = Config()
+    if config.REDIS_URL:
+        logger.info("Storing conversion results in Redis")
+        return RedisResultStore(config.REDIS_URL, config.RESULT_TTL_SECONDS)
+    return MemoryResultStore(config.RESULT_TTL_SECONDS)
@@ -0,0 +1,270 @@
+import copy
+import logging
+import uuid
+from config.settings import Config
+from services.profiler import profile_stage
+from services.transfer_service import TransferError
+from utils.helpers import (
+    generate_playlist_name, clean_title, strip_channel_suffix, group_duplicate_tracks, unique_track_ids
+)
+from utils.logging_setup import PER_ITEM
+from utils.match_scoring import BatchScorer
+
+logger = logging.getLogger(__name__)
+
+# Bonus for a video uploaded by the artist's own channel (or its "- Topic" channel)
+ARTIST_CHANNEL_BONUS = 0.2
+
+class ReverseTransferService:
+    """
+    Runs the Spotify to YouTube conversion pipeline.
+    
+    Mirrors TransferService: the same rate-limited services, duplicate
+    grouping, result store and progress events, in the other direction.
+    """
+    
+    def __init__(self, spotify_service, youtube_service, result_store, drop_duplicate_tracks=None):
+        self.spotify_service = spotify_service
+        self.youtube_service = youtube_service
+        self.result_store = result_store
+        self.config = Config()
+        if drop_duplicate_tracks is None:
+            drop_duplicate_tracks = self.config.DROP_DUPLICATE_TRACKS
+        self.drop_duplicate_tracks = drop_duplicate_tracks
+        # Scores search results; fork() gives each job its own
+        self.scorer = BatchScorer()
+    
+    def fork(self):
+        """
+        Get a copy of the service with its own Spotify and YouTube clients, for one job.
+        
+        Returns:
+            ReverseTransferService: Copy sharing the result store and settings
+        """
+        service = copy.copy(self)
+        service.spotify_service = self.spotify_service.fork()
+        service.youtube_service = self.youtube_service.fork()
+        service.scorer = BatchScorer()
+        return service
+    
+    def run(self, playlist_url, user_id, custom_name='', job_id=None, emit=None):
+        """
+        Convert a Spotify playlist into a new playlist on the connected YouTube account.
+        
+        Args:
+            playlist_url (str): Spotify playlist URL
+            user_id (str): Spotify user ID that owns the conversion
+            custom_name (str): Optional name for the new YouTube playlist
+            job_id (str): Key for the stored results (generated if omitted)
+            emit (callable): Progress callback, called as emit(event_type, **data)
+            
+        Returns:
+            dict: Conversion summary, also saved in the result store
+            
+        Raises:
+            TransferError: If any stage of the conversion fails
+        """
+        emit = emit or (lambda event_type, **data: None)
+        job_id = job_id or uuid.uuid4().hex
+        
+        playlist_id = self.spotify_service.extract_playlist_id(playlist_url)
+        logger.info("Extracted Spotify playlist ID: %s", playlist_id)
+        
+        emit('stage', stage='spotify', message='Connecting to Spotify...')
+        if not self.spotify_service.restore_session(user_id):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        playlist_info = self.spotify_service.get_playlist_info(playlist_id)
+        if not playlist_info:
+            raise TransferError('Could not read that Spotify playlist. Is it public or yours?')
+        logger.info("Processing Spotify playlist: %s (%s tracks)", playlist_info['name'], playlist_info['track_count'])
+        
+        if not self.youtube_service.restore_session(user_id):
+            raise TransferError('Please connect your YouTube account first.', endpoint='youtube_login')
+        
+        # Get tracks, one page at a time
+        emit('stage', stage='fetch', message='Fetching Spotify tracks...')
+        with profile_stage('fetch'):
+            tracks = self._fetch_tracks(playlist_id, playlist_info['track_count'], emit)
+        logger.info("Retrieved %s tracks", len(tracks))
+        
+        if not tracks:
+            raise TransferError('No tracks found in the playlist.', category='warning')
+        
+        # Search for videos and collect results
+        video_ids, failed_count = self._search_tracks(job_id, tracks, emit)
+        found_videos = [video_id for video_id in video_ids if video_id]
+        logger.info("Video search complete: %s found, %s failed", len(found_videos), failed_count)
+        
+        if not found_videos:
+            raise TransferError('No tracks could be found on YouTube.', category='warning')
+        
+        # Create the YouTube playlist only once there is something to put in it
+        playlist_name = custom_name or generate_playlist_name(playlist_info['name'], source='Spotify')
+        youtube_playlist = self.youtube_service.create_playlist(
+            playlist_name,
+            description=f"Converted from Spotify playlist: {playlist_info['name']}",
+            privacy_status=self.config.YOUTUBE_PLAYLIST_PRIVACY
+        )
+        
+        matched_count = len(found_videos)
+        if self.drop_duplicate_tracks:
+            found_videos = unique_track_ids(found_videos)
+        
+        # Add videos to playlist
+        emit('stage', stage='upload', message='Adding videos to YouTube...')
+        with profile_stage('upload'):
+            success = self.youtube_service.add_videos_to_playlist(
+                youtube_playlist['id'],
+                found_videos,
+                on_batch=lambda added, total: emit('batch', added=added, total=total)
+            )
+        
+        if not success:
+            raise TransferError('Failed to add videos to YouTube playlist.')
+        
+        summary = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'direction': 'spotify_to_youtube',
+            'playlist_name': playlist_name,
+            'youtube_playlist_url': youtube_playlist['url'],
+            'successful_count': matched_count,
+            'failed_count': failed_count,
+            'success_rate': (matched_count / len(tracks)) * 100,
+            'duplicates_removed': matched_count - len(found_videos)
+        }
+        self.result_store.save_summary(job_id, summary)
+        return summary
+    
+    def _fetch_tracks(self, playlist_id, total, emit):
+        """Fetch every track of a Spotify playlist, emitting a 'page' event per page."""
+        tracks = []
+        offset = 0
+        page = 0
+        
+        while offset is not None:
+            page_tracks, offset = self.spotify_service.get_playlist_tracks_page(playlist_id, offset=offset)
+            tracks.extend(page_tracks)
+            page += 1
+            emit('page', page=page, fetched=len(tracks), total=total)
+        
+        return tracks
+    
+    def _search_tracks(self, job_id, tracks, emit):
+        """
+        Search YouTube once per distinct song and record a result row per track.
+        
+        Returns:
+            tuple: (video ID or None for each track, in playlist order; number not found)
+        """
+        video_ids = [None] * len(tracks)
+        successful_matches = []
+        failed_matches = []
+        processed = 0
+        failed_count = 0
+        
+        # Repeats and re-releases of one recording are searched once
+        with profile_stage('normalize'):
+            groups = group_duplicate_tracks(tracks)
+        logger.info("Starting video search: %s tracks in %s distinct songs", len(tracks), len(groups))
+        emit('stage', stage='search', message='Searching on YouTube...')
+        
+        for group in groups:
+            with profile_stage('search'):
+                video_id, row = self.match_track(tracks[group[0]])
+            
+            for position, index in enumerate(group):
+                item_data = row if position == 0 else self.fan_out(row, tracks[index])
+                item_data['position'] = index
+                processed += 1
+                
+                if video_id:
+                    video_ids[index] = video_id
+                    successful_matches.append(item_data)
+                else:
+                    item_data['reason'] = 'Not found on YouTube'
+                    failed_matches.append(item_data)
+                    failed_count += 1
+                logger.debug("%s: %s", 'Found' if video_id else 'Not found', item_data['title'], extra=PER_ITEM)
+                
+                emit('track', index=processed, total=len(tracks), title=item_data['title'],
+                     found=bool(video_id), matched=processed - failed_count)
+            
+            if len(successful_matches) + len(failed_matches) >= self.config.RESULT_FLUSH_SIZE:
+                self._flush_results(job_id, successful_matches, failed_matches)
+        
+        self._flush_results(job_id, successful_matches, failed_matches)
+        return video_ids, failed_count
+    
+    def match_track(self, track):
+        """
+        Find the YouTube video for one Spotify track.
+        
+        The top search results are scored with the same confidence measure
+        the forward direction uses, plus a bonus for the artist's channel.
+        
+        Args:
+            track (dict): Track from SpotifyService.get_playlist_tracks_page()
+            
+        Returns:
+            tuple: (video_id or None, row dict describing the decision)
+        """
+        artist = track['artists'][0] if track['artists'] else None
+        row = {
+            'title': track['name'],
+            'artist': ', '.join(track['artists']),
+            'track_id': track['id'],
+            'track_name': track['name'],
+            'track_artist': artist
+        }
+        
+        query = f"{artist} {clean_title(track['name'])}" if artist else clean_title(track['name'])
+        videos = self.youtube_service.search_videos(query, max_results=self.config.YOUTUBE_SEARCH_RESULTS)
+        
+        best_video, best_confidence = None, 0.0
+        # The job's scorer tokenizes a video title once, however many tracks it is compared with
+        self.scorer.limit_cache()
+        confidences = self.scorer.score_videos([video['title'] for video in videos], track['name'], artist)
+        for video, confidence in zip(videos, confidences):
+            confidence = self.add_channel_bonus(confidence, video, artist)
+            if confidence > best_confidence:
+                best_video, best_confidence = video, confidence
+        
+        if not best_video or best_confidence < self.config.YOUTUBE_MIN_CONFIDENCE:
+            return None, row
+        
+        row.update({
+            'video_id': best_video['id'],
+            'video_title': best_video['title'],
+            'method': 'youtube_search',
+            'confidence': round(best_confidence, 3)
+        })
+        return best_video['id'], row
+    
+    @staticmethod
+    def add_channel_bonus(confidence, video, artist=None):
+        """Raise a title match score for a video from the artist's own channel (capped at 1.0)."""
+        if artist and strip_channel_suffix(video['channel_title']).lower() == artist.lower():
+            confidence += ARTIST_CHANNEL_BONUS
+        return min(1.0, confidence)
+    
+    @staticmethod
+    def fan_out(row, track):
+        """Copy a group's match decision onto another track of the same group."""
+        return dict(
+            row,
+            title=track['name'],
+            artist=', '.join(track['artists']),
+            track_id=track['id'],
+            track_name=track['name'],
+            track_artist=track['artists'][0] if track['artists'] else None,
+            duplicate_of=row['track_id']
+        )
+    
+    def _flush_results(self, job_id, successful_matches, failed_matches):
+        """Write buffered result rows to the result store and clear the buffers."""
+        self.result_store.append(job_id, 'successful', successful_matches)
+        self.result_store.append(job_id, 'failed', failed_matches)
+        successful_matches.clear()
+        failed_matches.clear()
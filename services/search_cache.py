@@ -0,0 +1,72 @@
+import threading
+import time
+from config.settings import Config
+
+class SearchCache:
+    """
+    Process-wide cache of search results, keyed by normalized query.
+    
+    Entries expire after ttl_seconds; once max_size queries are cached, the
+    oldest one is dropped for each new one. Queries that differ only in case
+    and whitespace share an entry.
+    """
+    
+    def __init__(self, max_size=1024, ttl_seconds=86400):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # (normalized query, max results) -> (fetched at, results)
+        self._results = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    @staticmethod
+    def normalize(query):
+        """Get the cache key form of a query."""
+        return ' '.join(query.lower().split())
+    
+    def get(self, query, max_results):
+        """Get cached results for a query, or None if they are missing or expired."""
+        with self._lock:
+            cached = self._results.get((self.normalize(query), max_results))
+            if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+                self._hits += 1
+                return list(cached[1])
+            self._misses += 1
+            return None
+    
+    def put(self, query, max_results, results):
+        """Cache the results of a query."""
+        key = (self.normalize(query), max_results)
+        with self._lock:
+            self._results.pop(key, None)
+            if len(self._results) >= self.max_size:
+                del self._results[next(iter(self._results))]
+            self._results[key] = (time.monotonic(), list(results))
+    
+    def get_stats(self):
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: Cached queries, and hits and misses
+        """
+        with self._lock:
+            return {'queries': len(self._results), 'hits': self._hits, 'misses': self._misses}
+
+_youtube_search_cache = None
+_youtube_search_cache_lock = threading.Lock()
+
+def get_youtube_search_cache():
+    """
+    Get the process-wide YouTube search cache.
+    
+    Returns:
+        SearchCache: Cache shared by every YouTubeService instance in the process
+    """
+    global _youtube_search_cache
+    with _youtube_search_cache_lock:
+        if _youtube_search_cache is None:
+            config = Config()
+            _youtube_search_cache = SearchCache(config.YOUTUBE_SEARCH_CACHE_SIZE, config.YOUTUBE_SEARCH_TTL_SECONDS)
+        return _youtube_search_cache
@@ -1,42 +1,132 @@
+import copy
 import logging
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
-from spotipy.exceptions import SpotifyException
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config.settings import Config
-from utils.helpers import clean_title
+from services.artist_catalog import get_artist_catalog_cache
+from services.cassette import create_adapter, create_session
+from services.channel_artists import get_channel_artist_map
+from services.concurrency_limiter import get_concurrency_limiter
+from services.rate_limiter import get_rate_limiter
+from utils.helpers import (
+    SPOTIFY_PLAYLIST_PATTERN, diff_playlist_tracks, normalize_artist_name, sanitize_filename
+)
+from utils.logging_setup import PER_ITEM
+from utils.match_scoring import BatchScorer
+from utils.query_planner import QueryPlanner
+
+# spotipy (and requests under it) is imported on first use to keep worker start-up fast
 
 logger = logging.getLogger(__name__)
 
+SPOTIFY_API_ROOT = 'https://api.spotify.com/v1/'
+# Redis key prefix of each user's OAuth token (the user ID is appended)
+TOKEN_KEY_PREFIX = 'spotify:token_info:'
+
+# 429s are left to the rate limiter; these are retried inside the HTTP session
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+# Fields requested for each playlist item; everything else in the track object is skipped
+PLAYLIST_ITEM_FIELDS = 'items(is_local,track(id,name,type,duration_ms,artists(name),external_ids(isrc))),next,total'
+# The API's largest pages of user playlists, playlist items, artist albums and album
+# tracks, and the most albums one request can fetch
+PLAYLISTS_PAGE_SIZE = 50
+PLAYLIST_ITEMS_PAGE_SIZE = 100
+ARTIST_ALBUMS_PAGE_SIZE = 50
+ALBUM_TRACKS_PAGE_SIZE = 50
+ALBUMS_PER_REQUEST = 20
+
 class SpotifyService:
     """Service class for Spotify API operations."""
     
     def __init__(self):
         self.sp = None
         self.config = Config()
+        self.query_planner = QueryPlanner()
+        self.rate_limiter = get_rate_limiter('spotify', self.config.SPOTIPY_CLIENT_ID, self.config.SPOTIFY_RATE_LIMIT)
+        self.concurrency_limiter = get_concurrency_limiter('spotify', self.config.SPOTIFY_CONCURRENCY)
+        # user ID -> (fetched at, playlists) for get_user_playlists()
+        self._playlists_cache = {}
+        self._playlists_lock = threading.Lock()
+        # playlist ID -> (snapshot_id, track IDs) for get_playlist_track_ids()
+        self._snapshots = {}
+        self.channel_artists = get_channel_artist_map()
+        self.catalog_cache = get_artist_catalog_cache()
+        # Scores search results; fork() gives each job its own
+        self.scorer = BatchScorer()
     
-    def get_auth_manager(self):
-        """Get Spotify OAuth manager."""
+    def fork(self):
+        """
+        Get a copy of the service with its own spotipy client and match scorer.
+        
+        The copy shares the query planner, limiters and caches. Each job and
+        OAuth callback runs on a copy, so restoring one user's session never
+        swaps the client under another.
+        
+        Returns:
+            SpotifyService: Unauthenticated copy
+        """
+        service = copy.copy(self)
+        service.sp = None
+        service.scorer = BatchScorer()
+        return service
+    
+    def get_auth_manager(self, user_id=None):
+        """
+        Get Spotify OAuth manager.
+        
+        Args:
+            user_id (str): Spotify user whose token cache to use (None for
+                a throwaway in-memory cache)
+        """
+        from spotipy.oauth2 import SpotifyOAuth
+        
         return SpotifyOAuth(
             client_id=self.config.SPOTIPY_CLIENT_ID,
             client_secret=self.config.SPOTIPY_CLIENT_SECRET,
             redirect_uri=self.config.SPOTIPY_REDIRECT_URI,
             scope=self.config.SPOTIFY_SCOPE,
-            cache_path=".cache"
+            cache_handler=self.get_cache_handler(user_id),
+            requests_session=create_session('spotify') or True
         )
     
-    def authenticate(self):
+    def get_cache_handler(self, user_id=None):
+        """
+        Get a user's OAuth token cache.
+        
+        Each user's token is kept under their own key: in Redis when
+        REDIS_URL is configured, so queue workers on other nodes can act for
+        the user, otherwise in a per-user .cache-<user ID> file.
+        
+        Args:
+            user_id (str): Spotify user ID (None for a throwaway in-memory cache)
+        """
+        from spotipy.cache_handler import CacheFileHandler, MemoryCacheHandler, RedisCacheHandler
+        
+        if not user_id:
+            return MemoryCacheHandler()
+        if self.config.REDIS_URL:
+            import redis
+            return RedisCacheHandler(redis.Redis.from_url(self.config.REDIS_URL), key=f"{TOKEN_KEY_PREFIX}{user_id}")
+        return CacheFileHandler(cache_path=f".cache-{sanitize_filename(user_id)}")
+    
+    def authenticate(self, user_id):
         """
-        Authenticate with Spotify API.
+        Authenticate with Spotify API as a user.
+        
+        Args:
+            user_id (str): Spotify user whose cached token to use
         
         Returns:
             bool: True if authentication successful, False otherwise
         """
         try:
-            auth_manager = self.get_auth_manager()
-            self.sp = spotipy.Spotify(auth_manager=auth_manager)
+            auth_manager = self.get_auth_manager(user_id)
+            self.sp = self._create_client(auth_manager=auth_manager)
             
             # Test the connection
-            user = self.sp.current_user()
+            user = self._request(self.sp.current_user)
             logger.info(f"Authenticated as Spotify user: {user['display_name']} ({user['id']})")
             return True
             
@@ -44,22 +134,155 @@ class SpotifyService:
             logger.error(f"Spotify authentication failed: {str(e)}")
             return False
     
+    def restore_session(self, user_id):
+        """
+        Rebuild the Spotify client from a user's cached OAuth token.
+        
+        Refreshes the token first if it has expired.
+        
+        Args:
+            user_id (str): Spotify user to act for
+        
+        Returns:
+            bool: True if a cached token was found, False otherwise
+        """
+        auth_manager = self.get_auth_manager(user_id)
+        token_info = auth_manager.cache_handler.get_cached_token()
+        
+        if not token_info:
+            logger.error("No cached Spotify token found for user %s", user_id)
+            return False
+        
+        logger.info("Using cached Spotify token of user %s", user_id)
+        if auth_manager.is_token_expired(token_info):
+            logger.info("Token expired, refreshing...")
+            auth_manager.refresh_access_token(token_info['refresh_token'])
+        
+        self.sp = self._create_client(auth_manager=auth_manager)
+        return True
+    
     def get_authorization_url(self):
         """Get Spotify authorization URL for OAuth flow."""
         auth_manager = self.get_auth_manager()
         return auth_manager.get_authorize_url()
     
     def get_access_token(self, code):
-        """Exchange authorization code for access token."""
+        """
+        Exchange an authorization code for a token and cache it under its user.
+        
+        The user is only known once the token can be used, so the exchange
+        goes through a throwaway cache and the token is then stored under
+        the user's own key.
+        
+        Returns:
+            bool: True if the client was built and the token cached
+        """
         try:
             auth_manager = self.get_auth_manager()
-            token_info = auth_manager.get_access_token(code)
-            self.sp = spotipy.Spotify(auth=token_info['access_token'])
+            token_info = auth_manager.get_access_token(code, check_cache=False)
+            self.sp = self._create_client(auth=token_info['access_token'])
+            user = self._request(self.sp.current_user)
+            self.get_cache_handler(user['id']).save_token_to_cache(token_info)
             return True
         except Exception as e:
             logger.error(f"Failed to get access token: {str(e)}")
             return False
     
+    def _create_client(self, **kwargs):
+        """
+        Build a spotipy client that reports 429s instead of retrying them.
+        
+        spotipy's default session sleeps through Retry-After on its own, which
+        hides throttling from the rate limiter; this one only retries 5xx.
+        """
+        import requests
+        import spotipy
+        import urllib3
+        
+        retry = urllib3.Retry(
+            total=self.config.NETWORK_RETRIES,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+            status=self.config.NETWORK_RETRIES,
+            backoff_factor=0.3,
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=False
+        )
+        session = requests.Session()
+        adapter = create_adapter('spotify', max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        return spotipy.Spotify(requests_session=session, requests_timeout=self.config.SPOTIFY_TIMEOUT, **kwargs)
+    
+    def _request(self, method, *args, **kwargs):
+        """
+        Call a spotipy method through the shared rate limiter.
+        
+        A 429 is reported to the limiter, which slows every process sharing
+        the client ID, and the call is retried after the requested delay.
+        Calls also wait for a slot under the adaptive concurrency limit,
+        which learns from each call's latency and outcome.
+        
+        Args:
+            method (callable): Bound spotipy client method
+            *args, **kwargs: Arguments for the method
+            
+        Returns:
+            The method's return value
+            
+        Raises:
+            SpotifyException: Still rate limited after Config.RATE_LIMIT_RETRIES
+                attempts, or any other API error
+        """
+        from spotipy.exceptions import SpotifyException
+        
+        max_retry_after = self.config.MAX_RETRY_AFTER_SECONDS
+        for attempt in range(self.config.RATE_LIMIT_RETRIES):
+            self.rate_limiter.acquire()
+            started_at = self.concurrency_limiter.acquire()
+            outcome = 'dropped'
+            try:
+                result = method(*args, **kwargs)
+                outcome = 'ok'
+                return result
+            except SpotifyException as e:
+                if e.http_status != 429:
+                    if e.http_status and e.http_status < 500:
+                        outcome = 'ignore'
+                    raise
+                
+                try:
+                    retry_after = float((e.headers or {}).get('Retry-After', 1))
+                except (TypeError, ValueError):
+                    retry_after = 1.0
+                
+                self.rate_limiter.throttled(min(retry_after, max_retry_after))
+                if attempt == self.config.RATE_LIMIT_RETRIES - 1 or retry_after > max_retry_after:
+                    raise
+            finally:
+                self.concurrency_limiter.release(started_at, outcome, getattr(method, '__name__', None))
+    
+    def ping(self):
+        """
+        Check that the Spotify Web API is reachable.
+        
+        Any HTTP response below 500 counts, since an unauthenticated request
+        is expected to be rejected.
+        
+        Returns:
+            bool: True if the API answered, False otherwise
+        """
+        import requests
+        
+        try:
+            response = requests.get(SPOTIFY_API_ROOT, timeout=self.config.HEALTH_CHECK_TIMEOUT)
+            return response.status_code < 500
+        except requests.RequestException as e:
+            logger.warning(f"Spotify API unreachable: {str(e)}")
+            return False
+    
     def get_current_user(self):
         """
         Get current user information.
@@ -70,60 +293,310 @@ class SpotifyService:
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        from spotipy.exceptions import SpotifyException
+        
         try:
-            return self.sp.current_user()
+            return self._request(self.sp.current_user)
         except SpotifyException as e:
             logger.error(f"Failed to get current user: {str(e)}")
             raise Exception(f"Failed to get user info: {str(e)}")
     
-    def search_track(self, query, artist=None, limit=1):
+    def search_track(self, query, artist=None, limit=None, channel_title=None, channel_id=None):
         """
         Search for a track on Spotify.
         
         Args:
-            query (str): Search query (usually song title)
+            query (str): Search query (usually song or video title)
             artist (str): Artist name to improve search accuracy
-            limit (int): Number of results to return
+            limit (int): Number of results to return (default Config.SPOTIFY_SEARCH_LIMIT)
+            channel_title (str): YouTube channel name, used as an artist hint
+            channel_id (str): YouTube channel ID, to look up a learned artist
             
         Returns:
             str: Spotify track ID if found, None otherwise
         """
+        match = self.match_track(query, artist=artist, limit=limit, channel_title=channel_title,
+                                 channel_id=channel_id)
+        return match['id'] if match else None
+    
+    def match_track(self, query, artist=None, limit=None, channel_title=None, channel_id=None):
+        """
+        Search for a track on Spotify and describe the match.
+        
+        Candidate queries come from the query planner and are tried in order
+        until one returns a track whose title scores at least
+        SPOTIFY_MIN_CONFIDENCE against the query, so the strategy that
+        usually hits is the only search issued for most videos. Only the
+        MAX_SEARCHES_PER_VIDEO best-ranked candidates are tried; when none
+        of them is confident enough, the video counts as not found rather
+        than being uploaded as a likely wrong track.
+        A channel with a learned Spotify artist is first matched by that
+        artist's ID against their top tracks, which needs no search at all
+        for most of an artist channel's uploads.
+        
+        Args:
+            query (str): Search query (usually song or video title)
+            artist (str): Artist name to improve search accuracy
+            limit (int): Number of results to return (default Config.SPOTIFY_SEARCH_LIMIT)
+            channel_title (str): YouTube channel name, used as an artist hint
+            channel_id (str): YouTube channel ID, to look up a learned artist
+            
+        Returns:
+            dict: Track 'id', 'name', 'artist', 'artist_id', the 'method' that found it
+                and its match 'confidence', or None if no track was confident enough
+        """
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        from spotipy.exceptions import SpotifyException
+        
+        limit = limit or self.config.SPOTIFY_SEARCH_LIMIT
+        mapped = self.channel_artists.get(channel_id)
         try:
-            # Clean the query
-            clean_query = clean_title(query)
+            # Every candidate track is scored against the same title
+            self.scorer.limit_cache()
+            if mapped:
+                match = self._match_top_tracks(mapped[0], query)
+                if match:
+                    logger.debug("Found track (mapped artist): %s by %s", match['name'], match['artist'],
+                                 extra=PER_ITEM)
+                    return match
             
-            # Build search query
-            search_query = clean_query
-            if artist:
-                search_query += f" artist:{artist}"
+            plan = self.query_planner.plan(query, channel_title=channel_title, artist=artist,
+                                           max_queries=self.config.MAX_SEARCHES_PER_VIDEO)
+            self.query_planner.record_plan()
             
-            # Search for tracks
-            results = self.sp.search(q=search_query, type='track', limit=limit)
+            best = None
+            for candidate in plan:
+                results = self._request(self.sp.search, q=candidate.query, type='track', limit=limit)
+                tracks = results['tracks']['items']
+                match = None
+                if tracks:
+                    match = self._describe_match(tracks[0], candidate.strategy)
+                    match['confidence'] = round(self.scorer.score_pair(query, match['name'], match['artist']), 3)
+                
+                confident = bool(match) and match['confidence'] >= self.config.SPOTIFY_MIN_CONFIDENCE
+                self.query_planner.record(candidate.strategy, confident)
+                if confident:
+                    logger.debug("Found track (%s): %s by %s", candidate.strategy, match['name'],
+                                 match['artist'], extra=PER_ITEM)
+                    return match
+                if match and (not best or match['confidence'] > best['confidence']):
+                    best = match
+            
+            if best:
+                logger.debug("Rejected low-confidence track (%s, %.2f): %s by %s", best['method'],
+                             best['confidence'], best['name'], best['artist'], extra=PER_ITEM)
+            else:
+                logger.debug("No track found for query: %s", query, extra=PER_ITEM)
+            return None
+            
+        except SpotifyException as e:
+            if e.http_status == 429:
+                # Reporting the track as not found would silently drop it
+                raise Exception(f"Spotify rate limit exceeded: {str(e)}")
+            logger.error(f"Spotify search error: {str(e)}")
+            return None
+    
+    def search_by_isrc(self, isrc):
+        """
+        Look up a track by its ISRC.
+        
+        Args:
+            isrc (str): International Standard Recording Code
+            
+        Returns:
+            str: Spotify track ID if found, None otherwise
+        """
+        match = self.match_isrc(isrc)
+        return match['id'] if match else None
+    
+    def match_isrc(self, isrc):
+        """
+        Look up a track by its ISRC and describe the match.
+        
+        Args:
+            isrc (str): International Standard Recording Code
+            
+        Returns:
+            dict: Track 'id', 'name', 'artist', 'artist_id' and 'method', or None if not found
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        from spotipy.exceptions import SpotifyException
+        
+        try:
+            results = self._request(self.sp.search, q=f"isrc:{isrc}", type='track', limit=1)
             tracks = results['tracks']['items']
             
             if tracks:
                 track = tracks[0]
-                logger.debug(f"Found track: {track['name']} by {track['artists'][0]['name']}")
-                return track['id']
-            
-            # If no results with artist, try without artist filter
-            if artist:
-                results = self.sp.search(q=clean_query, type='track', limit=limit)
-                tracks = results['tracks']['items']
-                if tracks:
-                    track = tracks[0]
-                    logger.debug(f"Found track (fallback): {track['name']} by {track['artists'][0]['name']}")
-                    return track['id']
+                logger.debug("Found track by ISRC %s: %s by %s", isrc, track['name'], track['artists'][0]['name'],
+                             extra=PER_ITEM)
+                return self._describe_match(track, 'isrc')
             
-            logger.debug(f"No track found for query: {query}")
+            logger.debug("No track found for ISRC: %s", isrc, extra=PER_ITEM)
             return None
             
         except SpotifyException as e:
-            logger.error(f"Spotify search error: {str(e)}")
+            if e.http_status == 429:
+                raise Exception(f"Spotify rate limit exceeded: {str(e)}")
+            logger.error(f"Spotify ISRC search error: {str(e)}")
+            return None
+    
+    def find_artist(self, name):
+        """
+        Look up an artist by name, ignoring case and spacing.
+        
+        Args:
+            name (str): Artist name
+            
+        Returns:
+            dict: Artist 'id' and 'name', or None if no artist has that name
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        found, artist = self.catalog_cache.get_artist(name)
+        if found:
+            return artist
+        
+        results = self._request(self.sp.search, q=f'artist:"{name}"', type='artist', limit=5)
+        artist = next((
+            {'id': item['id'], 'name': item['name']}
+            for item in results['artists']['items']
+            if normalize_artist_name(item['name']) == normalize_artist_name(name)
+        ), None)
+        self.catalog_cache.put_artist(name, artist)
+        return artist
+    
+    def get_artist_catalog(self, artist_id, max_requests=None):
+        """
+        Get every track on an artist's albums and singles.
+        
+        The album list is paged concurrently, full albums are fetched 20 at
+        a time and only albums over 50 tracks need their own track pages,
+        so a discography costs a handful of requests. Only the first
+        ARTIST_CATALOG_MAX_ALBUMS albums listed are fetched, which bounds the
+        requests and memory a prolific artist can take. Catalogues are
+        cached per process for ARTIST_CATALOG_TTL_SECONDS.
+        
+        Args:
+            artist_id (str): Spotify artist ID
+            max_requests (int): Give up, after at most the first album page,
+                if the catalogue would take more requests than this; albums
+                past the budget keep only their first 50 tracks
+            
+        Returns:
+            list: Track dicts with 'id', 'name', 'artist' and 'artist_id',
+                in album order, or None if the catalogue is over budget
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        tracks = self.catalog_cache.get_catalog(artist_id)
+        if tracks is not None:
+            return tracks
+        
+        def fetch_albums(offset):
+            return self._request(self.sp.artist_albums, artist_id, album_type='album,single',
+                                 limit=ARTIST_ALBUMS_PAGE_SIZE, offset=offset)
+        
+        # The album count is remembered, so an artist over budget costs one request per process
+        first_page = None
+        album_total = self.catalog_cache.get_album_count(artist_id)
+        if album_total is None:
+            first_page = fetch_albums(0)
+            album_total = first_page['total']
+            self.catalog_cache.put_album_count(artist_id, album_total)
+        album_count = min(album_total, self.config.ARTIST_CATALOG_MAX_ALBUMS)
+        requests = (max(1, math.ceil(album_count / ARTIST_ALBUMS_PAGE_SIZE)) +
+                    math.ceil(album_count / ALBUMS_PER_REQUEST))
+        if max_requests is not None and requests > max_requests:
+            logger.info("Skipped the catalogue of artist %s: %s albums would take %s requests",
+                        artist_id, album_total, requests)
+            return None
+        
+        pages = self._fetch_pages(fetch_albums, ARTIST_ALBUMS_PAGE_SIZE, first_page=first_page,
+                                  max_items=album_count)
+        album_ids = list(dict.fromkeys(album['id'] for page in pages for album in page['items']))[:album_count]
+        
+        tracks = []
+        for start in range(0, len(album_ids), ALBUMS_PER_REQUEST):
+            albums = self._request(self.sp.albums, album_ids[start:start + ALBUMS_PER_REQUEST])['albums']
+            for album in albums:
+                if not album:
+                    continue
+                items = album['tracks']['items']
+                extra_pages = math.ceil(album['tracks']['total'] / ALBUM_TRACKS_PAGE_SIZE) - 1
+                if album['tracks'].get('next') and (max_requests is None or requests + extra_pages <= max_requests):
+                    items = self._fetch_album_tracks(album['id'])
+                    requests += extra_pages
+                tracks.extend(self._describe_track(item) for item in items if item and item.get('id'))
+        
+        logger.info("Fetched the catalogue of artist %s: %s tracks on %s albums",
+                    artist_id, len(tracks), len(album_ids))
+        self.catalog_cache.put_catalog(artist_id, tracks)
+        return tracks
+    
+    def get_artist_top_tracks(self, artist_id):
+        """
+        Get an artist's most popular tracks.
+        
+        One request per artist, cached per process like catalogues.
+        
+        Args:
+            artist_id (str): Spotify artist ID
+            
+        Returns:
+            list: Track dicts with 'id', 'name', 'artist' and 'artist_id'
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        tracks = self.catalog_cache.get_top_tracks(artist_id)
+        if tracks is not None:
+            return tracks
+        
+        results = self._request(self.sp.artist_top_tracks, artist_id)
+        tracks = [self._describe_track(track) for track in results['tracks'] if track and track.get('id')]
+        self.catalog_cache.put_top_tracks(artist_id, tracks)
+        return tracks
+    
+    def _match_top_tracks(self, artist_id, query):
+        """Best of an artist's top tracks for a title, if it scores at least SPOTIFY_MIN_CONFIDENCE."""
+        best, best_confidence = None, 0.0
+        for track in self.get_artist_top_tracks(artist_id):
+            confidence = self.scorer.score_pair(query, track['name'], track['artist'])
+            if confidence > best_confidence:
+                best, best_confidence = track, confidence
+        
+        if best_confidence < self.config.SPOTIFY_MIN_CONFIDENCE:
             return None
+        return dict(best, method='mapped_artist', confidence=round(best_confidence, 3))
+    
+    def _fetch_album_tracks(self, album_id):
+        pages = self._fetch_pages(
+            lambda offset: self._request(self.sp.album_tracks, album_id, limit=ALBUM_TRACKS_PAGE_SIZE, offset=offset),
+            ALBUM_TRACKS_PAGE_SIZE
+        )
+        return [item for page in pages for item in page['items']]
+    
+    @staticmethod
+    def _describe_track(track):
+        """Reduce a Spotify track object to its ID, name and first artist."""
+        return {
+            'id': track['id'],
+            'name': track['name'],
+            'artist': track['artists'][0]['name'] if track.get('artists') else None,
+            'artist_id': track['artists'][0]['id'] if track.get('artists') else None
+        }
+    
+    @classmethod
+    def _describe_match(cls, track, method):
+        """Reduce a Spotify track object to the fields kept for a match."""
+        return dict(cls._describe_track(track), method=method)
     
     def create_playlist(self, user_id, name, description="", public=True):
         """
@@ -141,8 +614,11 @@ class SpotifyService:
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        from spotipy.exceptions import SpotifyException
+        
         try:
-            playlist = self.sp.user_playlist_create(
+            playlist = self._request(
+                self.sp.user_playlist_create,
                 user_id, 
                 name, 
                 public=public, 
@@ -150,6 +626,8 @@ class SpotifyService:
             )
             
             logger.info(f"Created playlist: {name} (ID: {playlist['id']})")
+            with self._playlists_lock:
+                self._playlists_cache.pop(user_id, None)
             return {
                 'id': playlist['id'],
                 'name': playlist['name'],
@@ -161,13 +639,19 @@ class SpotifyService:
             logger.error(f"Failed to create playlist: {str(e)}")
             raise Exception(f"Failed to create playlist: {str(e)}")
     
-    def add_tracks_to_playlist(self, playlist_id, track_ids):
+    def add_tracks_to_playlist(self, playlist_id, track_ids, on_batch=None, skip_existing=False,
+                               preserve_positions=False):
         """
         Add tracks to a Spotify playlist.
         
         Args:
             playlist_id (str): Spotify playlist ID
             track_ids (list): List of Spotify track IDs
+            on_batch (callable): Called as on_batch(tracks_added, total_tracks) after each batch
+            skip_existing (bool): Diff against the playlist's current tracks and
+                only add the ones it is missing
+            preserve_positions (bool): With skip_existing, insert missing tracks
+                at their place in track_ids instead of appending them
             
         Returns:
             bool: True if successful, False otherwise
@@ -175,28 +659,169 @@ class SpotifyService:
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        from spotipy.exceptions import SpotifyException
+        
         if not track_ids:
             logger.warning("No track IDs provided")
             return True
         
         try:
+            if skip_existing:
+                existing = self.get_playlist_track_ids(playlist_id)
+                runs = diff_playlist_tracks(existing, track_ids, preserve_positions)
+                missing_count = sum(len(run_track_ids) for _, run_track_ids in runs)
+                logger.info("Playlist %s already has %s of %s tracks; adding %s",
+                            playlist_id, len(track_ids) - missing_count, len(track_ids), missing_count)
+            else:
+                runs = [(None, track_ids)]
+                missing_count = len(track_ids)
+            
             # Spotify API allows max 100 tracks per request
             max_tracks = self.config.MAX_TRACKS_PER_REQUEST
+            added = 0
             
-            for i in range(0, len(track_ids), max_tracks):
-                batch = track_ids[i:i + max_tracks]
-                track_uris = [f"spotify:track:{track_id}" for track_id in batch]
-                
-                self.sp.playlist_add_items(playlist_id, track_uris)
-                logger.debug(f"Added {len(batch)} tracks to playlist {playlist_id}")
+            for position, run_track_ids in runs:
+                for i in range(0, len(run_track_ids), max_tracks):
+                    batch = run_track_ids[i:i + max_tracks]
+                    track_uris = [f"spotify:track:{track_id}" for track_id in batch]
+                    
+                    self._request(self.sp.playlist_add_items, playlist_id, track_uris,
+                                  position=None if position is None else position + i)
+                    added += len(batch)
+                    logger.debug("Added %s tracks to playlist %s", len(batch), playlist_id)
+                    
+                    if on_batch:
+                        on_batch(added, missing_count)
             
-            logger.info(f"Successfully added {len(track_ids)} tracks to playlist {playlist_id}")
+            if runs:
+                # The playlist has a new snapshot now
+                with self._playlists_lock:
+                    self._snapshots.pop(playlist_id, None)
+            
+            logger.info(f"Successfully added {added} tracks to playlist {playlist_id}")
             return True
             
         except SpotifyException as e:
             logger.error(f"Failed to add tracks to playlist: {str(e)}")
             return False
     
+    def get_playlist_track_ids(self, playlist_id):
+        """
+        Get the track IDs currently in a playlist.
+        
+        Only the playlist's snapshot_id is requested when it hasn't changed
+        since the last call; otherwise every page of items is fetched, the
+        pages after the first concurrently, and the snapshot_id is checked
+        again afterwards. Items read while the playlist was being edited are
+        returned but not cached, so they never stand for a snapshot they
+        don't belong to.
+        
+        Args:
+            playlist_id (str): Spotify playlist ID
+            
+        Returns:
+            list: Track IDs in playlist order (None for items without one,
+                such as local files)
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        snapshot_id = self._request(self.sp.playlist, playlist_id, fields='snapshot_id')['snapshot_id']
+        with self._playlists_lock:
+            cached = self._snapshots.get(playlist_id)
+        if cached and cached[0] == snapshot_id:
+            return list(cached[1])
+        
+        pages = self._fetch_pages(
+            lambda offset: self._request(self.sp.playlist_items, playlist_id, fields='items(track(id)),total',
+                                         limit=PLAYLIST_ITEMS_PAGE_SIZE, offset=offset,
+                                         additional_types=('track',)),
+            PLAYLIST_ITEMS_PAGE_SIZE
+        )
+        track_ids = [(item.get('track') or {}).get('id') for page in pages for item in page['items']]
+        logger.info("Fetched %s items of playlist %s in %s pages", len(track_ids), playlist_id, len(pages))
+        
+        if self._request(self.sp.playlist, playlist_id, fields='snapshot_id')['snapshot_id'] != snapshot_id:
+            logger.info("Playlist %s changed while its items were fetched; not caching them", playlist_id)
+            return track_ids
+        
+        with self._playlists_lock:
+            self._snapshots.pop(playlist_id, None)
+            if len(self._snapshots) >= self.config.SNAPSHOT_CACHE_SIZE:
+                self._snapshots.pop(next(iter(self._snapshots)))
+            self._snapshots[playlist_id] = (snapshot_id, track_ids)
+        return list(track_ids)
+    
+    def extract_playlist_id(self, playlist_url):
+        """
+        Extract playlist ID from a Spotify URL.
+        
+        Args:
+            playlist_url (str): Spotify playlist URL or spotify:playlist: URI
+            
+        Returns:
+            str: Playlist ID
+            
+        Raises:
+            ValueError: If URL is invalid
+        """
+        if not playlist_url:
+            raise ValueError("Playlist URL cannot be empty")
+        
+        match = SPOTIFY_PLAYLIST_PATTERN.search(playlist_url)
+        if not match:
+            raise ValueError("Invalid Spotify playlist URL")
+        return match.group(1)
+    
+    def get_playlist_tracks_page(self, playlist_id, offset=0, limit=100):
+        """
+        Fetch one page of a Spotify playlist's tracks.
+        
+        Local files, podcast episodes and removed tracks are skipped.
+        
+        Args:
+            playlist_id (str): Spotify playlist ID
+            offset (int): Index of the first item to fetch
+            limit (int): Page size, at most 100
+            
+        Returns:
+            tuple: (list of track dicts with 'id', 'name', 'artists', 'isrc'
+                and 'duration_ms', offset of the next page or None)
+        """
+        if not self.sp:
+            raise Exception("Spotify service not authenticated")
+        
+        from spotipy.exceptions import SpotifyException
+        
+        try:
+            page = self._request(
+                self.sp.playlist_items,
+                playlist_id,
+                fields=PLAYLIST_ITEM_FIELDS,
+                limit=limit,
+                offset=offset,
+                additional_types=('track',)
+            )
+        except SpotifyException as e:
+            logger.error(f"Failed to get playlist tracks: {str(e)}")
+            raise Exception(f"Failed to fetch playlist tracks: {str(e)}")
+        
+        tracks = []
+        for item in page['items']:
+            track = item.get('track')
+            if not track or item.get('is_local') or not track.get('id') or track.get('type', 'track') != 'track':
+                continue
+            tracks.append({
+                'id': track['id'],
+                'name': track['name'],
+                'artists': [artist['name'] for artist in track.get('artists', [])],
+                'isrc': (track.get('external_ids') or {}).get('isrc'),
+                'duration_ms': track.get('duration_ms')
+            })
+        
+        next_offset = offset + len(page['items']) if page.get('next') else None
+        return tracks, next_offset
+    
     def get_playlist_info(self, playlist_id):
         """
         Get information about a Spotify playlist.
@@ -210,8 +835,10 @@ class SpotifyService:
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        from spotipy.exceptions import SpotifyException
+        
         try:
-            playlist = self.sp.playlist(playlist_id)
+            playlist = self._request(self.sp.playlist, playlist_id)
             return {
                 'id': playlist['id'],
                 'name': playlist['name'],
@@ -226,13 +853,17 @@ class SpotifyService:
             logger.error(f"Failed to get playlist info: {str(e)}")
             return None
     
-    def get_user_playlists(self, user_id, limit=50):
+    def get_user_playlists(self, user_id, limit=None):
         """
-        Get user's playlists.
+        Get all of a user's playlists.
+        
+        The first page gives the total; the remaining pages are fetched
+        concurrently. Results are cached per user for PLAYLIST_CACHE_SECONDS,
+        and create_playlist() drops the cached list.
         
         Args:
             user_id (str): Spotify user ID
-            limit (int): Maximum number of playlists to return
+            limit (int): Maximum number of playlists to return (all by default)
             
         Returns:
             list: List of playlist information
@@ -240,21 +871,87 @@ class SpotifyService:
         if not self.sp:
             raise Exception("Spotify service not authenticated")
         
+        with self._playlists_lock:
+            cached = self._playlists_cache.get(user_id)
+        if cached and time.monotonic() - cached[0] < self.config.PLAYLIST_CACHE_SECONDS:
+            return cached[1][:limit]
+        
+        from spotipy.exceptions import SpotifyException
+        
         try:
-            results = self.sp.user_playlists(user_id, limit=limit)
-            playlists = []
+            playlists = self._fetch_user_playlists(user_id)
+        except SpotifyException as e:
+            logger.error(f"Failed to get user playlists: {str(e)}")
+            return []
+        
+        with self._playlists_lock:
+            self._playlists_cache[user_id] = (time.monotonic(), playlists)
+        return playlists[:limit]
+    
+    def find_user_playlist(self, user_id, name):
+        """
+        Find one of a user's own playlists by name (case-insensitive).
+        
+        Playlists the user only follows are skipped: they are listed too,
+        but adding tracks to them fails.
+        
+        Args:
+            user_id (str): Spotify user ID
+            name (str): Playlist name
             
-            for playlist in results['items']:
+        Returns:
+            dict: The first playlist the user owns with that name, or None
+        """
+        name = name.strip().lower()
+        for playlist in self.get_user_playlists(user_id):
+            if playlist['owner_id'] == user_id and playlist['name'].strip().lower() == name:
+                return playlist
+        return None
+    
+    def _fetch_user_playlists(self, user_id):
+        """Fetch every page of a user's playlists."""
+        pages = self._fetch_pages(
+            lambda offset: self._request(self.sp.user_playlists, user_id, limit=PLAYLISTS_PAGE_SIZE, offset=offset),
+            PLAYLISTS_PAGE_SIZE
+        )
+        
+        playlists = []
+        for page in pages:
+            for playlist in page['items']:
+                if not playlist:
+                    continue
                 playlists.append({
                     'id': playlist['id'],
                     'name': playlist['name'],
                     'track_count': playlist['tracks']['total'],
                     'public': playlist['public'],
+                    'owner_id': (playlist.get('owner') or {}).get('id'),
                     'url': playlist['external_urls']['spotify']
                 })
+        
+        logger.info("Fetched %s playlists of user %s in %s pages", len(playlists), user_id, len(pages))
+        return playlists
+    
+    def _fetch_pages(self, fetch_page, page_size, first_page=None, max_items=None):
+        """
+        Fetch every page of a paged endpoint: the first one for the total, the rest concurrently.
+        
+        Args:
+            fetch_page (callable): Called as fetch_page(offset); returns a page with 'total'
+            page_size (int): Items per page
+            first_page (dict): The first page, if the caller already fetched it
+            max_items (int): Stop after the page holding this many items
             
-            return playlists
-            
-        except SpotifyException as e:
-            logger.error(f"Failed to get user playlists: {str(e)}")
-            return [] 
\ No newline at end of file
+        Returns:
+            list: Pages in offset order
+        """
+        first_page = first_page or fetch_page(0)
+        pages = [first_page]
+        
+        total = first_page['total'] if max_items is None else min(first_page['total'], max_items)
+        offsets = list(range(page_size, total, page_size))
+        if offsets:
+            # Pages go through the shared rate limiter, so this only overlaps their latency
+            with ThreadPoolExecutor(max_workers=min(self.config.PAGE_FETCH_WORKERS, len(offsets))) as executor:
+                pages.extend(executor.map(fetch_page, offsets))
+        return pages
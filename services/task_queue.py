@@ -0,0 +1,580 @@
+import json
+import logging
+import time
+import uuid
+from config.settings import Config
+from services.transfer_service import TransferError
+
+logger = logging.getLogger(__name__)
+
+# Ring of users with queued tasks, and each user's unspent share (deficit round robin)
+USERS_KEY = 'transfer:users'
+DEFICITS_KEY = 'transfer:deficits'
+# Pushed whenever a task is queued or finishes, to wake idle workers
+WAKEUP_KEY = 'transfer:wakeup'
+# Single list that workers before fair scheduling queued every task on
+LEGACY_TASKS_KEY = 'transfer:tasks'
+# Dequeued tasks: lease ID -> lease deadline, lease ID -> task, and lease ID ->
+# deliveries so far; a task whose lease runs out is put back on its job's queue.
+# Each user's in-flight tasks are also kept in a sorted set of lease ID -> lease
+# deadline, so a slot held by a dead worker frees itself when the lease runs out.
+LEASES_KEY = 'transfer:leases'
+LEASED_KEY = 'transfer:leased'
+ATTEMPTS_KEY = 'transfer:attempts'
+# Expired leases reclaimed per dequeue call
+RECLAIM_BATCH = 16
+# Job owners remembered per process, so enqueueing a task does not re-read the job state
+JOB_USER_CACHE_SIZE = 1024
+
+# Queue a task on its job's list. Invariants: a job is in its user's ring
+# while its list is non-empty, and a user is in USERS_KEY while their ring is.
+_ENQUEUE_LUA = """
+if not redis.call('SET', KEYS[1], 'queued', 'NX', 'EX', ARGV[4]) then
+    return 0
+end
+if redis.call('RPUSH', KEYS[2], ARGV[3]) == 1 then
+    if redis.call('RPUSH', KEYS[3], ARGV[1]) == 1 then
+        redis.call('RPUSH', KEYS[4], ARGV[2])
+    end
+end
+redis.call('LPUSH', KEYS[5], '1')
+redis.call('LTRIM', KEYS[5], 0, 63)
+return 1
+"""
+
+# One scheduling step on the user at the head of the ring (ARGV[1]) and the
+# job at the head of their ring (ARGV[2], '' if none): the user is served
+# while their deficit covers the task's cost; otherwise they are topped up by
+# the quantum and go to the back. Users at their in-flight cap are skipped,
+# and a served task moves its job to the back of the user's own ring.
+# Returns the served task and its delivery count, or false to take another
+# step (also when another worker moved the ring since ARGV was read).
+_DEQUEUE_LUA = """
+local function rotate(key)
+    redis.call('RPUSH', key, redis.call('LPOP', key))
+end
+local function retire()
+    if redis.call('LLEN', KEYS[3]) == 0 then
+        redis.call('LPOP', KEYS[1])
+        redis.call('HDEL', KEYS[2], ARGV[1])
+    end
+end
+
+if redis.call('LINDEX', KEYS[1], 0) ~= ARGV[1] or (redis.call('LINDEX', KEYS[3], 0) or '') ~= ARGV[2] then
+    return false
+end
+local raw = ARGV[2] ~= '' and redis.call('LINDEX', KEYS[5], 0)
+if not raw then
+    -- A job list that expired or was deleted under the ring
+    if ARGV[2] ~= '' then
+        redis.call('LPOP', KEYS[3])
+    end
+    retire()
+    return false
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[4], '-inf', ARGV[5])
+if redis.call('ZCARD', KEYS[4]) >= tonumber(ARGV[4]) then
+    rotate(KEYS[1])
+    return false
+end
+local cost = tonumber(cjson.decode(raw)['cost'])
+local deficit = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0')
+if deficit < cost then
+    redis.call('HSET', KEYS[2], ARGV[1], deficit + tonumber(ARGV[3]))
+    rotate(KEYS[1])
+    return false
+end
+
+redis.call('HSET', KEYS[2], ARGV[1], deficit - cost)
+redis.call('LPOP', KEYS[5])
+if redis.call('LLEN', KEYS[5]) == 0 then
+    redis.call('LPOP', KEYS[3])
+else
+    rotate(KEYS[3])
+end
+retire()
+
+local task = cjson.decode(raw)
+local lease = task['job_id'] .. ':' .. task['key']
+redis.call('ZADD', KEYS[6], ARGV[6], lease)
+redis.call('HSET', KEYS[7], lease, raw)
+redis.call('ZADD', KEYS[4], ARGV[6], lease)
+redis.call('EXPIRE', KEYS[4], ARGV[7])
+return {raw, tonumber(redis.call('HGET', KEYS[8], lease) or '0')}
+"""
+
+# Put a task whose lease ran out back at the head of its job's queue, keeping
+# the ring invariants of _ENQUEUE_LUA, or give up on it once it has been
+# delivered max_attempts times. Does nothing if the lease was renewed or released.
+_REQUEUE_LUA = """
+local deadline = redis.call('ZSCORE', KEYS[1], ARGV[1])
+local raw = redis.call('HGET', KEYS[2], ARGV[1])
+if not deadline or tonumber(deadline) > tonumber(ARGV[2]) then
+    return false
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('ZREM', KEYS[7], ARGV[1])
+if not raw then
+    return false
+end
+if redis.call('HINCRBY', KEYS[3], ARGV[1], 1) >= tonumber(ARGV[3]) then
+    redis.call('HDEL', KEYS[3], ARGV[1])
+    return 'exhausted'
+end
+if redis.call('LPUSH', KEYS[4], raw) == 1 then
+    if redis.call('RPUSH', KEYS[5], ARGV[4]) == 1 then
+        redis.call('RPUSH', KEYS[6], ARGV[5])
+    end
+end
+redis.call('LPUSH', KEYS[8], '1')
+redis.call('LTRIM', KEYS[8], 0, 63)
+return 'requeued'
+"""
+
+# Extend (ARGV[3] set) or drop a lease, if it still belongs to this delivery
+_LEASE_LUA = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1])
+        or tonumber(redis.call('HGET', KEYS[3], ARGV[1]) or '0') ~= tonumber(ARGV[2]) then
+    return 0
+end
+if ARGV[3] then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+    redis.call('ZADD', KEYS[4], ARGV[3], ARGV[1])
+    redis.call('EXPIRE', KEYS[4], ARGV[4])
+    return 1
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('HDEL', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[3], ARGV[1])
+redis.call('ZREM', KEYS[4], ARGV[1])
+redis.call('LPUSH', KEYS[5], '1')
+redis.call('LTRIM', KEYS[5], 0, 63)
+return 1
+"""
+
+# Move the task at the head of the legacy list (if still ARGV[1]) onto its
+# job's queue as ARGV[2], keeping the ring invariants of _ENQUEUE_LUA
+_ADOPT_LUA = """
+if redis.call('LINDEX', KEYS[1], 0) ~= ARGV[1] then
+    return 0
+end
+redis.call('LPOP', KEYS[1])
+if redis.call('RPUSH', KEYS[2], ARGV[2]) == 1 then
+    if redis.call('RPUSH', KEYS[3], ARGV[3]) == 1 then
+        redis.call('RPUSH', KEYS[4], ARGV[4])
+    end
+end
+redis.call('LPUSH', KEYS[5], '1')
+redis.call('LTRIM', KEYS[5], 0, 63)
+return 1
+"""
+
+# Store one indexed part of a job's output and add to its counters, only the
+# first time that part is stored
+_COMMIT_PART_LUA = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return false
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+local totals = {}
+for i = 4, #ARGV, 2 do
+    totals[#totals + 1] = redis.call('HINCRBY', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+return totals
+"""
+
+class TaskQueue:
+    """
+    Redis-backed queue of conversion tasks shared by every worker process.
+    
+    Each task has a key that is unique within its job. A key can only be
+    queued once, so racing producers never queue the same work twice. Job
+    state, counters and progress events also live in Redis, so any web
+    process can report on a job that any worker runs.
+    
+    Delivery is at least once: a dequeued task is leased for lease_seconds,
+    renewed while its worker is alive, and put back on its job's queue if
+    the lease runs out (the worker died). After max_attempts deliveries
+    its job is failed instead. A redelivered task may repeat some of the
+    API calls its first delivery made, so handlers must be idempotent:
+    commit_part() adds a part's counters only once, and a task whose key
+    is marked done is skipped.
+    
+    Tasks are scheduled fairly rather than first come, first served: users
+    with queued work take turns by deficit round robin, each turn worth
+    `quantum` units of task cost (videos searched), a user's jobs take
+    turns within that share, and no user has more than `max_running` tasks
+    in flight. A huge playlist therefore cannot starve small conversions.
+    """
+    
+    def __init__(self, redis_url, ttl_seconds=86400, max_events=500, quantum=None, max_running=None,
+                 lease_seconds=None, max_attempts=None):
+        import redis
+        config = Config()
+        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_events = max_events
+        self.quantum = quantum or config.FAIR_SHARE_QUANTUM
+        self.max_running = max_running or config.USER_MAX_RUNNING_TASKS
+        self.lease_seconds = lease_seconds or config.TASK_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.TASK_MAX_ATTEMPTS
+        self._enqueue = self.redis.register_script(_ENQUEUE_LUA)
+        self._dequeue = self.redis.register_script(_DEQUEUE_LUA)
+        self._requeue = self.redis.register_script(_REQUEUE_LUA)
+        self._lease = self.redis.register_script(_LEASE_LUA)
+        self._commit_part = self.redis.register_script(_COMMIT_PART_LUA)
+        self._adopt = self.redis.register_script(_ADOPT_LUA)
+        # job ID -> owning user; a job never changes owner
+        self._job_users = {}
+    
+    def enqueue(self, job_id, task_type, key, cost=1, **payload):
+        """
+        Queue a task unless a task with the same key was queued for the job.
+        
+        Args:
+            job_id (str): Conversion job ID
+            task_type (str): Handler name
+            key (str): Idempotency key, unique within the job
+            cost (int): Share of the user's turn the task uses (e.g. videos to search)
+            **payload: JSON-serializable task arguments
+            
+        Returns:
+            bool: True if the task was queued, False if it was a duplicate
+        """
+        user_id = self._job_user(job_id)
+        task = {'job_id': job_id, 'user_id': user_id, 'type': task_type, 'key': key,
+                'cost': max(1, cost), 'payload': payload}
+        queued = self._enqueue(
+            keys=[self._key(job_id, 'task', key), self._key(job_id, 'queue'),
+                  self._user_key(user_id, 'jobs'), USERS_KEY, WAKEUP_KEY],
+            args=[job_id, user_id, json.dumps(task), self.ttl_seconds]
+        )
+        if not queued:
+            logger.debug("Skipped duplicate task %s for job %s", key, job_id)
+            return False
+        return True
+    
+    def dequeue(self, timeout=5):
+        """
+        Take the next task in fair order, waiting up to timeout seconds for one.
+        
+        The task is leased: it counts against its user's in-flight cap and
+        is redelivered unless release() is called for it before its lease
+        runs out. Long tasks keep their lease with renew(). Expired leases
+        of other workers are reclaimed first.
+        
+        Returns:
+            dict: The task, with 'attempt' (0 for the first delivery), or
+                None if there was none to run
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.reclaim()
+            task = self._schedule()
+            if task:
+                return task
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self.redis.blpop(WAKEUP_KEY, timeout=max(1, int(remaining)))
+    
+    def renew(self, task):
+        """
+        Extend a dequeued task's lease by lease_seconds.
+        
+        Returns:
+            bool: False if the lease was already lost (the task may be
+                running elsewhere)
+        """
+        return bool(self._lease(keys=self._lease_keys(task),
+                                args=[self._lease_id(task), task['attempt'], time.time() + self.lease_seconds,
+                                      self.lease_seconds]))
+    
+    def release(self, task):
+        """Drop a dequeued task's lease and free the in-flight slot it held for its user."""
+        self._lease(keys=self._lease_keys(task), args=[self._lease_id(task), task['attempt']])
+    
+    def reclaim(self):
+        """
+        Redeliver tasks whose lease ran out, failing the job of any task out of attempts.
+        
+        Returns:
+            int: Number of expired leases handled
+        """
+        expired = self.redis.zrangebyscore(LEASES_KEY, '-inf', time.time(), start=0, num=RECLAIM_BATCH)
+        for lease_id in expired:
+            raw = self.redis.hget(LEASED_KEY, lease_id)
+            task = json.loads(raw) if raw else {'job_id': '', 'user_id': ''}
+            outcome = self._requeue(
+                keys=[LEASES_KEY, LEASED_KEY, ATTEMPTS_KEY, self._key(task['job_id'], 'queue'),
+                      self._user_key(task['user_id'], 'jobs'), USERS_KEY,
+                      self._user_key(task['user_id'], 'running'), WAKEUP_KEY],
+                args=[lease_id, time.time(), self.max_attempts, task['job_id'], task['user_id']]
+            )
+            if outcome == 'requeued':
+                logger.warning("Lease of task %s of job %s ran out; redelivering it", task['key'], task['job_id'])
+            elif outcome == 'exhausted':
+                logger.error("Task %s of job %s was delivered %s times; failing the job",
+                             task['key'], task['job_id'], self.max_attempts)
+                self.fail_job(task['job_id'], 'The conversion was interrupted too many times. Please try again.')
+        return len(expired)
+    
+    def adopt_legacy_tasks(self):
+        """
+        Move tasks left on the single queue of workers that predate fair
+        scheduling onto their jobs' queues, so they run after a deploy.
+        
+        Returns:
+            int: Number of tasks moved
+        """
+        adopted = 0
+        while True:
+            raw = self.redis.lindex(LEGACY_TASKS_KEY, 0)
+            if raw is None:
+                return adopted
+            task = json.loads(raw)
+            job_id = task['job_id']
+            user_id = self._job_user(job_id)
+            task.setdefault('user_id', user_id)
+            task.setdefault('cost', max(1, len(task['payload'].get('videos', []))))
+            adopted += self._adopt(
+                keys=[LEGACY_TASKS_KEY, self._key(job_id, 'queue'), self._user_key(user_id, 'jobs'), USERS_KEY,
+                      WAKEUP_KEY],
+                args=[raw, json.dumps(task), job_id, user_id]
+            )
+    
+    def get_stats(self):
+        """
+        Report what the fair scheduler is holding.
+        
+        Returns:
+            dict: Users and jobs with queued tasks, and the number of queued tasks
+        """
+        users = self.redis.lrange(USERS_KEY, 0, -1)
+        pipe = self.redis.pipeline()
+        for user_id in users:
+            pipe.lrange(self._user_key(user_id, 'jobs'), 0, -1)
+        jobs = [job_id for user_jobs in pipe.execute() for job_id in user_jobs]
+        
+        pipe = self.redis.pipeline()
+        for job_id in jobs:
+            pipe.llen(self._key(job_id, 'queue'))
+        return {'active_users': len(users), 'active_jobs': len(jobs), 'queued_tasks': sum(pipe.execute())}
+    
+    def is_done(self, task):
+        """Check whether a task has already been completed."""
+        return self.redis.get(self._key(task['job_id'], 'task', task['key'])) == 'done'
+    
+    def mark_done(self, task):
+        """Record that a task completed, so a redelivered copy is skipped."""
+        self.redis.set(self._key(task['job_id'], 'task', task['key']), 'done', ex=self.ttl_seconds)
+    
+    def save_job(self, job_id, **fields):
+        """Set fields of a job's state hash."""
+        key = self._key(job_id, 'state')
+        pipe = self.redis.pipeline()
+        pipe.hset(key, mapping={name: json.dumps(value) for name, value in fields.items()})
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+    
+    def get_job(self, job_id):
+        """Get a job's state hash, or None if unknown or expired."""
+        state = self.redis.hgetall(self._key(job_id, 'state'))
+        return {name: json.loads(value) for name, value in state.items()} if state else None
+    
+    def increment(self, job_id, field, amount=1):
+        """Atomically add to a job counter and return the new value."""
+        return self.redis.hincrby(self._key(job_id, 'state'), field, amount)
+    
+    def commit_part(self, job_id, name, index, value, **counters):
+        """
+        Store one indexed part of a job's output and add to job counters, once.
+        
+        A redelivered task that commits the same part again changes nothing,
+        so its counters are never added twice.
+        
+        Args:
+            job_id (str): Conversion job ID
+            name (str): Output name, e.g. 'tracks'
+            index (int): Part index (e.g. a chunk's offset)
+            value: JSON-serializable part
+            **counters: Job state counters to increment, and by how much
+            
+        Returns:
+            dict: New value of each counter, or None if the part was already stored
+        """
+        totals = self._commit_part(
+            keys=[self._key(job_id, name), self._key(job_id, 'state')],
+            args=[str(index), json.dumps(value), self.ttl_seconds] +
+                 [item for counter in counters.items() for item in counter]
+        )
+        if totals is None:
+            return None
+        return dict(zip(counters, totals))
+    
+    def get_parts(self, job_id, name):
+        """Get all parts stored under name, ordered by index."""
+        parts = self.redis.hgetall(self._key(job_id, name))
+        return [json.loads(parts[index]) for index in sorted(parts, key=int)]
+    
+    def fail_job(self, job_id, message, category='error', endpoint='index'):
+        """Mark a job failed and publish its 'failed' event."""
+        self.save_job(job_id, status='failed', error={'message': message, 'category': category, 'endpoint': endpoint})
+        self.publish(job_id, 'failed', {'status': 'failed', 'message': message, 'category': category})
+    
+    def publish(self, job_id, event_type, data):
+        """Append a progress event to a job's bounded event log."""
+        key = self._key(job_id, 'events')
+        event_id = self.redis.incr(self._key(job_id, 'event_id'))
+        pipe = self.redis.pipeline()
+        pipe.rpush(key, json.dumps({'id': event_id, 'event': event_type, 'data': data}))
+        pipe.ltrim(key, -self.max_events, -1)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.expire(self._key(job_id, 'event_id'), self.ttl_seconds)
+        pipe.execute()
+    
+    def get_events(self, job_id, last_id=0):
+        """Get buffered events with an ID greater than last_id."""
+        events = [json.loads(raw) for raw in self.redis.lrange(self._key(job_id, 'events'), 0, -1)]
+        return [event for event in events if event['id'] > last_id]
+    
+    def _schedule(self):
+        # Step through the ring until a task is served, giving every user about two turns
+        for _ in range(2 * self.redis.llen(USERS_KEY) + 8):
+            user_id = self.redis.lindex(USERS_KEY, 0)
+            if user_id is None:
+                return None
+            job_id = self.redis.lindex(self._user_key(user_id, 'jobs'), 0) or ''
+            now = time.time()
+            result = self._dequeue(
+                keys=[USERS_KEY, DEFICITS_KEY, self._user_key(user_id, 'jobs'), self._user_key(user_id, 'running'),
+                      self._key(job_id, 'queue'), LEASES_KEY, LEASED_KEY, ATTEMPTS_KEY],
+                args=[user_id, job_id, self.quantum, self.max_running, now, now + self.lease_seconds,
+                      self.lease_seconds]
+            )
+            if result:
+                raw, attempt = result
+                return dict(json.loads(raw), attempt=int(attempt))
+        return None
+    
+    def _job_user(self, job_id):
+        user_id = self._job_users.get(job_id)
+        if user_id is None:
+            user_id = json.loads(self.redis.hget(self._key(job_id, 'state'), 'user_id') or '""')
+            if len(self._job_users) >= JOB_USER_CACHE_SIZE:
+                self._job_users.clear()
+            self._job_users[job_id] = user_id
+        return user_id
+    
+    def _lease_keys(self, task):
+        return [LEASES_KEY, LEASED_KEY, ATTEMPTS_KEY, self._user_key(task['user_id'], 'running'), WAKEUP_KEY]
+    
+    @staticmethod
+    def _lease_id(task):
+        return f"{task['job_id']}:{task['key']}"
+    
+    @staticmethod
+    def _key(job_id, name, suffix=None):
+        return f"transfer:{job_id}:{name}" + (f":{suffix}" if suffix else '')
+    
+    @staticmethod
+    def _user_key(user_id, name):
+        return f"transfer:user:{user_id}:{name}"
+
+class QueuedEventBuffer:
+    """
+    Read side of a queued job's event log, with the EventBuffer interface.
+    
+    Lets stream_events() serve progress of a job running on another process.
+    """
+    
+    POLL_INTERVAL = 0.25
+    
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+    
+    @property
+    def closed(self):
+        state = self.queue.get_job(self.job_id) or {}
+        return state.get('status') in ('complete', 'failed')
+    
+    def wait(self, last_id=0, timeout=15.0):
+        """
+        Get events newer than last_id, polling until one arrives.
+        
+        Args:
+            last_id (int): ID of the last event the reader has seen
+            timeout (float): Seconds to wait before returning empty-handed
+            
+        Returns:
+            list: Buffered events with an ID greater than last_id
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.queue.get_events(self.job_id, last_id)
+            if events or time.monotonic() >= deadline or self.closed:
+                return events
+            time.sleep(self.POLL_INTERVAL)
+
+class QueuedJob:
+    """Snapshot of a conversion job running on the task queue."""
+    
+    def __init__(self, queue, job_id, state):
+        self.id = job_id
+        self.user_id = state.get('user_id')
+        self.status = state.get('status', 'pending')
+        self.result = state.get('result')
+        self.events = QueuedEventBuffer(queue, job_id)
+        
+        error = state.get('error')
+        self.error = TransferError(error['message'], error['category'], error['endpoint']) if error else None
+
+class QueuedJobManager:
+    """Creates and looks up conversion jobs that run on queue workers."""
+    
+    def __init__(self, queue):
+        self.queue = queue
+    
+    def create(self, user_id):
+        """
+        Register a new job.
+        
+        Args:
+            user_id (str): Spotify user that owns the job
+            
+        Returns:
+            QueuedJob: The new job
+        """
+        job_id = uuid.uuid4().hex
+        state = {'user_id': user_id, 'status': 'pending', 'created_at': time.time()}
+        self.queue.save_job(job_id, **state)
+        return QueuedJob(self.queue, job_id, state)
+    
+    def get(self, job_id):
+        """Get a job by ID, or None if unknown or expired."""
+        state = self.queue.get_job(job_id)
+        return QueuedJob(self.queue, job_id, state) if state else None
+    
+    def submit(self, job, task_type, **payload):
+        """Queue the first task of a job; the workers take it from there."""
+        self.queue.enqueue(job.id, task_type, 'start', **payload)
+        logger.info("Queued job %s", job.id)
+
+def create_task_queue():
+    """
+    Create the task queue for this deployment.
+    
+    Returns:
+        TaskQueue: The queue, or None unless TASK_QUEUE is on and REDIS_URL is set
+    """
+    config = Config()
+    if not config.TASK_QUEUE:
+        return None
+    if not config.REDIS_URL:
+        logger.warning("TASK_QUEUE is on but REDIS_URL is not set; running conversions in-process")
+        return None
+    return TaskQueue(config.REDIS_URL, config.RESULT_TTL_SECONDS, config.SSE_MAX_EVENTS)
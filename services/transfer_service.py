@@ -0,0 +1,594 @@
+import copy
+import logging
+import uuid
+from config.settings import Config
+from services.artist_catalog import CatalogMatcher, find_dominant_artists
+from services.checkpoint_store import CheckpointLeaseLost, MemoryCheckpointStore, hold_lease
+from services.profiler import profile_stage
+from utils.helpers import (
+    generate_playlist_name, extract_artist_from_title, extract_video_metadata,
+    group_duplicate_videos, unique_track_ids, slim_video, normalize_artist_name
+)
+from utils.logging_setup import PER_ITEM
+from utils.result_io import EXPORT_FIELDS, is_matched, matched_track_ids
+
+logger = logging.getLogger(__name__)
+
+class TransferError(Exception):
+    """Conversion failure with a user-facing message."""
+    
+    def __init__(self, message, category='error', endpoint='index'):
+        super().__init__(message)
+        self.category = category
+        self.endpoint = endpoint
+
+class TransferService:
+    """Runs the YouTube to Spotify conversion pipeline."""
+    
+    def __init__(self, youtube_service, spotify_service, result_store, drop_duplicate_tracks=None,
+                 checkpoint_store=None):
+        self.youtube_service = youtube_service
+        self.spotify_service = spotify_service
+        self.result_store = result_store
+        self.checkpoint_store = checkpoint_store or MemoryCheckpointStore()
+        if drop_duplicate_tracks is None:
+            drop_duplicate_tracks = Config().DROP_DUPLICATE_TRACKS
+        self.drop_duplicate_tracks = drop_duplicate_tracks
+        self.preserve_positions = Config().UPDATE_PRESERVE_POSITIONS
+        self.result_flush_size = Config().RESULT_FLUSH_SIZE
+        self.catalog_matching = Config().CATALOG_MATCHING
+        self.min_confidence = Config().SPOTIFY_MIN_CONFIDENCE
+        # (artist IDs, CatalogMatcher) of the last matcher built, reused while the artists stay the same
+        self._catalog_matcher = None
+    
+    def fork(self):
+        """
+        Get a copy of the service with its own YouTube and Spotify clients, for one job.
+        
+        Returns:
+            TransferService: Copy sharing the stores and settings
+        """
+        service = copy.copy(self)
+        service.youtube_service = self.youtube_service.fork()
+        service.spotify_service = self.spotify_service.fork()
+        service._catalog_matcher = None
+        return service
+    
+    def run(self, playlist_url, user_id, custom_name='', update_existing=False, job_id=None, emit=None):
+        """
+        Convert a YouTube playlist into a new Spotify playlist.
+        
+        Per-track results are written to the result store as they are
+        produced; only the summary is returned. Progress is checkpointed
+        after every page, every few searches and every upload batch, so an
+        interrupted conversion can be picked up again with resume().
+        
+        Args:
+            playlist_url (str): Validated YouTube playlist URL
+            user_id (str): Spotify user ID that will own the playlist
+            custom_name (str): Playlist name chosen by the user, if any
+            update_existing (bool): If the user already has a playlist with
+                this name, add only the tracks it is missing instead of
+                creating a new one
+            job_id (str): Key for the stored results (generated if omitted)
+            emit (callable): Progress callback, called as emit(event_type, **data)
+        
+        Returns:
+            dict: Conversion summary, also saved in the result store
+        
+        Raises:
+            TransferError: If the conversion cannot be completed
+        """
+        emit = emit or (lambda event_type, **data: None)
+        job_id = job_id or uuid.uuid4().hex
+        
+        # Extract playlist ID
+        playlist_id = self.youtube_service.extract_playlist_id(playlist_url)
+        logger.info("Extracted playlist ID: %s", playlist_id)
+        
+        # Authenticate YouTube with API key (simpler for read-only access)
+        emit('stage', stage='youtube', message='Connecting to YouTube...')
+        if not self.youtube_service.authenticate():
+            logger.error("YouTube authentication failed")
+            raise TransferError('Failed to authenticate with YouTube. Please check your API configuration.')
+        
+        logger.info("YouTube authentication successful")
+        
+        # Get playlist info
+        playlist_info = self.youtube_service.get_playlist_info(playlist_id)
+        logger.info("Processing playlist: %s (%s items)", playlist_info['title'], playlist_info['item_count'])
+        
+        checkpoint = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'owner': uuid.uuid4().hex,
+            'status': 'running',
+            'youtube_playlist_id': playlist_id,
+            'youtube_title': playlist_info['title'],
+            'item_count': playlist_info['item_count'],
+            'custom_name': custom_name,
+            'update_existing': update_existing,
+            'next_page_token': None,
+            'pages_fetched': 0,
+            'pages_done': False,
+            'spotify_playlist_id': None,
+            'spotify_playlist_url': None,
+            'playlist_name': None,
+            'searched_groups': 0,
+            'processed': 0,
+            'failed_count': 0,
+            'track_ids': [],
+            'uploaded': 0
+        }
+        self.checkpoint_store.claim(job_id, checkpoint['owner'])
+        self.checkpoint_store.save(job_id, checkpoint)
+        return self._continue(checkpoint, emit)
+    
+    def resume(self, checkpoint_id, user_id, owner=None, job_id=None, emit=None):
+        """
+        Continue an interrupted conversion from its last checkpoint.
+        
+        Pages already fetched, items already searched and batches already
+        uploaded are not requested again; tracks go into the Spotify
+        playlist the conversion had already created.
+        
+        Args:
+            checkpoint_id (str): Job ID of the interrupted conversion
+            user_id (str): Spotify user ID that owns the conversion
+            owner (str): Lease already claimed for this run with
+                checkpoint_store.claim() (claimed here if omitted)
+            job_id (str): ID of the job running the resume (results stay
+                under checkpoint_id)
+            emit (callable): Progress callback, called as emit(event_type, **data)
+        
+        Returns:
+            dict: Conversion summary, also saved in the result store
+        
+        Raises:
+            TransferError: If there is nothing to resume or it fails again
+        """
+        emit = emit or (lambda event_type, **data: None)
+        
+        checkpoint = self.checkpoint_store.get(checkpoint_id)
+        if not checkpoint or checkpoint['user_id'] != user_id:
+            raise TransferError('This conversion can no longer be resumed.', category='warning')
+        
+        if not owner:
+            owner = uuid.uuid4().hex
+            if not self.checkpoint_store.claim(checkpoint_id, owner):
+                raise TransferError('This conversion is still running.', category='warning')
+        
+        logger.info("Resuming conversion %s: %d searched, %d uploaded",
+                    checkpoint_id, checkpoint['processed'], checkpoint['uploaded'])
+        checkpoint['owner'] = owner
+        checkpoint['status'] = 'running'
+        try:
+            self.checkpoint_store.save(checkpoint_id, checkpoint)
+        except CheckpointLeaseLost:
+            raise TransferError('This conversion is still running.', category='warning')
+        return self._continue(checkpoint, emit)
+    
+    def _continue(self, checkpoint, emit):
+        """Run the conversion stages that the checkpoint has not completed yet, holding its lease."""
+        job_id = checkpoint['job_id']
+        with hold_lease(self.checkpoint_store, job_id, checkpoint['owner']):
+            try:
+                return self._run_stages(checkpoint, emit)
+            except CheckpointLeaseLost:
+                # Another run resumed the conversion while this one stalled; leave it to that run
+                logger.error("Conversion %s was resumed elsewhere; stopping this run", job_id)
+                raise TransferError('This conversion was resumed in another session.', category='warning')
+            except TransferError as e:
+                if e.category == 'warning':
+                    # Nothing to convert; there is no point resuming
+                    self.checkpoint_store.delete(job_id)
+                else:
+                    self._mark_failed(checkpoint)
+                raise
+            except Exception:
+                self._mark_failed(checkpoint)
+                raise
+    
+    def _mark_failed(self, checkpoint):
+        # Keep the last saved progress; anything after it was not flushed
+        saved = self.checkpoint_store.get(checkpoint['job_id']) or checkpoint
+        saved['status'] = 'failed'
+        try:
+            self.checkpoint_store.save(checkpoint['job_id'], saved)
+        except CheckpointLeaseLost:
+            pass
+    
+    def _run_stages(self, checkpoint, emit):
+        job_id = checkpoint['job_id']
+        
+        # Get videos, one checkpointed page at a time
+        emit('stage', stage='fetch', message='Fetching playlist information...')
+        if not checkpoint['pages_done']:
+            if not self.youtube_service.youtube and not self.youtube_service.authenticate():
+                raise TransferError('Failed to authenticate with YouTube. Please check your API configuration.')
+            with profile_stage('fetch'):
+                self._fetch_videos(checkpoint, emit)
+        
+        videos = self.checkpoint_store.get_videos(job_id)
+        logger.info("Retrieved %s videos", len(videos))
+        
+        if not videos:
+            logger.warning("No videos found in playlist")
+            raise TransferError('No videos found in the playlist.', category='warning')
+        
+        # Re-authenticate Spotify service using cached token
+        if not self.spotify_service.restore_session(checkpoint['user_id']):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        # Create Spotify playlist (or find the one to update)
+        if not checkpoint['spotify_playlist_id']:
+            playlist_name = checkpoint['custom_name'] or generate_playlist_name(checkpoint['youtube_title'])
+            spotify_playlist = None
+            if checkpoint.get('update_existing'):
+                spotify_playlist = self.spotify_service.find_user_playlist(checkpoint['user_id'], playlist_name)
+            
+            if spotify_playlist:
+                logger.info("Updating existing Spotify playlist: %s (%s)", playlist_name, spotify_playlist['id'])
+            else:
+                logger.info("Creating Spotify playlist: %s", playlist_name)
+                spotify_playlist = self.spotify_service.create_playlist(
+                    checkpoint['user_id'],
+                    playlist_name,
+                    description=f"Converted from YouTube playlist: {checkpoint['youtube_title']}"
+                )
+                logger.info("Created Spotify playlist: %s", spotify_playlist['id'])
+            
+            checkpoint.update(
+                spotify_playlist_id=spotify_playlist['id'],
+                spotify_playlist_url=spotify_playlist['url'],
+                playlist_name=playlist_name,
+                track_ids=[None] * len(videos)
+            )
+            self.checkpoint_store.save(job_id, checkpoint)
+        
+        # Search for tracks and collect results
+        self._search_videos(checkpoint, videos, emit)
+        
+        found_tracks = [track_id for track_id in checkpoint['track_ids'] if track_id]
+        failed_count = checkpoint['failed_count']
+        logger.info("Track search complete: %s found, %s failed", len(found_tracks), failed_count)
+        logger.info("Average searches per video: %.2f",
+                    self.spotify_service.query_planner.get_stats()['searches_per_item'])
+        
+        if not found_tracks:
+            logger.warning("No tracks found on Spotify")
+            raise TransferError('No tracks could be found on Spotify.', category='warning')
+        
+        matched_count = len(found_tracks)
+        if self.drop_duplicate_tracks:
+            found_tracks = unique_track_ids(found_tracks)
+            logger.info("Dropped %s duplicate tracks before upload", matched_count - len(found_tracks))
+        
+        # Add tracks to playlist, skipping batches uploaded before an interruption.
+        # Updates diff against the playlist itself, which also covers resumes.
+        logger.info("Adding tracks to Spotify playlist...")
+        emit('stage', stage='upload', message='Adding tracks to Spotify...')
+        update_existing = checkpoint.get('update_existing', False)
+        uploaded = 0 if update_existing else checkpoint['uploaded']
+        
+        def on_batch(added, total):
+            checkpoint['uploaded'] = uploaded + added
+            self.checkpoint_store.save(job_id, checkpoint)
+            emit('batch', added=uploaded + added, total=uploaded + total)
+        
+        with profile_stage('upload'):
+            success = self.spotify_service.add_tracks_to_playlist(
+                checkpoint['spotify_playlist_id'],
+                found_tracks[uploaded:],
+                on_batch=on_batch,
+                skip_existing=update_existing,
+                preserve_positions=update_existing and self.preserve_positions
+            )
+        
+        if not success:
+            logger.error("Failed to add tracks to playlist")
+            raise TransferError('Failed to add tracks to Spotify playlist.')
+        
+        logger.info("Playlist creation successful!")
+        
+        # Calculate success rate
+        total_videos = len(videos)
+        success_rate = (matched_count / total_videos) * 100 if total_videos > 0 else 0
+        
+        summary = {
+            'job_id': job_id,
+            'user_id': checkpoint['user_id'],
+            'playlist_name': checkpoint['playlist_name'],
+            'spotify_playlist_url': checkpoint['spotify_playlist_url'],
+            'successful_count': matched_count,
+            'failed_count': failed_count,
+            'success_rate': success_rate,
+            'duplicates_removed': matched_count - len(found_tracks)
+        }
+        self.result_store.save_summary(job_id, summary)
+        self.checkpoint_store.delete(job_id)
+        return summary
+    
+    def _fetch_videos(self, checkpoint, emit):
+        """Fetch the remaining playlist pages, checkpointing after each one."""
+        job_id = checkpoint['job_id']
+        fetched = len(self.checkpoint_store.get_videos(job_id))
+        
+        while True:
+            videos, next_page_token = self.youtube_service.get_playlist_page(
+                checkpoint['youtube_playlist_id'],
+                page_token=checkpoint['next_page_token']
+            )
+            self.checkpoint_store.append_videos(job_id, [slim_video(video) for video in videos])
+            fetched += len(videos)
+            
+            checkpoint['pages_fetched'] += 1
+            checkpoint['next_page_token'] = next_page_token
+            checkpoint['pages_done'] = not next_page_token
+            self.checkpoint_store.save(job_id, checkpoint)
+            
+            emit('page', page=checkpoint['pages_fetched'], fetched=fetched, total=checkpoint['item_count'])
+            if checkpoint['pages_done']:
+                return
+    
+    def _search_videos(self, checkpoint, videos, emit):
+        """
+        Search the groups of videos the checkpoint has not covered yet.
+        
+        Result rows are flushed and the checkpoint saved together, after
+        whole groups, so a resumed search never stores a row twice.
+        """
+        job_id = checkpoint['job_id']
+        track_ids = checkpoint['track_ids']
+        successful_matches = []
+        failed_matches = []
+        
+        # Repeated items and alternate uploads of one song are searched once
+        with profile_stage('normalize'):
+            groups = group_duplicate_videos(videos)
+        logger.info("Starting track search: %s videos in %s distinct songs", len(videos), len(groups))
+        emit('stage', stage='search', message='Searching on Spotify...')
+        
+        # A resumed search judges catalogues by the groups it still has to cover
+        with profile_stage('catalog'):
+            catalog = self.build_catalog_matcher(
+                [videos[group[0]] for group in groups[checkpoint['searched_groups']:]])
+        
+        for group_number in range(checkpoint['searched_groups'], len(groups)):
+            group = groups[group_number]
+            with profile_stage('search'):
+                track_id, track_data = self.match_video(videos[group[0]], catalog)
+            
+            for position, index in enumerate(group):
+                item_data = track_data if position == 0 else self.fan_out(track_data, videos[index])
+                item_data['position'] = index
+                checkpoint['processed'] += 1
+                logger.debug("Processing %s/%s: %s", checkpoint['processed'], len(videos), item_data['title'],
+                             extra=PER_ITEM)
+                
+                if track_id:
+                    track_ids[index] = track_id
+                    successful_matches.append(item_data)
+                    logger.debug("Found: %s", item_data['title'], extra=PER_ITEM)
+                else:
+                    item_data['reason'] = 'Not found on Spotify'
+                    failed_matches.append(item_data)
+                    checkpoint['failed_count'] += 1
+                    logger.debug("Not found: %s", item_data['title'], extra=PER_ITEM)
+                
+                emit('track', index=checkpoint['processed'], total=len(videos), title=item_data['title'],
+                     found=bool(track_id), matched=checkpoint['processed'] - checkpoint['failed_count'])
+            
+            checkpoint['searched_groups'] = group_number + 1
+            if len(successful_matches) + len(failed_matches) >= self.result_flush_size:
+                self._flush_results(job_id, successful_matches, failed_matches)
+                self.checkpoint_store.save(job_id, checkpoint)
+        
+        self._flush_results(job_id, successful_matches, failed_matches)
+        self.checkpoint_store.save(job_id, checkpoint)
+    
+    def apply_mapping(self, rows, user_id, playlist_name, job_id=None, emit=None):
+        """
+        Re-create a conversion from exported results without any searches.
+        
+        Args:
+            rows (list): Result rows loaded with utils.result_io.load_results
+            user_id (str): Spotify user ID that will own the playlist
+            playlist_name (str): Name of the new playlist
+            job_id (str): Key for the stored results (generated if omitted)
+            emit (callable): Progress callback, called as emit(event_type, **data)
+        
+        Returns:
+            dict: Conversion summary, also saved in the result store
+        
+        Raises:
+            TransferError: If the mapping cannot be applied
+        """
+        emit = emit or (lambda event_type, **data: None)
+        job_id = job_id or uuid.uuid4().hex
+        
+        track_ids = matched_track_ids(rows)
+        if not track_ids:
+            raise TransferError('The imported file contains no matched tracks.', category='warning')
+        
+        matched_count = len(track_ids)
+        if self.drop_duplicate_tracks:
+            track_ids = unique_track_ids(track_ids)
+        
+        if not self.spotify_service.restore_session(user_id):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        spotify_playlist = self.spotify_service.create_playlist(
+            user_id,
+            playlist_name,
+            description="Imported from a saved YouTube conversion"
+        )
+        logger.info("Applying imported mapping of %s tracks to %s", len(track_ids), spotify_playlist['id'])
+        
+        emit('stage', stage='upload', message='Adding tracks to Spotify...')
+        success = self.spotify_service.add_tracks_to_playlist(
+            spotify_playlist['id'],
+            track_ids,
+            on_batch=lambda added, total: emit('batch', added=added, total=total)
+        )
+        if not success:
+            raise TransferError('Failed to add tracks to Spotify playlist.')
+        
+        successful_matches = []
+        failed_matches = []
+        for row in rows:
+            stored = {field: row.get(field) for field in EXPORT_FIELDS if field != 'status'}
+            (successful_matches if is_matched(row) else failed_matches).append(stored)
+        self._flush_results(job_id, successful_matches, failed_matches)
+        
+        summary = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'playlist_name': playlist_name,
+            'spotify_playlist_url': spotify_playlist['url'],
+            'successful_count': matched_count,
+            'failed_count': len(rows) - matched_count,
+            'success_rate': matched_count / len(rows) * 100,
+            'duplicates_removed': matched_count - len(track_ids)
+        }
+        self.result_store.save_summary(job_id, summary)
+        return summary
+    
+    def _flush_results(self, job_id, successful_matches, failed_matches):
+        """Write buffered result rows to the result store and clear the buffers."""
+        self.result_store.append(job_id, 'successful', successful_matches)
+        self.result_store.append(job_id, 'failed', failed_matches)
+        successful_matches.clear()
+        failed_matches.clear()
+    
+    @staticmethod
+    def fan_out(track_data, video):
+        """Copy a group's match decision onto another item of the same group."""
+        metadata = extract_video_metadata(video)
+        return dict(
+            track_data,
+            video_id=metadata['video_id'],
+            title=metadata['title'],
+            duplicate_of=track_data['video_id']
+        )
+    
+    def build_catalog_matcher(self, videos, video_count=None):
+        """
+        Fetch the catalogues of the artists that dominate a list of videos.
+        
+        Album and discography playlists are then matched locally, with a
+        few catalogue page fetches instead of one search per video. An
+        artist's catalogue is only fetched when it takes fewer requests
+        than the searches it can save: one per video of theirs, projected
+        to video_count when the videos are one chunk of a playlist. The
+        matcher for the same artists is reused from the last call.
+        
+        Args:
+            videos (list): YouTube playlistItem resources
+            video_count (int): Videos of the whole playlist, if videos is a part of it
+        
+        Returns:
+            CatalogMatcher: Matcher for match_video(), or None when catalogue
+                matching is off, no artist dominates or no catalogue pays off
+        """
+        if not self.catalog_matching or not videos:
+            return None
+        
+        scale = max(1.0, (video_count or 0) / len(videos))
+        catalogs = {}
+        artist_ids = []
+        for name, count in find_dominant_artists(videos):
+            try:
+                artist = self.spotify_service.find_artist(name)
+                if not artist:
+                    continue
+                tracks = self.spotify_service.get_artist_catalog(artist['id'], max_requests=int(count * scale))
+                if tracks is not None:
+                    catalogs[normalize_artist_name(name)] = tracks
+                    artist_ids.append(artist['id'])
+            except Exception as e:
+                # Searching still works without the catalogue
+                logger.warning("Could not fetch the catalogue of %s: %s", name, e)
+        
+        if not catalogs:
+            return None
+        if self._catalog_matcher and self._catalog_matcher[0] == artist_ids and not self._catalog_matcher[1].exhausted:
+            return self._catalog_matcher[1]
+        
+        logger.info("Matching against the catalogues of %s", ', '.join(catalogs))
+        matcher = CatalogMatcher(catalogs)
+        self._catalog_matcher = (artist_ids, matcher)
+        return matcher
+    
+    def match_video(self, video, catalog=None):
+        """
+        Find the Spotify track for one playlist item.
+        
+        Args:
+            video (dict): YouTube playlistItem resource
+            catalog (CatalogMatcher): Catalogues to try before searching
+        
+        Returns:
+            tuple: (track_id or None, track_data dict describing the decision)
+        """
+        metadata = extract_video_metadata(video)
+        video_title = metadata['title']
+        channel_title = metadata['channel_title']
+        music = metadata['music']
+        
+        # Try to extract artist from title
+        _, artist = extract_artist_from_title(video_title)
+        
+        # Create track data object
+        track_data = {
+            'video_id': metadata['video_id'],
+            'title': video_title,
+            'artist': artist or channel_title
+        }
+        
+        match = None
+        if music:
+            # YouTube Music uploads carry canonical metadata; an ISRC is an exact match
+            if music['artists']:
+                track_data['artist'] = ', '.join(music['artists'])
+            if music['isrc']:
+                match = self.spotify_service.match_isrc(music['isrc'])
+        
+        if not match and catalog:
+            match = catalog.match(metadata)
+        
+        # Search on Spotify
+        if not match:
+            if music and music['track']:
+                match = self.spotify_service.match_track(
+                    music['track'],
+                    artist=music['artists'][0] if music['artists'] else None
+                )
+            else:
+                match = self.spotify_service.match_track(
+                    video_title,
+                    channel_title=channel_title,
+                    channel_id=metadata['channel_id']
+                )
+        
+        if not match:
+            return None, track_data
+        
+        confidence = match.get('confidence')
+        if match['method'] == 'isrc':
+            confidence = 1.0
+        elif confidence is None:
+            confidence = round(self.spotify_service.scorer.score_pair(video_title, match['name'], match['artist']), 3)
+        
+        # An artist-named channel learns its Spotify artist for later searches, from confident matches only
+        if confidence >= self.min_confidence:
+            self.spotify_service.channel_artists.record(metadata['channel_id'], channel_title,
+                                                        match['artist_id'], match['artist'])
+        track_data.update({
+            'track_id': match['id'],
+            'track_name': match['name'],
+            'track_artist': match['artist'],
+            'method': match['method'],
+            'confidence': confidence
+        })
+        return match['id'], track_data
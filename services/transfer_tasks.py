@@ -0,0 +1,297 @@
+import logging
+import threading
+from config.settings import Config
+from services.transfer_service import TransferError
+from utils.helpers import generate_playlist_name, group_duplicate_videos, unique_track_ids
+from utils.logging_setup import log_context
+
+logger = logging.getLogger(__name__)
+
+# Longest wait between attempts to reach the queue after it fails
+MAX_QUEUE_BACKOFF_SECONDS = 30
+
+class TransferTasks:
+    """
+    The conversion pipeline split into queueable tasks.
+    
+    A job starts with a 'transfer' task, which creates the Spotify playlist
+    and queues the first 'fetch_page'. Each page task queues the next page
+    and one 'search' task per chunk of videos, so searches for one playlist
+    run on every worker at once. When the last chunk is searched, 'upload'
+    tasks add the tracks in 100-track batches, one after another so the
+    playlist keeps its order, and 'finalize' saves the summary. The queue
+    interleaves these tasks fairly across users and jobs.
+    
+    Tasks are redelivered if their worker dies, so each one commits its
+    output once: pages and chunks through commit_part(), the playlist ID
+    in the job state, and upload batches are checked against the playlist
+    first. A worker dying between an API call and its commit can still
+    leave an extra empty playlist or drop one chunk's rows from the
+    downloadable results; the uploaded playlist itself is unaffected.
+    """
+    
+    def __init__(self, queue, transfer_service, chunk_size=None):
+        self.queue = queue
+        self.transfer_service = transfer_service
+        self.youtube_service = transfer_service.youtube_service
+        self.spotify_service = transfer_service.spotify_service
+        self.result_store = transfer_service.result_store
+        self.config = Config()
+        self.chunk_size = chunk_size or self.config.SEARCH_CHUNK_SIZE
+    
+    def work(self, stop_event):
+        """
+        Process tasks from the queue until stop_event is set.
+        
+        Errors talking to the queue are logged and retried with exponential
+        backoff, so a Redis outage pauses the loop instead of ending it.
+        """
+        failures = 0
+        while not stop_event.is_set():
+            try:
+                task = self.queue.dequeue(timeout=5)
+            except Exception as e:
+                failures += 1
+                delay = min(self.config.RETRY_BACKOFF_BASE ** failures, MAX_QUEUE_BACKOFF_SECONDS)
+                logger.error("Could not take a task from the queue (retrying in %.0fs): %s", delay, e)
+                stop_event.wait(delay)
+                continue
+            
+            failures = 0
+            if task:
+                self._run(task)
+    
+    def _run(self, task):
+        done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, done), daemon=True)
+        heartbeat.start()
+        try:
+            self.handle(task)
+        except Exception:
+            logger.exception("Task %s of job %s could not be handled", task['key'], task['job_id'])
+        finally:
+            done.set()
+            heartbeat.join()
+            # A release that fails leaves the lease to expire, and the task is redelivered
+            try:
+                self.queue.release(task)
+            except Exception as e:
+                logger.error("Could not release task %s of job %s: %s", task['key'], task['job_id'], e)
+    
+    def _heartbeat(self, task, done):
+        # Keep the task's lease while it runs, so it is only redelivered if this worker dies
+        while not done.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(task):
+                logger.warning("Lost the lease of task %s of job %s", task['key'], task['job_id'])
+                return
+    
+    def handle(self, task):
+        """
+        Run one task.
+        
+        Tasks of failed or finished jobs and redelivered copies of completed
+        tasks are skipped. A task that raises fails its whole job. A task
+        whose worker died is redelivered (task['attempt'] > 0) and picks up
+        where the first delivery stopped.
+        
+        Args:
+            task (dict): Task taken from the queue
+        """
+        job_id = task['job_id']
+        state = self.queue.get_job(job_id)
+        if not state or state.get('status') in ('complete', 'failed') or self.queue.is_done(task):
+            return
+        
+        with log_context(job_id=job_id, user_id=state.get('user_id'), task=task['type']):
+            try:
+                getattr(self, f"_{task['type']}")(job_id, state, **task['payload'], attempt=task.get('attempt', 0))
+                self.queue.mark_done(task)
+            except Exception as e:
+                logger.error("Task %s of job %s failed: %s", task['key'], job_id, e)
+                self._fail(job_id, e)
+    
+    def emit(self, job_id, event_type, **data):
+        """Publish a progress event for a job."""
+        self.queue.publish(job_id, event_type, data)
+    
+    def _transfer(self, job_id, state, playlist_url, user_id, custom_name='', update_existing=False, attempt=0):
+        self.queue.save_job(job_id, status='running')
+        
+        playlist_id = self.youtube_service.extract_playlist_id(playlist_url)
+        self.emit(job_id, 'stage', stage='youtube', message='Connecting to YouTube...')
+        if not self.youtube_service.authenticate():
+            raise TransferError('Failed to authenticate with YouTube. Please check your API configuration.')
+        
+        playlist_info = self.youtube_service.get_playlist_info(playlist_id)
+        logger.info("Job %s: %s (%s items)", job_id, playlist_info['title'], playlist_info['item_count'])
+        if not playlist_info['item_count']:
+            raise TransferError('No videos found in the playlist.', category='warning')
+        
+        if not self.spotify_service.restore_session(user_id):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        playlist_name = custom_name or generate_playlist_name(playlist_info['title'])
+        spotify_playlist = None
+        if state.get('spotify_playlist_id'):
+            # A redelivered task reuses the playlist the first delivery created
+            spotify_playlist = {'id': state['spotify_playlist_id'], 'url': state['spotify_playlist_url']}
+        elif update_existing:
+            spotify_playlist = self.spotify_service.find_user_playlist(user_id, playlist_name)
+        if not spotify_playlist:
+            spotify_playlist = self.spotify_service.create_playlist(
+                user_id,
+                playlist_name,
+                description=f"Converted from YouTube playlist: {playlist_info['title']}"
+            )
+        
+        self.queue.save_job(
+            job_id,
+            youtube_playlist_id=playlist_id,
+            item_count=playlist_info['item_count'],
+            playlist_name=playlist_name,
+            spotify_playlist_id=spotify_playlist['id'],
+            spotify_playlist_url=spotify_playlist['url'],
+            update_existing=update_existing,
+            pages_done=False
+        )
+        self.emit(job_id, 'stage', stage='fetch', message='Fetching playlist information...')
+        self.queue.enqueue(job_id, 'fetch_page', 'page:1', page=1, page_token=None, offset=0)
+    
+    def _fetch_page(self, job_id, state, page, page_token, offset, attempt=0):
+        if not self.youtube_service.youtube and not self.youtube_service.authenticate():
+            raise TransferError('Failed to authenticate with YouTube. Please check your API configuration.')
+        
+        videos, next_page_token = self.youtube_service.get_playlist_page(state['youtube_playlist_id'], page_token)
+        fetched = offset + len(videos)
+        self.emit(job_id, 'page', page=page, fetched=fetched, total=state['item_count'])
+        if page == 1:
+            self.emit(job_id, 'stage', stage='search', message='Searching on Spotify...')
+        
+        # Count the chunks before queueing them, so the job is never seen as searched early;
+        # a redelivered page counts them once and finds its chunks already queued
+        chunk_starts = range(0, len(videos), self.chunk_size)
+        self.queue.commit_part(job_id, 'pages', page, fetched, chunks_total=len(chunk_starts))
+        for start in chunk_starts:
+            chunk = videos[start:start + self.chunk_size]
+            self.queue.enqueue(job_id, 'search', f"search:{offset + start}", cost=len(chunk),
+                               offset=offset + start, videos=chunk)
+        
+        if next_page_token:
+            self.queue.enqueue(job_id, 'fetch_page', f"page:{page + 1}",
+                               page=page + 1, page_token=next_page_token, offset=fetched)
+        else:
+            self.queue.save_job(job_id, pages_done=True, video_count=fetched)
+            self._maybe_upload(job_id)
+    
+    def _search(self, job_id, state, offset, videos, attempt=0):
+        if not self.spotify_service.restore_session(state['user_id']):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        track_ids = [None] * len(videos)
+        successful_matches = []
+        failed_matches = []
+        
+        # The catalogues are cached per process and the matcher per worker thread, so
+        # later chunks of the playlist reuse them
+        catalog = self.transfer_service.build_catalog_matcher(videos, video_count=state['item_count'])
+        
+        # Repeated items within the chunk are searched once
+        for group in group_duplicate_videos(videos):
+            track_id, track_data = self.transfer_service.match_video(videos[group[0]], catalog)
+            if not track_id:
+                track_data['reason'] = 'Not found on Spotify'
+            
+            for position, index in enumerate(group):
+                item_data = track_data if position == 0 else self.transfer_service.fan_out(track_data, videos[index])
+                item_data['position'] = offset + index
+                track_ids[index] = track_id
+                (successful_matches if track_id else failed_matches).append(item_data)
+        
+        # The chunk's tracks and counters are committed once; a redelivered chunk that
+        # was already committed only re-checks whether the upload can start
+        totals = self.queue.commit_part(job_id, 'tracks', offset, track_ids,
+                                        matched=len(successful_matches), failed=len(failed_matches),
+                                        processed=len(videos), chunks_done=1)
+        if totals:
+            self.result_store.append(job_id, 'successful', successful_matches)
+            self.result_store.append(job_id, 'failed', failed_matches)
+            self.emit(job_id, 'track', index=totals['processed'], total=state.get('video_count') or state['item_count'],
+                      title=videos[-1]['snippet']['title'], found=bool(track_ids[-1]), matched=totals['matched'])
+        self._maybe_upload(job_id)
+    
+    def _maybe_upload(self, job_id):
+        state = self.queue.get_job(job_id)
+        if state.get('pages_done') and state.get('chunks_done', 0) >= state.get('chunks_total', 0):
+            # Both the last page and the last search can get here; the task key makes it run once
+            self.queue.enqueue(job_id, 'upload', 'upload:0', batch=0)
+    
+    def _upload_track_ids(self, job_id):
+        track_ids = [track_id for part in self.queue.get_parts(job_id, 'tracks') for track_id in part if track_id]
+        matched_count = len(track_ids)
+        if self.transfer_service.drop_duplicate_tracks:
+            track_ids = unique_track_ids(track_ids)
+        return track_ids, matched_count
+    
+    def _upload(self, job_id, state, batch, attempt=0):
+        track_ids, matched_count = self._upload_track_ids(job_id)
+        if not track_ids:
+            raise TransferError('No tracks could be found on Spotify.', category='warning')
+        
+        if batch == 0:
+            logger.info("Job %s: uploading %s tracks", job_id, len(track_ids))
+            self.emit(job_id, 'stage', stage='upload', message='Adding tracks to Spotify...')
+        
+        if not self.spotify_service.restore_session(state['user_id']):
+            raise TransferError('Spotify session expired. Please login again.', endpoint='login')
+        
+        if state.get('update_existing'):
+            # One diff against the playlist, so this task uploads every missing track itself
+            if not self.spotify_service.add_tracks_to_playlist(
+                state['spotify_playlist_id'],
+                track_ids,
+                on_batch=lambda added, total: self.emit(job_id, 'batch', added=added, total=total),
+                skip_existing=True,
+                preserve_positions=self.transfer_service.preserve_positions
+            ):
+                raise TransferError('Failed to add tracks to Spotify playlist.')
+            self.queue.enqueue(job_id, 'finalize', 'finalize')
+            return
+        
+        batch_size = self.spotify_service.config.MAX_TRACKS_PER_REQUEST
+        start = batch * batch_size
+        end = min(start + batch_size, len(track_ids))
+        # A redelivered batch that already reached the playlist is not added twice
+        uploaded = attempt and len(self.spotify_service.get_playlist_track_ids(state['spotify_playlist_id'])) >= end
+        if not uploaded and not self.spotify_service.add_tracks_to_playlist(state['spotify_playlist_id'],
+                                                                            track_ids[start:end]):
+            raise TransferError('Failed to add tracks to Spotify playlist.')
+        
+        self.emit(job_id, 'batch', added=end, total=len(track_ids))
+        
+        if end < len(track_ids):
+            self.queue.enqueue(job_id, 'upload', f"upload:{batch + 1}", batch=batch + 1)
+        else:
+            self.queue.enqueue(job_id, 'finalize', 'finalize')
+    
+    def _finalize(self, job_id, state, attempt=0):
+        track_ids, matched_count = self._upload_track_ids(job_id)
+        total_videos = state.get('processed', 0)
+        
+        summary = {
+            'job_id': job_id,
+            'user_id': state['user_id'],
+            'playlist_name': state['playlist_name'],
+            'spotify_playlist_url': state['spotify_playlist_url'],
+            'successful_count': matched_count,
+            'failed_count': state.get('failed', 0),
+            'success_rate': (matched_count / total_videos) * 100 if total_videos > 0 else 0,
+            'duplicates_removed': matched_count - len(track_ids)
+        }
+        self.result_store.save_summary(job_id, summary)
+        self.queue.save_job(job_id, status='complete', result=summary)
+        self.emit(job_id, 'complete', status='complete')
+        logger.info("Job %s complete: %s/%s tracks matched", job_id, matched_count, total_videos)
+    
+    def _fail(self, job_id, error):
+        self.queue.fail_job(job_id, str(error), category=getattr(error, 'category', 'error'),
+                            endpoint=getattr(error, 'endpoint', 'index'))
@@ -1,21 +1,110 @@
+import copy
 import re
+import html
+import json
 import logging
 import ssl
 import time
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import threading
 from config.settings import Config
-import httplib2
+from services.cassette import create_session, wrap_http
+from services.concurrency_limiter import get_concurrency_limiter
+from services.rate_limiter import get_rate_limiter
+from services.search_cache import get_youtube_search_cache
+from utils.helpers import sanitize_filename
+
+# googleapiclient, google_auth_oauthlib and httplib2 are imported on first use:
+# they dominate import time and most requests never touch YouTube
 
 logger = logging.getLogger(__name__)
 
+# 403 reasons that mean "slow down" (quotaExceeded is a daily cap and is not retried)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+# Where each user's OAuth token for write access is kept (Redis key when REDIS_URL
+# is set); the Spotify user ID is appended
+YOUTUBE_TOKEN_FILE_PREFIX = '.youtube_token-'
+YOUTUBE_TOKEN_KEY_PREFIX = 'youtube:token_info:'
+
+# Video looked up by the health check; any ID works, the call only has to reach the API
+HEALTH_CHECK_VIDEO_ID = 'jNQXAC9IVRw'
+
+_discovery_lock = threading.Lock()
+_discovery_document = None
+
+def load_discovery_document():
+    """
+    Get the YouTube Data API v3 discovery document, loading it once per process.
+    
+    build() re-reads and re-parses the bundled document on every call; building
+    from a shared, already parsed copy skips that. Loading it before forking
+    (gunicorn --preload) shares it with every worker.
+    
+    Returns:
+        dict: Parsed discovery document
+    """
+    global _discovery_document
+    if _discovery_document is None:
+        with _discovery_lock:
+            if _discovery_document is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                _discovery_document = json.loads(get_static_doc('youtube', 'v3'))
+    return _discovery_document
+
+def build_youtube_client(developer_key=None, credentials=None, http=None):
+    """
+    Build a YouTube API client from the shared discovery document.
+    
+    Args:
+        developer_key (str): API key for read-only access
+        credentials: OAuth credentials for user access
+        http: httplib2.Http to use for requests
+        
+    Returns:
+        googleapiclient.discovery.Resource: YouTube client
+    """
+    from googleapiclient.discovery import build_from_document
+    
+    if http is not None:
+        # Record/replay of API traffic, when CASSETTE_MODE is set
+        http = wrap_http(http, 'youtube')
+    
+    if credentials is not None and http is not None:
+        # build_from_document won't take both; wrap the transport instead
+        from google_auth_httplib2 import AuthorizedHttp
+        http = AuthorizedHttp(credentials, http=http)
+        credentials = None
+    
+    return build_from_document(
+        load_discovery_document(),
+        developerKey=developer_key,
+        credentials=credentials,
+        http=http
+    )
+
 class YouTubeService:
     """Service class for YouTube API operations."""
     
     def __init__(self):
         self.youtube = None
         self.config = Config()
+        self.rate_limiter = get_rate_limiter('youtube', self.config.YOUTUBE_API_KEY, self.config.YOUTUBE_RATE_LIMIT)
+        self.concurrency_limiter = get_concurrency_limiter('youtube', self.config.YOUTUBE_CONCURRENCY)
+        self.search_cache = get_youtube_search_cache()
+    
+    def fork(self):
+        """
+        Get a copy of the service with its own API client.
+        
+        The copy shares the process-wide limiters and search cache. Each job runs on a copy,
+        so authenticating one job never swaps the client under another.
+        
+        Returns:
+            YouTubeService: Unauthenticated copy
+        """
+        service = copy.copy(self)
+        service.youtube = None
+        return service
     
     def authenticate(self, use_oauth=False, request=None):
         """
@@ -28,10 +117,14 @@ class YouTubeService:
         Returns:
             bool: True if authentication successful, False otherwise
         """
-        max_retries = 3
+        import httplib2
+        
+        max_retries = self.config.NETWORK_RETRIES
         for attempt in range(max_retries):
             try:
                 if use_oauth:
+                    from google_auth_oauthlib.flow import Flow
+                    
                     # OAuth 2.0 flow for write operations
                     flow = Flow.from_client_secrets_file(
                         self.config.GOOGLE_CLIENT_SECRETS_FILE,
@@ -50,8 +143,8 @@ class YouTubeService:
                         credentials = flow.credentials
                         
                         # Build service with SSL handling
-                        http = httplib2.Http(timeout=30)
-                        self.youtube = build('youtube', 'v3', credentials=credentials, http=http)
+                        http = httplib2.Http(timeout=self.config.HTTP_TIMEOUT)
+                        self.youtube = build_youtube_client(credentials=credentials, http=http)
                         return True
                 else:
                     # Simple API key authentication for read-only operations
@@ -61,15 +154,15 @@ class YouTubeService:
                         return False
                     
                     # Build service with SSL error handling
-                    http = httplib2.Http(timeout=30)
-                    self.youtube = build('youtube', 'v3', developerKey=api_key, http=http)
+                    http = httplib2.Http(timeout=self.config.HTTP_TIMEOUT)
+                    self.youtube = build_youtube_client(developer_key=api_key, http=http)
                     logger.info("YouTube service initialized with API key")
                     return True
                     
             except (ssl.SSLError, OSError) as e:
                 logger.warning(f"SSL/Network error on attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff: 2s, 4s, 8s
+                    time.sleep(self.config.RETRY_BACKOFF_BASE ** attempt)  # Exponential backoff
                     continue
                 else:
                     logger.error(f"YouTube authentication failed after {max_retries} attempts due to SSL/network issues")
@@ -80,15 +173,169 @@ class YouTubeService:
         
         return False
     
+    def ping(self):
+        """
+        Check that the YouTube Data API answers requests made with the API key.
+        
+        Looks up one video by ID (1 quota unit), through the shared rate
+        limiter and with a HEALTH_CHECK_TIMEOUT socket timeout, so a bad
+        key or an exhausted quota shows up as unhealthy.
+        
+        Returns:
+            bool: True if the API answered the lookup, False otherwise
+        """
+        import httplib2
+        from googleapiclient.errors import HttpError
+        
+        if not self.config.YOUTUBE_API_KEY:
+            return False
+        
+        try:
+            youtube = build_youtube_client(developer_key=self.config.YOUTUBE_API_KEY,
+                                           http=httplib2.Http(timeout=self.config.HEALTH_CHECK_TIMEOUT))
+            self._execute(youtube.videos().list(id=HEALTH_CHECK_VIDEO_ID, part='id'))
+            return True
+        except (HttpError, ssl.SSLError, OSError) as e:
+            logger.warning(f"YouTube API unreachable: {str(e)}")
+            return False
+    
     def build_service_from_credentials(self, credentials):
         """Build YouTube service from existing credentials."""
+        import httplib2
+        
         try:
-            self.youtube = build('youtube', 'v3', credentials=credentials)
+            self.youtube = build_youtube_client(credentials=credentials,
+                                                http=httplib2.Http(timeout=self.config.HTTP_TIMEOUT))
             return True
         except Exception as e:
             logger.error(f"Failed to build YouTube service: {str(e)}")
             return False
     
+    def get_authorization_url(self, redirect_uri):
+        """
+        Start the web OAuth flow for write access.
+        
+        Args:
+            redirect_uri (str): URL of the /youtube/callback route
+            
+        Returns:
+            tuple: (authorization URL, state to check in the callback)
+        """
+        return self._create_flow(redirect_uri).authorization_url(prompt='consent')
+    
+    def fetch_token(self, redirect_uri, code, user_id, state=None):
+        """
+        Finish the web OAuth flow: exchange the code and keep the credentials.
+        
+        Args:
+            redirect_uri (str): Redirect URI used to start the flow
+            code (str): Authorization code from the callback
+            user_id (str): Spotify user connecting the YouTube account
+            state (str): OAuth state from the callback
+            
+        Returns:
+            bool: True if the OAuth client was built, False otherwise
+        """
+        try:
+            flow = self._create_flow(redirect_uri, state=state)
+            flow.fetch_token(code=code)
+        except Exception as e:
+            logger.error(f"YouTube token exchange failed: {str(e)}")
+            return False
+        
+        self.save_credentials(user_id, flow.credentials)
+        return self.build_service_from_credentials(flow.credentials)
+    
+    def save_credentials(self, user_id, credentials):
+        """
+        Store a user's OAuth credentials so later jobs and other workers can reuse them.
+        
+        Args:
+            user_id (str): Spotify user the YouTube account is connected to
+            credentials (google.oauth2.credentials.Credentials): Credentials to keep
+        """
+        token = credentials.to_json()
+        if self.config.REDIS_URL:
+            import redis
+            redis.Redis.from_url(self.config.REDIS_URL).set(f"{YOUTUBE_TOKEN_KEY_PREFIX}{user_id}", token)
+        else:
+            with open(self._token_file(user_id), 'w') as token_file:
+                token_file.write(token)
+    
+    def load_credentials(self, user_id):
+        """
+        Get a user's stored OAuth credentials.
+        
+        Args:
+            user_id (str): Spotify user the YouTube account is connected to
+        
+        Returns:
+            google.oauth2.credentials.Credentials: Credentials, or None if
+                the user has not connected a YouTube account
+        """
+        from google.oauth2.credentials import Credentials
+        
+        if not user_id:
+            return None
+        try:
+            if self.config.REDIS_URL:
+                import redis
+                token = redis.Redis.from_url(self.config.REDIS_URL).get(f"{YOUTUBE_TOKEN_KEY_PREFIX}{user_id}")
+            else:
+                with open(self._token_file(user_id)) as token_file:
+                    token = token_file.read()
+        except FileNotFoundError:
+            return None
+        
+        if not token:
+            return None
+        return Credentials.from_authorized_user_info(json.loads(token), self.config.YOUTUBE_SCOPES)
+    
+    def restore_session(self, user_id):
+        """
+        Build an OAuth client from a user's stored credentials, refreshing them if needed.
+        
+        Args:
+            user_id (str): Spotify user the YouTube account is connected to
+        
+        Returns:
+            bool: True if the client can act for the user, False otherwise
+        """
+        import httplib2
+        
+        try:
+            credentials = self.load_credentials(user_id)
+            if not credentials:
+                return False
+            
+            if not credentials.valid:
+                if not credentials.refresh_token:
+                    return False
+                from google.auth.transport.requests import Request
+                credentials.refresh(Request(session=create_session('youtube')))
+                self.save_credentials(user_id, credentials)
+            
+            self.youtube = build_youtube_client(credentials=credentials, http=httplib2.Http(timeout=self.config.HTTP_TIMEOUT))
+            return True
+            
+        except Exception as e:
+            logger.error(f"Failed to restore YouTube session: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _token_file(user_id):
+        return f"{YOUTUBE_TOKEN_FILE_PREFIX}{sanitize_filename(user_id)}"
+    
+    def _create_flow(self, redirect_uri, state=None):
+        from google_auth_oauthlib.flow import Flow
+        
+        return Flow.from_client_secrets_file(
+            self.config.GOOGLE_CLIENT_SECRETS_FILE,
+            scopes=self.config.YOUTUBE_SCOPES,
+            redirect_uri=redirect_uri,
+            state=state
+        )
+    
     def extract_playlist_id(self, playlist_url):
         """
         Extract playlist ID from YouTube URL.
@@ -131,10 +378,12 @@ class YouTubeService:
         if not self.youtube:
             raise Exception("YouTube service not authenticated")
         
+        from googleapiclient.errors import HttpError
+        
         try:
             # Use the fallback mechanism for SSL error handling
             response = self._execute_with_fallback(
-                lambda: self.youtube.playlists().list(
+                lambda youtube: youtube.playlists().list(
                     part="snippet,contentDetails",
                     id=playlist_id
                 )
@@ -159,65 +408,93 @@ class YouTubeService:
             logger.error(f"Error fetching playlist info: {str(e)}")
             raise Exception(f"Failed to fetch playlist info: {str(e)}")
     
-    def get_playlist_videos(self, playlist_id, max_results=None):
+    def get_playlist_videos(self, playlist_id, max_results=None, on_page=None):
         """
         Fetch all videos from a YouTube playlist with pagination and SSL error handling.
         
         Args:
             playlist_id (str): YouTube playlist ID
             max_results (int): Maximum number of videos to fetch (None for all)
+            on_page (callable): Called as on_page(page_number, total_fetched) after each page
             
         Returns:
             list: List of video items
         """
-        if not self.youtube:
-            raise Exception("YouTube service not authenticated")
-        
         videos = []
         next_page_token = None
         total_fetched = 0
-        max_retries = 3
+        page_number = 0
+        page_size = self.config.YOUTUBE_PAGE_SIZE
+        
+        while True:
+            valid_videos, next_page_token = self.get_playlist_page(
+                playlist_id,
+                page_token=next_page_token,
+                max_results=min(page_size, max_results - total_fetched) if max_results else page_size
+            )
+            
+            videos.extend(valid_videos)
+            total_fetched += len(valid_videos)
+            page_number += 1
+            
+            if on_page:
+                on_page(page_number, total_fetched)
+            
+            # Break if no more pages or reached max_results
+            if not next_page_token or (max_results and total_fetched >= max_results):
+                break
+        
+        logger.info(f"Fetched {len(videos)} videos from playlist {playlist_id}")
+        return videos
+    
+    def get_playlist_page(self, playlist_id, page_token=None, max_results=None):
+        """
+        Fetch one page of playlist items, retrying SSL/network errors.
+        
+        Args:
+            playlist_id (str): YouTube playlist ID
+            page_token (str): Token of the page to fetch (None for the first)
+            max_results (int): Page size, at most 50 (default Config.YOUTUBE_PAGE_SIZE)
+            
+        Returns:
+            tuple: (list of playable video items, next page token or None)
+        """
+        if not self.youtube:
+            raise Exception("YouTube service not authenticated")
+        
+        from googleapiclient.errors import HttpError
+        
+        max_retries = self.config.NETWORK_RETRIES
         
         try:
-            while True:
-                # Retry logic for each page request
-                for attempt in range(max_retries):
-                    try:
-                        request = self.youtube.playlistItems().list(
-                            part="snippet,contentDetails",
-                            playlistId=playlist_id,
-                            maxResults=min(50, max_results - total_fetched if max_results else 50),
-                            pageToken=next_page_token
-                        )
-                        response = request.execute()
-                        break  # Success, exit retry loop
-                        
-                    except (ssl.SSLError, OSError) as e:
-                        logger.warning(f"SSL/Network error on attempt {attempt + 1} for playlist videos: {e}")
-                        if attempt < max_retries - 1:
-                            time.sleep(2 ** attempt)  # Exponential backoff
-                            continue
-                        else:
-                            raise Exception(f"Failed to fetch playlist videos after {max_retries} attempts due to SSL/network issues: {str(e)}")
-                
-                # Filter out deleted/private videos
-                valid_videos = [
-                    item for item in response['items']
-                    if item['snippet']['title'] != 'Deleted video' and
-                       item['snippet']['title'] != 'Private video'
-                ]
-                
-                videos.extend(valid_videos)
-                total_fetched += len(valid_videos)
-                
-                next_page_token = response.get('nextPageToken')
-                
-                # Break if no more pages or reached max_results
-                if not next_page_token or (max_results and total_fetched >= max_results):
-                    break
+            # Retry logic for each page request
+            for attempt in range(max_retries):
+                try:
+                    request = self.youtube.playlistItems().list(
+                        part="snippet,contentDetails",
+                        playlistId=playlist_id,
+                        maxResults=max_results or self.config.YOUTUBE_PAGE_SIZE,
+                        pageToken=page_token
+                    )
+                    response = self._execute(request)
+                    break  # Success, exit retry loop
+                    
+                except (ssl.SSLError, OSError) as e:
+                    logger.warning(f"SSL/Network error on attempt {attempt + 1} for playlist videos: {e}")
+                    if attempt < max_retries - 1:
+                        time.sleep(self.config.RETRY_BACKOFF_BASE ** attempt)  # Exponential backoff
+                        continue
+                    else:
+                        raise Exception(f"Failed to fetch playlist videos after {max_retries} attempts due to SSL/network issues: {str(e)}")
             
-            logger.info(f"Fetched {len(videos)} videos from playlist {playlist_id}")
-            return videos
+            # Filter out deleted/private videos
+            valid_videos = [
+                item for item in response['items']
+                if item['snippet']['title'] != 'Deleted video' and
+                   item['snippet']['title'] != 'Private video'
+            ]
+            
+            return valid_videos, response.get('nextPageToken')
             
         except HttpError as e:
             logger.error(f"YouTube API error: {str(e)}")
@@ -239,12 +516,14 @@ class YouTubeService:
         if not self.youtube:
             raise Exception("YouTube service not authenticated")
         
+        from googleapiclient.errors import HttpError
+        
         try:
             request = self.youtube.videos().list(
                 part="snippet,contentDetails",
                 id=video_id
             )
-            response = request.execute()
+            response = self._execute(request)
             
             if not response['items']:
                 return None
@@ -263,6 +542,134 @@ class YouTubeService:
             logger.error(f"YouTube API error: {str(e)}")
             return None
 
+    def search_videos(self, query, max_results=5):
+        """
+        Search YouTube for music videos.
+        
+        Every search costs 100 quota units, whatever max_results is, so
+        results are cached per process by normalized query.
+        
+        Args:
+            query (str): Search query
+            max_results (int): Number of results to return, at most 50
+            
+        Returns:
+            list: Videos with 'id', 'title' and 'channel_title', best first
+        """
+        if not self.youtube:
+            raise Exception("YouTube service not authenticated")
+        
+        videos = self.search_cache.get(query, max_results)
+        if videos is not None:
+            return videos
+        
+        from googleapiclient.errors import HttpError
+        
+        try:
+            response = self._execute_with_fallback(
+                lambda youtube: youtube.search().list(
+                    part="snippet",
+                    q=query,
+                    type="video",
+                    videoCategoryId="10",  # Music
+                    maxResults=max_results
+                )
+            )
+        except HttpError as e:
+            if e.resp.status in (403, 429):
+                # Reporting the track as not found would silently drop it
+                raise Exception(f"YouTube quota or rate limit exceeded: {str(e)}")
+            logger.error(f"YouTube search error: {str(e)}")
+            return []
+        
+        videos = [
+            {
+                'id': item['id']['videoId'],
+                'title': html.unescape(item['snippet']['title']),
+                'channel_title': html.unescape(item['snippet']['channelTitle'])
+            }
+            for item in response.get('items', [])
+            if item['id'].get('videoId')
+        ]
+        self.search_cache.put(query, max_results, videos)
+        return videos
+    
+    def create_playlist(self, title, description="", privacy_status='private'):
+        """
+        Create a playlist on the connected YouTube account.
+        
+        Args:
+            title (str): Playlist title
+            description (str): Playlist description
+            privacy_status (str): 'private', 'unlisted' or 'public'
+            
+        Returns:
+            dict: Playlist information including ID and URL
+        """
+        if not self.youtube:
+            raise Exception("YouTube service not authenticated")
+        
+        from googleapiclient.errors import HttpError
+        
+        try:
+            playlist = self._execute(self.youtube.playlists().insert(
+                part="snippet,status",
+                body={
+                    'snippet': {'title': title, 'description': description},
+                    'status': {'privacyStatus': privacy_status}
+                }
+            ))
+            
+            logger.info(f"Created YouTube playlist: {title} (ID: {playlist['id']})")
+            return {
+                'id': playlist['id'],
+                'title': playlist['snippet']['title'],
+                'url': f"https://www.youtube.com/playlist?list={playlist['id']}"
+            }
+            
+        except HttpError as e:
+            logger.error(f"Failed to create YouTube playlist: {str(e)}")
+            raise Exception(f"Failed to create playlist: {str(e)}")
+    
+    def add_videos_to_playlist(self, playlist_id, video_ids, on_batch=None):
+        """
+        Add videos to a YouTube playlist, in order.
+        
+        The API takes one video per insert, so each video is one request.
+        
+        Args:
+            playlist_id (str): YouTube playlist ID
+            video_ids (list): YouTube video IDs
+            on_batch (callable): Called as on_batch(videos_added, total_videos) after each video
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.youtube:
+            raise Exception("YouTube service not authenticated")
+        
+        from googleapiclient.errors import HttpError
+        
+        try:
+            for i, video_id in enumerate(video_ids):
+                self._execute(self.youtube.playlistItems().insert(
+                    part="snippet",
+                    body={'snippet': {
+                        'playlistId': playlist_id,
+                        'resourceId': {'kind': 'youtube#video', 'videoId': video_id}
+                    }}
+                ))
+                
+                if on_batch:
+                    on_batch(i + 1, len(video_ids))
+            
+            logger.info(f"Successfully added {len(video_ids)} videos to playlist {playlist_id}")
+            return True
+            
+        except HttpError as e:
+            logger.error(f"Failed to add videos to playlist: {str(e)}")
+            return False
+    
     def _create_fallback_service(self):
         """Create a fallback YouTube service with alternative SSL settings."""
         try:
@@ -271,17 +678,16 @@ class YouTubeService:
                 return None
             
             # Try with more permissive SSL settings
-            import ssl
             import httplib2
             
             # Create HTTP client with relaxed SSL verification
             http = httplib2.Http(
-                timeout=60,
+                timeout=self.config.FALLBACK_HTTP_TIMEOUT,
                 disable_ssl_certificate_validation=True  # More permissive for troubleshooting
             )
             
             # Build service with the alternative HTTP client
-            youtube_fallback = build('youtube', 'v3', developerKey=api_key, http=http)
+            youtube_fallback = build_youtube_client(developer_key=api_key, http=http)
             logger.info("Created fallback YouTube service with relaxed SSL settings")
             return youtube_fallback
             
@@ -289,20 +695,25 @@ class YouTubeService:
             logger.warning(f"Failed to create fallback service: {e}")
             return None
 
-    def _execute_with_fallback(self, request_func, *args, **kwargs):
-        """Execute a YouTube API request with fallback on SSL errors."""
-        max_retries = 3
+    def _execute_with_fallback(self, request_func):
+        """
+        Execute a YouTube API request with fallback on SSL errors.
+        
+        Args:
+            request_func (callable): Builds the request from the client it
+                is given, so it can be rebuilt on the fallback client
+        """
+        max_retries = self.config.NETWORK_RETRIES
         
         # First try with the main service
         for attempt in range(max_retries):
             try:
-                request = request_func(*args, **kwargs)
-                return request.execute()
+                return self._execute(request_func(self.youtube))
                 
             except (ssl.SSLError, OSError) as e:
                 logger.warning(f"SSL/Network error on attempt {attempt + 1}: {e}")
                 if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)
+                    time.sleep(self.config.RETRY_BACKOFF_BASE ** attempt)
                     continue
                 else:
                     logger.warning("Main service failed, trying fallback service...")
@@ -315,17 +726,57 @@ class YouTubeService:
         fallback_service = self._create_fallback_service()
         if fallback_service:
             try:
-                # Replace the service temporarily for this request
-                original_service = self.youtube
-                self.youtube = fallback_service
-                request = request_func(*args, **kwargs)
-                result = request.execute()
-                self.youtube = original_service  # Restore original service
+                result = self._execute(request_func(fallback_service))
                 logger.info("Fallback service succeeded")
                 return result
             except Exception as e:
-                self.youtube = original_service  # Restore original service
                 logger.error(f"Fallback service also failed: {e}")
                 raise e
         
-        raise Exception("Both main and fallback services failed due to SSL/network issues") 
\ No newline at end of file
+        raise Exception("Both main and fallback services failed due to SSL/network issues") 
+    
+    def _execute(self, request):
+        """
+        Execute an API request through the shared rate limiter.
+        
+        Rate-limit errors (429, or 403 rateLimitExceeded) are reported to the
+        limiter and the request is retried; other errors are raised as is.
+        Requests also wait for a slot under the adaptive concurrency limit.
+        
+        Args:
+            request: googleapiclient HttpRequest
+            
+        Returns:
+            dict: API response
+        """
+        from googleapiclient.errors import HttpError
+        
+        max_attempts = self.config.RATE_LIMIT_RETRIES
+        for attempt in range(max_attempts):
+            self.rate_limiter.acquire()
+            started_at = self.concurrency_limiter.acquire()
+            outcome = 'dropped'
+            try:
+                result = request.execute()
+                outcome = 'ok'
+                return result
+            except HttpError as e:
+                details = e.error_details if isinstance(e.error_details, list) else []
+                rate_limited = e.resp.status == 429 or (
+                    e.resp.status == 403 and any(
+                        isinstance(detail, dict) and detail.get('reason') in RATE_LIMIT_REASONS
+                        for detail in details
+                    )
+                )
+                if not rate_limited and e.resp.status < 500:
+                    outcome = 'ignore'
+                if not rate_limited or attempt == max_attempts - 1:
+                    raise
+                
+                try:
+                    retry_after = float(e.resp.get('retry-after', self.config.RETRY_BACKOFF_BASE ** attempt))
+                except (TypeError, ValueError):
+                    retry_after = float(self.config.RETRY_BACKOFF_BASE ** attempt)
+                self.rate_limiter.throttled(retry_after)
+            finally:
+                self.concurrency_limiter.release(started_at, outcome, getattr(request, 'methodId', None))
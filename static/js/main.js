@@ -409,6 +409,7 @@ class FormValidator {
 class LoadingSystem {
     constructor() {
         this.isLoading = false;
+        this.isLive = false;
         this.currentStep = 0;
         this.loadingInterval = null;
         this.particlesInterval = null;
@@ -517,7 +518,7 @@ class LoadingSystem {
 
     animateSteps(loadingStepElement, steps) {
         const updateStep = () => {
-            if (!this.isLoading) return;
+            if (!this.isLoading || this.isLive) return;
 
             if (this.currentStep < steps.length) {
                 this.transitionStep(loadingStepElement, steps[this.currentStep]);
@@ -583,8 +584,40 @@ class LoadingSystem {
         }, 10000);
     }
 
+    /**
+     * Switch from the simulated step animation to real progress updates
+     */
+    setLive() {
+        this.isLive = true;
+        if (this.loadingInterval) {
+            clearTimeout(this.loadingInterval);
+            this.loadingInterval = null;
+        }
+    }
+
+    setStep(icon, text) {
+        const loadingStepElement = document.getElementById('loadingStep');
+        if (!loadingStepElement) return;
+
+        const label = document.createElement('span');
+        label.textContent = text;
+        loadingStepElement.innerHTML = icon;
+        loadingStepElement.appendChild(label);
+    }
+
+    setProgress(percent) {
+        const progressBar = document.querySelector('#loadingState .progress-bar');
+        if (!progressBar) return;
+
+        const value = Math.max(0, Math.min(100, Math.round(percent)));
+        progressBar.classList.remove('progress-bar-animated');
+        progressBar.style.width = value + '%';
+        progressBar.setAttribute('aria-valuenow', value);
+    }
+
     hide() {
         this.isLoading = false;
+        this.isLive = false;
         this.currentStep = 0;
         
         if (this.loadingInterval) {
@@ -710,8 +743,95 @@ class ConversionFormHandler extends FormValidator {
             subtitle: 'Analyzing your YouTube playlist and finding matches on Spotify'
         });
 
-        // Submit the actual form
-        this.form.submit();
+        // Stream progress when the browser supports it, otherwise do a full-page submit
+        if (window.EventSource && window.fetch) {
+            this.startStreamingConversion(formData);
+        } else {
+            this.form.submit();
+        }
+    }
+
+    async startStreamingConversion(formData) {
+        try {
+            const response = await fetch(this.form.action, {
+                method: 'POST',
+                body: formData,
+                credentials: 'same-origin',
+                headers: { 'Accept': 'application/json' }
+            });
+            const data = await response.json();
+
+            if (!response.ok) {
+                this.handleConversionFailure(data.error, data.redirect);
+                return;
+            }
+
+            this.listenForProgress(data);
+        } catch (err) {
+            console.error('Failed to start conversion:', err);
+            this.handleConversionFailure('Could not start the conversion. Please try again.');
+        }
+    }
+
+    listenForProgress(job) {
+        const source = new EventSource(job.events_url);
+        const loading = this.loadingSystem;
+        loading.setLive();
+
+        const on = (name, handler) => source.addEventListener(name, (event) => {
+            handler(JSON.parse(event.data));
+        });
+
+        on('stage', (data) => {
+            loading.setStep('<i class="fas fa-circle-notch fa-spin text-primary"></i>', data.message);
+        });
+
+        on('page', (data) => {
+            loading.setStep('<i class="fas fa-list text-danger"></i>',
+                `Fetched ${Utils.formatNumber(data.fetched)} of ${Utils.formatNumber(data.total)} videos`);
+            if (data.total) loading.setProgress(data.fetched / data.total * 20);
+        });
+
+        on('track', (data) => {
+            loading.setStep('<i class="fas fa-search text-success"></i>',
+                `Matching ${data.index}/${data.total}: ${data.title}`);
+            loading.setProgress(20 + data.index / data.total * 70);
+        });
+
+        on('batch', (data) => {
+            loading.setStep('<i class="fas fa-plus text-success"></i>',
+                `Adding tracks to Spotify (${data.added}/${data.total})`);
+            loading.setProgress(90 + data.added / data.total * 10);
+        });
+
+        on('complete', () => {
+            source.close();
+            loading.setProgress(100);
+            window.location.href = job.result_url;
+        });
+
+        on('failed', () => {
+            source.close();
+            window.location.href = job.result_url;
+        });
+
+        source.onerror = () => {
+            // EventSource reconnects on its own and resumes from Last-Event-ID
+            if (source.readyState === EventSource.CLOSED) {
+                this.handleConversionFailure('Lost connection to the conversion progress stream.');
+            }
+        };
+    }
+
+    handleConversionFailure(message, redirectUrl) {
+        if (redirectUrl && redirectUrl !== window.location.pathname) {
+            window.location.href = redirectUrl;
+            return;
+        }
+
+        this.loadingSystem.hide();
+        this.form.classList.remove('d-none');
+        NotificationSystem.error(message || 'An error occurred during conversion.');
     }
 }
 
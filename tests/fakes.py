@@ -0,0 +1,86 @@
+"""In-memory stand-ins for the YouTube and Spotify services used by TransferService."""
+from config.settings import Config
+from utils.query_planner import QueryPlanner
+
+def playlist_item(video_id, title, channel='Uploader'):
+    return {
+        'contentDetails': {'videoId': video_id},
+        'snippet': {'title': title, 'channelTitle': channel, 'channelId': f"UC{channel}"}
+    }
+
+class FakeYouTubeService:
+    def __init__(self, videos, page_size=50):
+        self.videos = videos
+        self.page_size = page_size
+        self.youtube = None
+        self.pages_fetched = 0
+
+    def fork(self):
+        return self
+
+    def extract_playlist_id(self, playlist_url):
+        return 'PL1'
+
+    def authenticate(self):
+        self.youtube = object()
+        return True
+
+    def get_playlist_info(self, playlist_id):
+        return {'id': playlist_id, 'title': 'Mix', 'item_count': len(self.videos)}
+
+    def get_playlist_page(self, playlist_id, page_token=None, max_results=None):
+        start = int(page_token or 0)
+        end = start + self.page_size
+        self.pages_fetched += 1
+        return self.videos[start:end], str(end) if end < len(self.videos) else None
+
+class FakeChannelArtists:
+    def __init__(self):
+        self.recorded = []
+
+    def record(self, channel_id, channel_title, artist_id, artist_name):
+        self.recorded.append(channel_id)
+        return False
+
+class FakeSpotifyService:
+    """Matches a video when its title is in `tracks` (title -> track ID)."""
+
+    def __init__(self, tracks):
+        self.tracks = tracks
+        self.searched = []
+        self.uploads = []
+        self.created = []
+        self.config = Config
+        self.query_planner = QueryPlanner()
+        self.channel_artists = FakeChannelArtists()
+
+    def fork(self):
+        return self
+
+    def restore_session(self, user_id):
+        return True
+
+    def match_isrc(self, isrc):
+        return None
+
+    def match_track(self, query, artist=None, channel_title=None, channel_id=None):
+        self.searched.append(query)
+        track_id = self.tracks.get(query)
+        if not track_id:
+            return None
+        return {'id': track_id, 'name': query, 'artist': 'Artist', 'artist_id': 'ar1',
+                'method': 'free_text', 'confidence': 1.0}
+
+    def find_user_playlist(self, user_id, name):
+        return None
+
+    def create_playlist(self, user_id, name, description=''):
+        self.created.append(name)
+        return {'id': 'sp1', 'url': 'https://open.spotify.com/playlist/sp1'}
+
+    def add_tracks_to_playlist(self, playlist_id, track_ids, on_batch=None, skip_existing=False,
+                               preserve_positions=False):
+        self.uploads.extend(track_ids)
+        if on_batch:
+            on_batch(len(track_ids), len(track_ids))
+        return True
@@ -0,0 +1,75 @@
+from services.artist_catalog import ArtistCatalogCache
+from services.result_store import MemoryResultStore
+from services.spotify_service import SpotifyService
+from services.transfer_service import TransferService
+from tests.fakes import FakeYouTubeService
+
+class FakeSpotipy:
+    """An artist with album_count albums of one track each."""
+
+    def __init__(self, album_count):
+        self.album_count = album_count
+        self.requests = 0
+
+    def artist_albums(self, artist_id, album_type=None, limit=50, offset=0):
+        self.requests += 1
+        ids = range(offset, min(offset + limit, self.album_count))
+        return {'items': [{'id': f"album{i}"} for i in ids], 'total': self.album_count}
+
+    def albums(self, album_ids):
+        self.requests += 1
+        return {'albums': [
+            {'id': album_id, 'tracks': {'items': [{'id': f"track-{album_id}", 'name': f"Song {album_id}",
+                                                   'artists': [{'id': 'artist1', 'name': 'Bach'}]}],
+                                        'total': 1, 'next': None}}
+            for album_id in album_ids
+        ]}
+
+def make_service(album_count):
+    service = SpotifyService()
+    service.sp = FakeSpotipy(album_count)
+    service.catalog_cache = ArtistCatalogCache()
+    return service
+
+def test_catalogue_over_budget_is_skipped_after_one_request():
+    service = make_service(3000)
+
+    assert service.get_artist_catalog('artist1', max_requests=10) is None
+    assert service.get_artist_catalog('artist1', max_requests=10) is None
+    assert service.sp.requests == 1
+
+def test_catalogue_of_a_prolific_artist_is_capped(monkeypatch):
+    service = make_service(3000)
+    monkeypatch.setattr(service.config, 'ARTIST_CATALOG_MAX_ALBUMS', 100)
+
+    tracks = service.get_artist_catalog('artist1')
+
+    assert len(tracks) == 100
+    # Two album pages and five batches of 20 albums
+    assert service.sp.requests == 7
+
+def video(title, channel='Bach'):
+    return {'snippet': {'title': title, 'videoOwnerChannelTitle': channel, 'resourceId': {'videoId': title}}}
+
+class FakeArtistService:
+    def __init__(self):
+        self.catalog_requests = []
+
+    def find_artist(self, name):
+        return {'id': 'artist1', 'name': name}
+
+    def get_artist_catalog(self, artist_id, max_requests=None):
+        self.catalog_requests.append(max_requests)
+        return [{'id': 't1', 'name': 'Air', 'artist': 'Bach', 'artist_id': artist_id}]
+
+def test_matcher_is_reused_and_budgeted_by_the_whole_playlist():
+    spotify = FakeArtistService()
+    transfer = TransferService(FakeYouTubeService([]), spotify, MemoryResultStore())
+    transfer.catalog_matching = True
+    chunk = [video(f"Bach - Piece {i}") for i in range(20)]
+
+    first = transfer.build_catalog_matcher(chunk, video_count=200)
+    second = transfer.build_catalog_matcher(chunk, video_count=200)
+
+    assert first is second
+    assert spotify.catalog_requests == [200, 200]
@@ -0,0 +1,46 @@
+import gzip
+import json
+from services.cassette import Cassette, anonymize_uri, scrub
+
+USER_ID = 'alice123'
+
+ME = (b'{"id": "alice123", "display_name": "Alice", "uri": "spotify:user:alice123",'
+      b' "href": "https://api.spotify.com/v1/users/alice123",'
+      b' "external_urls": {"spotify": "https://open.spotify.com/user/alice123"}}')
+PLAYLISTS = (b'{"href": "https://api.spotify.com/v1/users/alice123/playlists?offset=0&limit=50",'
+             b' "items": [{"id": "37i9dQZF1DXcBWIGoYBM5M", "type": "playlist", "name": "Mix",'
+             b' "owner": {"id": "alice123", "display_name": "Alice", "uri": "spotify:user:alice123"}}]}')
+
+def record_session(directory):
+    cassette = Cassette('record', str(directory))
+    cassette.record('spotify', 'GET', 'https://api.spotify.com/v1/me', 200, {}, ME, 0.01)
+    cassette.record('spotify', 'GET', 'https://api.spotify.com/v1/users/alice123/playlists?limit=50',
+                    200, {}, PLAYLISTS, 0.01)
+    cassette.close()
+
+def test_recorded_exchanges_keep_no_raw_user_id(tmp_path):
+    record_session(tmp_path)
+
+    recorded = ''.join(gzip.open(path, 'rt').read() for path in tmp_path.iterdir())
+    assert USER_ID not in recorded
+    assert '37i9dQZF1DXcBWIGoYBM5M' in recorded
+
+def test_replayed_user_id_leads_to_the_recorded_playlists(tmp_path):
+    record_session(tmp_path)
+    cassette = Cassette('replay', str(tmp_path), speed=0)
+
+    status, headers, body = cassette.replay('spotify', 'GET', 'https://api.spotify.com/v1/me')
+    user_id = json.loads(body)['id']
+    status, headers, body = cassette.replay(
+        'spotify', 'GET', f"https://api.spotify.com/v1/users/{user_id}/playlists?limit=50")
+
+    assert status == 200
+    assert b'"Mix"' in body
+
+def test_user_ids_are_hashed_consistently():
+    scrubbed = scrub({'id': 'x', 'owner': {'id': USER_ID}, 'uri': f"spotify:user:{USER_ID}"})
+    hashed = scrubbed['owner']['id']
+
+    assert scrubbed['id'] == 'x'
+    assert scrubbed['uri'] == f"spotify:user:{hashed}"
+    assert anonymize_uri(f"https://api.spotify.com/v1/users/{USER_ID}") == f"https://api.spotify.com/v1/users/{hashed}"
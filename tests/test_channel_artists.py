@@ -0,0 +1,54 @@
+from services.artist_catalog import ArtistCatalogCache
+from services.channel_artists import ChannelArtistMap
+from services.spotify_service import SpotifyService
+
+def track(track_id, name, artist='Taylor Swift', artist_id='artist1'):
+    return {'id': track_id, 'name': name, 'artists': [{'id': artist_id, 'name': artist}]}
+
+class FakeSpotipy:
+    def __init__(self, top_tracks):
+        self.top_tracks = top_tracks
+        self.searches = []
+
+    def artist_top_tracks(self, artist_id):
+        return {'tracks': self.top_tracks}
+
+    def search(self, q, type='track', limit=10):
+        self.searches.append(q)
+        return {'tracks': {'items': []}}
+
+def test_processes_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / 'channels.json')
+    first = ChannelArtistMap(path=path)
+    second = ChannelArtistMap(path=path)
+    first.get('UC1')
+    second.get('UC2')
+
+    assert first.record('UC1', 'Taylor Swift', 'artist1', 'Taylor Swift')
+    assert second.record('UC2', 'Adele - Topic', 'artist2', 'Adele')
+
+    assert ChannelArtistMap(path=path).get('UC1') == ('artist1', 'Taylor Swift')
+    assert second.get('UC1') == ('artist1', 'Taylor Swift')
+
+def test_mapped_channel_is_matched_by_artist_id_without_searching(tmp_path):
+    service = SpotifyService()
+    service.sp = FakeSpotipy([track('t1', 'Anti-Hero'), track('t2', 'Shake It Off')])
+    service.catalog_cache = ArtistCatalogCache()
+    service.channel_artists = ChannelArtistMap(path=str(tmp_path / 'channels.json'))
+    service.channel_artists.record('UC1', 'TaylorSwiftVEVO', 'artist1', 'Taylor Swift')
+
+    match = service.match_track('Taylor Swift - Shake It Off (Official Video)', channel_title='TaylorSwiftVEVO',
+                                channel_id='UC1')
+
+    assert (match['id'], match['method']) == ('t2', 'mapped_artist')
+    assert service.sp.searches == []
+
+def test_mapped_channel_falls_back_to_searching(tmp_path):
+    service = SpotifyService()
+    service.sp = FakeSpotipy([track('t1', 'Anti-Hero')])
+    service.catalog_cache = ArtistCatalogCache()
+    service.channel_artists = ChannelArtistMap(path=str(tmp_path / 'channels.json'))
+    service.channel_artists.record('UC1', 'TaylorSwiftVEVO', 'artist1', 'Taylor Swift')
+
+    assert service.match_track('Taylor Swift - Love Story', channel_title='TaylorSwiftVEVO', channel_id='UC1') is None
+    assert service.sp.searches
@@ -0,0 +1,49 @@
+import pytest
+from services.checkpoint_store import CheckpointLeaseLost, MemoryCheckpointStore, is_interrupted
+from services.result_store import MemoryResultStore
+from services.transfer_service import TransferError, TransferService
+from tests.fakes import FakeSpotifyService, FakeYouTubeService
+
+def test_saved_checkpoint_is_not_aliased():
+    store = MemoryCheckpointStore()
+    checkpoint = {'job_id': 'job1', 'user_id': 'user1', 'track_ids': ['t1']}
+    store.save('job1', checkpoint)
+
+    checkpoint['track_ids'].append('t2')
+    store.get('job1')['track_ids'].append('t3')
+
+    assert store.get('job1')['track_ids'] == ['t1']
+
+def test_running_conversion_cannot_be_claimed_until_released():
+    store = MemoryCheckpointStore()
+    checkpoint = {'job_id': 'job1', 'user_id': 'user1', 'owner': 'run1'}
+    assert store.claim('job1', 'run1')
+    store.save('job1', checkpoint)
+
+    assert not is_interrupted(store, checkpoint)
+    assert not store.claim('job1', 'run2')
+
+    store.release('job1', 'run1')
+    assert is_interrupted(store, checkpoint)
+    assert store.claim('job1', 'run2')
+
+def test_expired_lease_can_be_claimed_and_the_old_run_stops_saving():
+    store = MemoryCheckpointStore()
+    checkpoint = {'job_id': 'job1', 'user_id': 'user1', 'owner': 'run1'}
+    store.claim('job1', 'run1')
+
+    store._leases['job1'] = ('run1', 0)
+    assert store.claim('job1', 'run2')
+    assert not store.renew('job1', 'run1')
+    with pytest.raises(CheckpointLeaseLost):
+        store.save('job1', checkpoint)
+
+def test_resume_of_a_running_conversion_is_refused():
+    store = MemoryCheckpointStore()
+    store.claim('job1', 'run1')
+    store.save('job1', {'job_id': 'job1', 'user_id': 'user1', 'owner': 'run1', 'processed': 0, 'uploaded': 0})
+    transfer = TransferService(FakeYouTubeService([]), FakeSpotifyService({}), MemoryResultStore(),
+                               checkpoint_store=store)
+
+    with pytest.raises(TransferError, match='still running'):
+        transfer.resume('job1', 'user1')
@@ -0,0 +1,70 @@
+import heapq
+import random
+import services.concurrency_limiter as limiter_module
+from services.concurrency_limiter import ConcurrencyLimiter
+
+def simulate(monkeypatch, limiter, latency, callers=16, requests=5000, endpoint='search'):
+    """Run callers that each send one request after another; latency(in_flight) gives each request's time."""
+    clock = [0.0]
+    monkeypatch.setattr(limiter_module.time, 'monotonic', lambda: clock[0])
+    finishing = []
+    waiting = callers
+
+    def start_waiting():
+        nonlocal waiting
+        while waiting and limiter.get_stats()['in_flight'] < limiter.current_limit():
+            started_at = limiter.acquire()
+            heapq.heappush(finishing, (clock[0] + latency(limiter.get_stats()['in_flight']), started_at))
+            waiting -= 1
+
+    start_waiting()
+    for _ in range(requests):
+        clock[0], started_at = heapq.heappop(finishing)
+        limiter.release(started_at, 'ok', endpoint)
+        waiting += 1
+        start_waiting()
+    while finishing:
+        clock[0], started_at = heapq.heappop(finishing)
+        limiter.release(started_at, 'ok', endpoint)
+
+def test_limit_holds_when_latency_does_not_depend_on_load(monkeypatch):
+    rng = random.Random(7)
+    limiter = ConcurrencyLimiter('test', initial_limit=8, max_limit=32)
+
+    simulate(monkeypatch, limiter, lambda in_flight: rng.lognormvariate(-3.0, 0.5))
+
+    # Jitter alone may trim the limit now and then, but never drags it down
+    assert limiter.current_limit() >= 8
+    assert limiter.get_stats()['decreases'] <= 2
+
+def test_limit_drops_when_the_upstream_starts_queueing(monkeypatch):
+    rng = random.Random(7)
+    limiter = ConcurrencyLimiter('test', initial_limit=8, max_limit=32)
+    simulate(monkeypatch, limiter, lambda in_flight: rng.lognormvariate(-3.0, 0.5), requests=1000)
+    limit = limiter.current_limit()
+
+    # The upstream serves 4 requests at a time; more queue behind them
+    simulate(monkeypatch, limiter, lambda in_flight: 0.05 * max(1.0, in_flight / 4), requests=100)
+
+    assert limiter.current_limit() < limit
+
+def test_endpoints_keep_their_own_baseline(monkeypatch):
+    limiter = ConcurrencyLimiter('test', initial_limit=4, max_limit=4)
+    clock = [0.0]
+    monkeypatch.setattr(limiter_module.time, 'monotonic', lambda: clock[0])
+
+    for _ in range(200):
+        for endpoint, latency in (('search', 0.05), ('playlist_add_items', 0.5)):
+            started_at = limiter.acquire()
+            clock[0] += latency
+            limiter.release(started_at, 'ok', endpoint)
+
+    assert limiter.get_stats()['decreases'] == 0
+    assert limiter.get_stats()['endpoints']['playlist_add_items']['baseline_ms'] == 500.0
+
+def test_dropped_requests_halve_the_limit():
+    limiter = ConcurrencyLimiter('test', initial_limit=8, max_limit=32)
+
+    limiter.release(limiter.acquire(), 'dropped')
+
+    assert limiter.current_limit() == 4
@@ -0,0 +1,67 @@
+import services.youtube_service as youtube_module
+from services.health_service import CIRCUIT_FAILURE_THRESHOLD, HealthMonitor
+from services.youtube_service import HEALTH_CHECK_VIDEO_ID, YouTubeService
+
+def test_circuit_opens_after_consecutive_failures_and_closes_on_success():
+    outcomes = [False] * CIRCUIT_FAILURE_THRESHOLD + [True]
+    monitor = HealthMonitor(interval_seconds=60, ttl_seconds=60)
+    monitor.register_check('youtube', lambda: outcomes.pop(0))
+
+    for _ in range(CIRCUIT_FAILURE_THRESHOLD - 1):
+        monitor.run_checks()
+        assert not monitor.circuit_open('youtube')
+
+    monitor.run_checks()
+    assert monitor.circuit_open('youtube')
+    assert monitor.report()['upstreams']['youtube']['circuit'] == 'open'
+
+    monitor.run_checks()
+    assert not monitor.circuit_open('youtube')
+
+def test_youtube_ping_looks_up_a_video_with_the_health_timeout(monkeypatch):
+    calls = []
+
+    class FakeVideos:
+        def list(self, **kwargs):
+            calls.append(kwargs)
+            return self
+
+        def execute(self):
+            return {'items': []}
+
+    class FakeClient:
+        def videos(self):
+            return FakeVideos()
+
+    def build(developer_key=None, credentials=None, http=None):
+        calls.append(http.timeout)
+        return FakeClient()
+
+    monkeypatch.setattr(youtube_module, 'build_youtube_client', build)
+    service = YouTubeService()
+    service.config.YOUTUBE_API_KEY = 'key'
+
+    assert service.ping()
+    assert calls == [service.config.HEALTH_CHECK_TIMEOUT, {'id': HEALTH_CHECK_VIDEO_ID, 'part': 'id'}]
+
+def test_youtube_ping_reports_network_errors(monkeypatch):
+    def build(developer_key=None, credentials=None, http=None):
+        raise OSError('unreachable')
+
+    monkeypatch.setattr(youtube_module, 'build_youtube_client', build)
+    service = YouTubeService()
+    service.config.YOUTUBE_API_KEY = 'key'
+
+    assert not service.ping()
+
+def test_report_reads_stats_gathered_by_the_check_loop():
+    calls = []
+    monitor = HealthMonitor(interval_seconds=60, ttl_seconds=60)
+    monitor.register_stats('queue', lambda: calls.append(1) or {'queued_tasks': len(calls)})
+
+    assert monitor.report()['stats'] == {}
+
+    monitor.collect_stats()
+    monitor.report()
+    assert monitor.report()['stats'] == {'queue': {'queued_tasks': 1}}
+    assert len(calls) == 1
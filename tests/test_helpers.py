@@ -0,0 +1,33 @@
+import pytest
+from utils.helpers import diff_playlist_tracks
+
+def apply_runs(existing, runs):
+    playlist = list(existing)
+    for position, track_ids in runs:
+        if position is None:
+            playlist.extend(track_ids)
+        else:
+            playlist[position:position] = track_ids
+    return playlist
+
+@pytest.mark.parametrize('existing, wanted', [
+    ([], ['a', 'b', 'c']),
+    (['a', 'b'], ['a', 'b', 'c', 'd']),
+    (['a', 'c'], ['a', 'b', 'c', 'd']),
+    (['b', 'd'], ['a', 'b', 'c', 'd', 'e']),
+    (['a', 'b', 'a'], ['a', 'b', 'a', 'c', 'a']),
+    (['a', None, 'c'], ['a', 'b', 'c']),
+])
+def test_missing_tracks_are_inserted_in_wanted_order(existing, wanted):
+    runs = diff_playlist_tracks(existing, wanted, preserve_positions=True)
+
+    assert [track_id for track_id in apply_runs(existing, runs) if track_id] == wanted
+
+def test_missing_tracks_are_appended_in_one_run():
+    assert diff_playlist_tracks(['b'], ['a', 'b', 'c']) == [(None, ['a', 'c'])]
+
+def test_tracks_are_counted_as_a_multiset():
+    assert diff_playlist_tracks(['a', 'x'], ['a', 'a', 'b']) == [(None, ['a', 'b'])]
+
+def test_complete_playlist_needs_nothing():
+    assert diff_playlist_tracks(['a', 'b'], ['a', 'b'], preserve_positions=True) == []
@@ -0,0 +1,46 @@
+import random
+import pytest
+from utils.helpers import calculate_match_confidence
+from utils.match_scoring import BatchScorer, batch_match_confidence
+
+WORDS = ['love', 'Love', 'me', 'do', 'the', 'beatles', 'Beatles', 'official', 'video', 'remastered', '2009',
+         '(official', 'video)', '[hd]', 'feat.', 'ft.', 'lyrics', '-', '|', 'mix', 'Live', 'at', 'wembley', 'é']
+ARTISTS = [None, '', 'The Beatles', 'beatles', 'Me', 'Queen']
+
+def random_title(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 8)))
+
+@pytest.mark.parametrize('youtube_title, spotify_title, artist', [
+    ('The Beatles - Love Me Do (Official Video)', 'Love Me Do - Remastered 2009', 'The Beatles'),
+    ('Queen - Bohemian Rhapsody [HD]', 'Bohemian Rhapsody', 'Queen'),
+    ('', 'Song', None),
+    ('Song', '', 'Artist'),
+    ('(Official Video)', 'Song', None),
+    ('a', 'a much much longer spotify title', None),
+])
+def test_pairs_score_like_calculate_match_confidence(youtube_title, spotify_title, artist):
+    expected = calculate_match_confidence(youtube_title, spotify_title, artist)
+
+    assert BatchScorer().score_pair(youtube_title, spotify_title, artist) == expected
+
+def test_random_batches_score_like_calculate_match_confidence():
+    rng = random.Random(42)
+    youtube_titles = [random_title(rng) for _ in range(300)]
+    candidates = [[(random_title(rng), rng.choice(ARTISTS)) for _ in range(rng.randint(0, 5))]
+                  for _ in youtube_titles]
+
+    expected = [[calculate_match_confidence(youtube_title, title, artist) for title, artist in row]
+                for youtube_title, row in zip(youtube_titles, candidates)]
+
+    assert batch_match_confidence(youtube_titles, candidates) == expected
+
+def test_reused_scorer_stays_exact_across_cache_resets():
+    rng = random.Random(3)
+    scorer = BatchScorer()
+
+    for _ in range(500):
+        scorer.limit_cache(max_titles=50)
+        youtube_title, spotify_title, artist = random_title(rng), random_title(rng), rng.choice(ARTISTS)
+        expected = calculate_match_confidence(youtube_title, spotify_title, artist)
+        assert scorer.score_pair(youtube_title, spotify_title, artist) == expected
+    assert len(scorer._youtube) + len(scorer._spotify) <= 52
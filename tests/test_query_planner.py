@@ -0,0 +1,75 @@
+from services.spotify_service import SpotifyService
+from utils.query_planner import QueryPlanner
+
+class FakeSpotify:
+    """Answers track searches from a query -> (name, artist) table."""
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def search(self, q, type='track', limit=1):
+        self.queries.append(q)
+        found = self.results.get(q)
+        items = []
+        if found:
+            name, artist = found
+            items.append({'id': f"id-{name}", 'name': name, 'artists': [{'id': f"ar-{artist}", 'name': artist}]})
+        return {'tracks': {'items': items}}
+
+def make_service(results):
+    service = SpotifyService()
+    service.query_planner = QueryPlanner()
+    service.sp = FakeSpotify(results)
+    return service
+
+def test_plan_keeps_only_the_best_ranked_queries():
+    planner = QueryPlanner()
+    full = planner.plan('Daft Punk - One More Time (Official Video)', channel_title='Some Channel')
+    capped = planner.plan('Daft Punk - One More Time (Official Video)', channel_title='Some Channel',
+                          max_queries=2)
+
+    assert len(full) > 2
+    assert capped == full[:2]
+
+def test_plan_ranks_strategies_by_hit_rate():
+    planner = QueryPlanner()
+    for _ in range(10):
+        planner.record('split_swapped', True)
+        planner.record('split_fields', False)
+
+    strategies = [candidate.strategy for candidate in planner.plan('Artist - Song')]
+    assert strategies.index('split_swapped') < strategies.index('split_fields')
+    assert strategies[-1] == 'title_only'
+
+def test_miss_costs_at_most_max_searches_per_video():
+    service = make_service({})
+
+    assert service.match_track('Nobody - Unknown Song', channel_title='Random Uploads') is None
+    assert len(service.sp.queries) == service.config.MAX_SEARCHES_PER_VIDEO
+    assert service.query_planner.get_stats()['searches'] == service.config.MAX_SEARCHES_PER_VIDEO
+
+def test_low_confidence_result_is_a_miss_and_search_goes_on():
+    planner = QueryPlanner()
+    first, second = planner.plan('Queen - Bohemian Rhapsody', max_queries=2)
+    service = make_service({
+        first.query: ('Completely Different Thing', 'Someone'),
+        second.query: ('Bohemian Rhapsody', 'Queen'),
+    })
+
+    match = service.match_track('Queen - Bohemian Rhapsody')
+
+    assert match['name'] == 'Bohemian Rhapsody'
+    assert match['method'] == second.strategy
+    assert match['confidence'] >= service.config.SPOTIFY_MIN_CONFIDENCE
+    strategies = service.query_planner.get_stats()['strategies']
+    assert strategies[first.strategy]['hits'] == 0
+    assert strategies[second.strategy]['hits'] == 1
+
+def test_no_match_when_nothing_passes_the_confidence_threshold():
+    planner = QueryPlanner()
+    plan = planner.plan('Queen - Bohemian Rhapsody', max_queries=3)
+    service = make_service({candidate.query: ('Completely Different Thing', 'Someone') for candidate in plan})
+
+    assert service.match_track('Queen - Bohemian Rhapsody') is None
+    assert len(service.sp.queries) == len(plan)
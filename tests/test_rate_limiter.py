@@ -0,0 +1,40 @@
+import pytest
+import services.rate_limiter as rate_limiter_module
+from services.rate_limiter import MIN_RATE_FRACTION, RECOVERY_PER_SECOND, LocalTokenBucket
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiter_module.time, 'time', lambda: now[0])
+    return now
+
+def test_bucket_hands_out_its_burst_then_refills_at_the_rate(clock):
+    bucket = LocalTokenBucket(rate=10, capacity=2)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+
+    clock[0] += 0.1
+    assert bucket.reserve() == 0
+
+def test_throttling_blocks_halves_the_rate_and_recovers(clock):
+    bucket = LocalTokenBucket(rate=10, capacity=5)
+
+    bucket.penalize(retry_after=2)
+    assert bucket.reserve() == pytest.approx(2)
+    assert bucket.current_rate() == pytest.approx(5)
+
+    clock[0] += 1
+    assert bucket.current_rate() == pytest.approx(5 + 10 * RECOVERY_PER_SECOND)
+    clock[0] += 60
+    assert bucket.current_rate() == 10
+
+def test_rate_has_a_floor(clock):
+    bucket = LocalTokenBucket(rate=10, capacity=5)
+
+    for _ in range(20):
+        clock[0] += 1
+        bucket.penalize(retry_after=0.5)
+
+    assert bucket.current_rate() >= 10 * MIN_RATE_FRACTION
@@ -0,0 +1,109 @@
+import gzip
+import json
+import pytest
+from services.result_store import MemoryResultStore
+from services.task_queue import QueuedJobManager, TaskQueue
+from services.transfer_service import TransferService
+from services.transfer_tasks import TransferTasks
+from tests.fakes import FakeSpotifyService, FakeYouTubeService, playlist_item
+from utils.result_io import (
+    export_columnar, export_csv, export_jsonl, iter_result_rows, load_results, matched_track_ids
+)
+
+TRACK_ID = '4uLU6hMCjMI75M1A2tKUQC'
+
+ROWS = [
+    {'status': 'matched', 'video_id': 'v1', 'title': 'Song', 'track_id': TRACK_ID, 'confidence': 0.9},
+    {'status': 'not_found', 'video_id': 'v2', 'title': 'Other', 'track_id': None, 'reason': 'Not found on Spotify'},
+]
+
+def columnar(document):
+    return gzip.compress(json.dumps(document).encode('utf-8'))
+
+@pytest.mark.parametrize('export', [
+    lambda rows: export_columnar(rows),
+    lambda rows: ''.join(export_jsonl(rows)).encode('utf-8'),
+    lambda rows: ''.join(export_csv(rows)).encode('utf-8'),
+])
+def test_exports_load_back(export):
+    rows = load_results(export(ROWS))
+
+    assert [row['video_id'] for row in rows] == ['v1', 'v2']
+    assert rows[0]['track_id'] == TRACK_ID
+
+def test_decompression_is_capped():
+    data = gzip.compress(b' ' * 10000)
+
+    with pytest.raises(ValueError, match='larger than'):
+        load_results(data, max_size=1000)
+
+def test_truncated_gzip_is_rejected():
+    with pytest.raises(ValueError):
+        load_results(export_columnar(ROWS)[:-12])
+
+@pytest.mark.parametrize('document', [
+    [],
+    {'fields': ['track_id']},
+    {'fields': ['track_id', 'title'], 'columns': {'track_id': [TRACK_ID]}},
+    {'fields': ['track_id', 'title'], 'columns': {'track_id': [TRACK_ID], 'title': []}},
+    {'fields': 'track_id', 'columns': {}},
+])
+def test_malformed_columnar_export_is_rejected(document):
+    with pytest.raises(ValueError):
+        load_results(columnar(document))
+
+def test_non_object_json_line_is_rejected():
+    data = b'{"track_id": "' + TRACK_ID.encode('ascii') + b'"}\n[1, 2]\n'
+
+    with pytest.raises(ValueError, match='line 2'):
+        load_results(data)
+
+@pytest.mark.parametrize('track_id', ['short', TRACK_ID + 'x', '4uLU6hMCjMI75M1A2tKU/C', 42])
+def test_invalid_track_ids_are_rejected(track_id):
+    data = (json.dumps({'status': 'matched', 'track_id': track_id}) + '\n').encode('utf-8')
+
+    with pytest.raises(ValueError, match='track ID'):
+        load_results(data)
+
+def test_rows_without_positions_keep_their_order():
+    rows = [{'status': 'matched', 'track_id': TRACK_ID, 'position': ''}, {'status': 'matched', 'track_id': None}]
+
+    assert [row['position'] for row in load_results(''.join(export_csv(rows)).encode('utf-8'))] == [None, None]
+    assert matched_track_ids([{'track_id': 'b', 'position': 1}, {'track_id': 'a', 'position': 0}]) == ['a', 'b']
+
+@pytest.mark.parametrize('position', [-1, 'x', 1.5, True])
+def test_invalid_positions_are_rejected(position):
+    data = (json.dumps({'status': 'matched', 'track_id': TRACK_ID, 'position': position}) + '\n').encode('utf-8')
+
+    with pytest.raises(ValueError, match='position'):
+        load_results(data)
+
+def test_export_of_a_queued_job_reimports_in_playlist_order(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr('redis.Redis.from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    videos = [playlist_item(video_id, f"Song {video_id.upper()}") for video_id in 'abacdef']
+    track_ids = {name: TRACK_ID[:-1] + name for name in 'ABCDF'}
+    spotify = FakeSpotifyService({f"Song {name}": track_id for name, track_id in track_ids.items()})
+    result_store = MemoryResultStore()
+    transfer = TransferService(FakeYouTubeService(videos, page_size=4), spotify, result_store,
+                               drop_duplicate_tracks=False)
+    queue = TaskQueue('redis://fake')
+    tasks = TransferTasks(queue, transfer, chunk_size=2)
+    jobs = QueuedJobManager(queue)
+    job = jobs.create('user1')
+    jobs.submit(job, 'transfer', playlist_url='https://www.youtube.com/playlist?list=PL1', user_id='user1')
+
+    # Workers finish the chunks of each round in reverse order
+    while True:
+        dequeued = iter(lambda: queue.dequeue(timeout=0), None)
+        batch = list(dequeued)
+        if not batch:
+            break
+        for task in reversed(batch):
+            tasks.handle(task)
+            queue.release(task)
+
+    rows = load_results(''.join(export_csv(iter_result_rows(result_store, job.id))).encode('utf-8'))
+    assert [row['video_id'] for row in rows] == list('abacdef')
+    assert matched_track_ids(rows) == spotify.uploads == [track_ids[name] for name in 'ABACDF']
@@ -0,0 +1,34 @@
+from services.search_cache import SearchCache
+from services.youtube_service import YouTubeService
+
+def make_service(calls):
+    def execute(request):
+        calls.append(request)
+        return {'items': [{'id': {'videoId': 'v1'}, 'snippet': {'title': 'Song', 'channelTitle': 'Artist'}}]}
+
+    service = YouTubeService()
+    service.youtube = object()
+    service.search_cache = SearchCache()
+    service._execute_with_fallback = execute
+    return service
+
+def test_youtube_searches_are_cached_by_normalized_query():
+    calls = []
+    service = make_service(calls)
+
+    first = service.search_videos('Artist  Song', max_results=5)
+    assert service.search_videos('artist song', max_results=5) == first
+    assert len(calls) == 1
+    assert service.search_cache.get_stats() == {'queries': 1, 'hits': 1, 'misses': 1}
+
+    service.search_videos('artist song', max_results=10)
+    assert len(calls) == 2
+
+def test_expired_searches_are_repeated():
+    calls = []
+    service = make_service(calls)
+    service.search_cache.ttl_seconds = 0
+
+    service.search_videos('artist song')
+    service.search_videos('artist song')
+    assert len(calls) == 2
@@ -0,0 +1,50 @@
+import ssl
+from services.spotify_service import SpotifyService
+from services.transfer_service import TransferService
+from services.youtube_service import YouTubeService
+
+class FakeRequest:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def execute(self):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+def test_fork_has_its_own_client_and_shares_caches():
+    shared = SpotifyService()
+    shared.sp = object()
+    job = shared.fork()
+
+    assert job.sp is None
+    job.sp = object()
+    assert shared.sp is not job.sp
+    assert job.query_planner is shared.query_planner
+    assert job._snapshots is shared._snapshots
+    assert job.rate_limiter is shared.rate_limiter
+
+def test_transfer_service_fork_forks_both_clients():
+    shared = TransferService(YouTubeService(), SpotifyService(), result_store=None)
+    job = shared.fork()
+
+    assert job.youtube_service is not shared.youtube_service
+    assert job.spotify_service is not shared.spotify_service
+    assert job.checkpoint_store is shared.checkpoint_store
+
+def test_fallback_request_never_swaps_the_client(monkeypatch):
+    service = YouTubeService()
+    service.config.NETWORK_RETRIES = 1
+    main, fallback = object(), object()
+    service.youtube = main
+    monkeypatch.setattr(service, '_create_fallback_service', lambda: fallback)
+
+    clients = []
+
+    def build(youtube):
+        clients.append(youtube)
+        return FakeRequest(ssl.SSLError('handshake') if youtube is main else {'items': []})
+
+    assert service._execute_with_fallback(build) == {'items': []}
+    assert clients == [main, fallback]
+    assert service.youtube is main
@@ -0,0 +1,54 @@
+import importlib
+import pytest
+import config.settings as settings
+
+@pytest.fixture
+def reload_settings(monkeypatch):
+    def reload(**environ):
+        for name in ('TUNING_PROFILE', 'FLASK_ENV', 'WORKER_THREADS', 'SSE_MAX_EVENTS', 'HEALTH_CHECK_TTL'):
+            monkeypatch.delenv(name, raising=False)
+        for name, value in environ.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(settings)
+
+    yield reload
+    monkeypatch.undo()
+    importlib.reload(settings)
+
+def test_unset_environment_tunes_for_production(reload_settings):
+    module = reload_settings()
+
+    assert module.Config.ENV == module.TUNING_PROFILE == 'production'
+    assert module.Config.WORKER_THREADS == 4
+    assert module.Config.validate_tuning()
+
+def test_flask_env_picks_the_preset(reload_settings):
+    module = reload_settings(FLASK_ENV='development')
+
+    assert module.Config.WORKER_THREADS == module.TUNING_PRESETS['development']['WORKER_THREADS']
+
+def test_flask_env_without_a_preset_is_reported(reload_settings):
+    module = reload_settings(FLASK_ENV='staging')
+
+    with pytest.raises(ValueError, match="unknown FLASK_ENV 'staging'"):
+        module.Config.validate_tuning()
+
+def test_unknown_tuning_profile_is_reported(reload_settings):
+    module = reload_settings(TUNING_PROFILE='staging')
+
+    with pytest.raises(ValueError, match="unknown TUNING_PROFILE 'staging'"):
+        module.Config.validate_tuning()
+
+def test_unparsable_knob_is_reported_by_validation(reload_settings):
+    module = reload_settings(WORKER_THREADS='1.5')
+
+    with pytest.raises(ValueError, match="WORKER_THREADS='1.5' is not a valid int"):
+        module.Config.validate_tuning()
+
+def test_service_knobs_are_validated_with_the_tuning(reload_settings):
+    module = reload_settings(SSE_MAX_EVENTS='many', HEALTH_CHECK_TTL='0')
+
+    with pytest.raises(ValueError) as error:
+        module.Config.validate_tuning()
+    assert "SSE_MAX_EVENTS='many' is not a valid int" in str(error.value)
+    assert 'HEALTH_CHECK_TTL=0' in str(error.value)
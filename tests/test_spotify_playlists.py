@@ -0,0 +1,60 @@
+import pytest
+from services.spotify_service import SpotifyService
+
+def playlist(playlist_id, name, owner_id):
+    return {'id': playlist_id, 'name': name, 'tracks': {'total': 0}, 'public': False, 'owner': {'id': owner_id},
+            'external_urls': {'spotify': f"https://open.spotify.com/playlist/{playlist_id}"}}
+
+class FakeSpotipy:
+    def __init__(self, playlists=(), snapshots=(), items=()):
+        self.playlists = list(playlists)
+        self.snapshots = list(snapshots)
+        self.items = list(items)
+        self.item_requests = 0
+
+    def user_playlists(self, user_id, limit=50, offset=0):
+        return {'items': self.playlists[offset:offset + limit], 'total': len(self.playlists)}
+
+    def playlist(self, playlist_id, fields=None):
+        return {'snapshot_id': self.snapshots.pop(0)}
+
+    def playlist_items(self, playlist_id, fields=None, limit=100, offset=0, additional_types=None):
+        self.item_requests += 1
+        page = [{'track': {'id': track_id}} for track_id in self.items[offset:offset + limit]]
+        return {'items': page, 'total': len(self.items)}
+
+def make_service(sp):
+    service = SpotifyService()
+    service.sp = sp
+    return service
+
+def test_followed_playlist_with_the_same_name_is_not_picked():
+    service = make_service(FakeSpotipy(playlists=[
+        playlist('followed', 'Road Trip', 'someone_else'),
+        playlist('own', 'Road Trip', 'alice'),
+    ]))
+
+    assert service.find_user_playlist('alice', 'road trip')['id'] == 'own'
+    assert service.find_user_playlist('bob', 'Road Trip') is None
+
+def test_unchanged_snapshot_is_served_from_cache():
+    sp = FakeSpotipy(snapshots=['s1', 's1', 's1'], items=['t1', 't2'])
+    service = make_service(sp)
+
+    assert service.get_playlist_track_ids('pl') == ['t1', 't2']
+    assert service.get_playlist_track_ids('pl') == ['t1', 't2']
+    assert sp.item_requests == 1
+
+def test_items_read_during_an_edit_are_not_cached():
+    sp = FakeSpotipy(snapshots=['s1', 's2', 's2', 's2'], items=['t1'])
+    service = make_service(sp)
+
+    assert service.get_playlist_track_ids('pl') == ['t1']
+    sp.items.append('t2')
+
+    assert service.get_playlist_track_ids('pl') == ['t1', 't2']
+    assert sp.item_requests == 2
+
+def test_track_ids_need_an_authenticated_client():
+    with pytest.raises(Exception, match='not authenticated'):
+        SpotifyService().get_playlist_track_ids('pl')
@@ -0,0 +1,146 @@
+import json
+import pytest
+from services.spotify_service import TOKEN_KEY_PREFIX, SpotifyService
+from services.task_queue import LEASES_KEY, LEGACY_TASKS_KEY, TaskQueue
+
+fakeredis = pytest.importorskip('fakeredis')
+
+@pytest.fixture
+def queue(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr('redis.Redis.from_url',
+                        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    return TaskQueue('redis://fake', lease_seconds=30, max_attempts=2)
+
+def start_job(queue, job_id='job1', user_id='user1'):
+    queue.save_job(job_id, user_id=user_id, status='running')
+    queue.enqueue(job_id, 'search', 'search:0', offset=0)
+
+def expire_leases(queue):
+    for lease_id in queue.redis.zrange(LEASES_KEY, 0, -1):
+        queue.redis.zadd(LEASES_KEY, {lease_id: 0})
+
+def test_released_task_is_not_redelivered(queue):
+    start_job(queue)
+
+    task = queue.dequeue(timeout=0)
+    assert task['attempt'] == 0
+    queue.release(task)
+    expire_leases(queue)
+
+    assert queue.reclaim() == 0
+    assert queue.dequeue(timeout=0) is None
+
+def test_task_of_a_dead_worker_is_redelivered_then_fails_its_job(queue):
+    start_job(queue)
+
+    queue.dequeue(timeout=0)
+    expire_leases(queue)
+    task = queue.dequeue(timeout=0)
+    assert task['key'] == 'search:0'
+    assert task['attempt'] == 1
+
+    expire_leases(queue)
+    assert queue.dequeue(timeout=0) is None
+    assert queue.get_job('job1')['status'] == 'failed'
+
+def test_renewed_lease_is_kept(queue):
+    start_job(queue)
+
+    task = queue.dequeue(timeout=0)
+    expire_leases(queue)
+    assert queue.renew(task)
+
+    assert queue.reclaim() == 0
+    assert queue.dequeue(timeout=0) is None
+
+def test_stale_delivery_cannot_release_the_redelivered_lease(queue):
+    start_job(queue)
+
+    stale = queue.dequeue(timeout=0)
+    expire_leases(queue)
+    current = queue.dequeue(timeout=0)
+    queue.release(stale)
+
+    assert not queue.renew(stale)
+    assert queue.renew(current)
+
+def test_committed_part_counts_once(queue):
+    queue.save_job('job1', user_id='user1')
+
+    assert queue.commit_part('job1', 'tracks', 0, ['t1', None], matched=1, processed=2) == {'matched': 1, 'processed': 2}
+    assert queue.commit_part('job1', 'tracks', 0, ['t1', None], matched=1, processed=2) is None
+    assert queue.get_job('job1')['matched'] == 1
+    assert queue.get_parts('job1', 'tracks') == [['t1', None]]
+
+def test_tokens_are_cached_per_user(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr('redis.Redis.from_url', lambda url, **kwargs: fakeredis.FakeRedis(server=server))
+    service = SpotifyService()
+    service.config.REDIS_URL = 'redis://fake'
+
+    service.get_cache_handler('alice').save_token_to_cache({'access_token': 'a'})
+    service.get_cache_handler('bob').save_token_to_cache({'access_token': 'b'})
+
+    assert service.get_cache_handler('alice').get_cached_token() == {'access_token': 'a'}
+    assert service.get_cache_handler('bob').get_cached_token() == {'access_token': 'b'}
+    assert service.get_cache_handler(None).get_cached_token() is None
+    assert fakeredis.FakeRedis(server=server).exists(f"{TOKEN_KEY_PREFIX}alice")
+
+def drain(queue):
+    order = []
+    while True:
+        task = queue.dequeue(timeout=0)
+        if not task:
+            return order
+        order.append((task['user_id'], task['key']))
+        queue.release(task)
+
+def test_users_take_turns_by_cost(queue):
+    queue.quantum = 10
+    queue.save_job('big', user_id='alice')
+    queue.save_job('small', user_id='bob')
+    for offset in range(0, 100, 10):
+        queue.enqueue('big', 'search', f"search:{offset}", cost=10, offset=offset)
+    queue.enqueue('small', 'search', 'search:0', cost=10, offset=0)
+    queue.enqueue('small', 'search', 'search:10', cost=10, offset=10)
+
+    order = drain(queue)
+
+    assert len(order) == 12
+    # Bob's two chunks run within the first rounds instead of after all of Alice's
+    assert [position for position, (user, key) in enumerate(order) if user == 'bob'] == [1, 3]
+
+def test_in_flight_cap_holds_back_a_user(queue):
+    queue.max_running = 1
+    queue.save_job('job1', user_id='alice')
+    queue.enqueue('job1', 'search', 'search:0')
+    queue.enqueue('job1', 'search', 'search:1')
+
+    first = queue.dequeue(timeout=0)
+    assert queue.dequeue(timeout=0) is None
+
+    queue.release(first)
+    assert queue.dequeue(timeout=0)['key'] == 'search:1'
+
+def test_slot_of_a_dead_worker_frees_itself_when_its_lease_runs_out(queue):
+    queue.max_running = 1
+    queue.save_job('job1', user_id='alice')
+    queue.enqueue('job1', 'search', 'search:0')
+    queue.enqueue('job1', 'search', 'search:1')
+    queue.dequeue(timeout=0)
+    queue.redis.zadd('transfer:user:alice:running', {'job1:search:0': 0})
+
+    # The expired slot no longer counts, even before its lease is reclaimed
+    assert queue._schedule()['key'] == 'search:1'
+
+def test_tasks_on_the_legacy_queue_are_adopted(queue):
+    queue.save_job('job1', user_id='alice')
+    legacy = {'job_id': 'job1', 'type': 'search', 'key': 'search:0', 'payload': {'offset': 0, 'videos': [{}, {}]}}
+    queue.redis.set('transfer:job1:task:search:0', 'queued')
+    queue.redis.rpush(LEGACY_TASKS_KEY, json.dumps(legacy))
+
+    assert queue.adopt_legacy_tasks() == 1
+    task = queue.dequeue(timeout=0)
+    assert (task['user_id'], task['key'], task['cost']) == ('alice', 'search:0', 2)
+    assert not queue.redis.exists(LEGACY_TASKS_KEY)
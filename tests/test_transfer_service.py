@@ -0,0 +1,52 @@
+from services.result_store import MemoryResultStore
+from services.transfer_service import TransferService
+from tests.fakes import FakeSpotifyService, FakeYouTubeService, playlist_item
+
+VIDEOS = [
+    playlist_item('a', 'Song A'),
+    playlist_item('b', 'Song B'),
+    playlist_item('a', 'Song A'),
+    playlist_item('c', 'Song C'),
+]
+TRACKS = {'Song A': 'tA', 'Song B': 'tB', 'Song C': 'tC'}
+
+def make_transfer(drop_duplicate_tracks):
+    spotify = FakeSpotifyService(TRACKS)
+    transfer = TransferService(FakeYouTubeService(VIDEOS), spotify, MemoryResultStore(),
+                               drop_duplicate_tracks=drop_duplicate_tracks)
+    return transfer, spotify
+
+def test_duplicates_kept_are_uploaded_in_playlist_order():
+    transfer, spotify = make_transfer(drop_duplicate_tracks=False)
+
+    summary = transfer.run('https://www.youtube.com/playlist?list=PL1', 'user1')
+
+    assert spotify.uploads == ['tA', 'tB', 'tA', 'tC']
+    assert spotify.searched == ['Song A', 'Song B', 'Song C']
+    assert summary['successful_count'] == 4
+    assert summary['duplicates_removed'] == 0
+
+def test_dropped_duplicates_keep_first_appearance_order():
+    transfer, spotify = make_transfer(drop_duplicate_tracks=True)
+
+    summary = transfer.run('https://www.youtube.com/playlist?list=PL1', 'user1')
+
+    assert spotify.uploads == ['tA', 'tB', 'tC']
+    assert summary['duplicates_removed'] == 1
+
+def test_only_confident_matches_teach_channel_artists():
+    videos = [playlist_item('a', 'Song A', 'Sure'), playlist_item('b', 'Song B', 'Unsure')]
+    spotify = FakeSpotifyService(TRACKS)
+    match_track = spotify.match_track
+
+    def low_confidence_for_b(query, **kwargs):
+        match = match_track(query, **kwargs)
+        return dict(match, confidence=0.1) if query == 'Song B' else match
+
+    spotify.match_track = low_confidence_for_b
+    transfer = TransferService(FakeYouTubeService(videos), spotify, MemoryResultStore())
+    transfer.min_confidence = 0.3
+
+    transfer.run('https://www.youtube.com/playlist?list=PL1', 'user1')
+
+    assert spotify.channel_artists.recorded == ['UCSure']
@@ -0,0 +1,73 @@
+import threading
+import services.transfer_tasks as transfer_tasks_module
+from services.result_store import MemoryResultStore
+from services.transfer_service import TransferService
+from services.transfer_tasks import TransferTasks
+from tests.fakes import FakeSpotifyService, FakeYouTubeService
+
+class FlakyQueue:
+    """Hands out `outcomes` in turn (exceptions are raised), then stops the worker."""
+
+    lease_seconds = 30
+
+    def __init__(self, outcomes, stop_event, fail_release=False):
+        self.outcomes = list(outcomes)
+        self.stop_event = stop_event
+        self.fail_release = fail_release
+        self.released = []
+
+    def dequeue(self, timeout=0):
+        if not self.outcomes:
+            self.stop_event.set()
+            return None
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def renew(self, task):
+        return True
+
+    def release(self, task):
+        self.released.append(task['key'])
+        if self.fail_release:
+            raise ConnectionError('redis went away')
+
+def make_tasks(queue):
+    transfer = TransferService(FakeYouTubeService([]), FakeSpotifyService({}), MemoryResultStore())
+    return TransferTasks(queue, transfer)
+
+def test_worker_keeps_going_after_queue_and_task_errors(monkeypatch, caplog):
+    monkeypatch.setattr(transfer_tasks_module, 'MAX_QUEUE_BACKOFF_SECONDS', 0)
+    stop_event = threading.Event()
+    tasks = [{'key': 'search:0', 'job_id': 'j1'}, {'key': 'search:1', 'job_id': 'j1'}]
+    queue = FlakyQueue([ConnectionError('redis went away'), tasks[0], tasks[1]], stop_event)
+    worker = make_tasks(queue)
+    handled = []
+
+    def handle(task):
+        handled.append(task['key'])
+        if task['key'] == 'search:0':
+            raise RuntimeError('boom')
+
+    monkeypatch.setattr(worker, 'handle', handle)
+    worker.work(stop_event)
+
+    assert handled == queue.released == ['search:0', 'search:1']
+    assert 'boom' in caplog.text
+    assert 'redis went away' in caplog.text
+
+def test_failed_release_does_not_hide_the_task_error(monkeypatch, caplog):
+    stop_event = threading.Event()
+    queue = FlakyQueue([{'key': 'search:0', 'job_id': 'j1'}], stop_event, fail_release=True)
+    worker = make_tasks(queue)
+
+    def handle(task):
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(worker, 'handle', handle)
+    worker.work(stop_event)
+
+    assert queue.released == ['search:0']
+    assert 'boom' in caplog.text
+    assert 'Could not release task search:0' in caplog.text
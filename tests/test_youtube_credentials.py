@@ -0,0 +1,20 @@
+from google.oauth2.credentials import Credentials
+from services.youtube_service import YouTubeService
+
+def make_credentials(token):
+    return Credentials(token, refresh_token='refresh', client_id='client', client_secret='secret',
+                       token_uri='https://oauth2.googleapis.com/token')
+
+def test_credentials_are_kept_per_user(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = YouTubeService()
+    service.config.REDIS_URL = None
+
+    service.save_credentials('alice', make_credentials('a'))
+    service.save_credentials('../bob', make_credentials('b'))
+
+    assert service.load_credentials('alice').token == 'a'
+    assert service.load_credentials('../bob').token == 'b'
+    assert service.load_credentials('carol') is None
+    assert service.load_credentials(None) is None
+    assert all(path.parent == tmp_path for path in tmp_path.iterdir())
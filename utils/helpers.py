@@ -1,24 +1,14 @@
 import re
 import logging
-from typing import List, Dict, Any
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+from utils.logging_setup import PER_ITEM
 
 logger = logging.getLogger(__name__)
 
-def clean_title(title: str) -> str:
-    """
-    Clean up video/song titles for better matching.
-    
-    Args:
-        title (str): Original title
-        
-    Returns:
-        str: Cleaned title
-    """
-    if not title:
-        return ""
-    
-    # Remove common patterns
-    patterns_to_remove = [
+# Patterns are compiled once at import time (and so shared by preforked workers)
+TITLE_NOISE_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
         r'\(.*Official.*\)',  # Remove official tags
         r'\(.*Music.*Video.*\)',  # Remove music video tags
         r'\(.*Audio.*\)',  # Remove audio tags
@@ -32,23 +22,84 @@ def clean_title(title: str) -> str:
         r'ft\..*',  # Remove featuring artists
         r'featuring.*',  # Remove featuring artists
     ]
+]
+
+# Common patterns for artist - song format
+TITLE_SEPARATOR_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r'^(.+?)\s*-\s*(.+)$',  # Artist - Song
+        r'^(.+?)\s*:\s*(.+)$',  # Artist : Song
+        r'^(.+?)\s*by\s*(.+)$',  # Song by Artist
+    ]
+]
+
+CHANNEL_SUFFIX_PATTERNS = [
+    re.compile(pattern, re.IGNORECASE) for pattern in [
+        r'\s*-\s*Topic$',  # YouTube Music auto-generated channels
+        r'\s*VEVO$',  # ArtistVEVO / Artist VEVO
+        r'\s*Official(\s+(Channel|YouTube Channel))?$',  # Artist Official Channel
+    ]
+]
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+# open.spotify.com/playlist/<id> (optionally under /intl-xx/) or spotify:playlist:<id>
+SPOTIFY_PLAYLIST_PATTERN = re.compile(r'(?:open\.spotify\.com/(?:intl-[\w-]+/)?playlist/|spotify:playlist:)([A-Za-z0-9]+)')
+
+# Common words that don't help with matching
+STOP_WORDS = frozenset(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+
+def clean_title(title: str) -> str:
+    """
+    Clean up video/song titles for better matching.
     
+    Args:
+        title (str): Original title
+        
+    Returns:
+        str: Cleaned title
+    """
+    if not title:
+        return ""
+    
+    # Remove common patterns
     cleaned = title
-    for pattern in patterns_to_remove:
-        cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
+    for pattern in TITLE_NOISE_PATTERNS:
+        cleaned = pattern.sub('', cleaned)
     
     # Remove extra whitespace and clean up
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    cleaned = WHITESPACE_PATTERN.sub(' ', cleaned).strip()
     
     # Remove common words that don't help with matching
-    words_to_remove = ['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by']
     words = cleaned.split()
-    filtered_words = [word for word in words if word.lower() not in words_to_remove or len(words) <= 3]
+    filtered_words = [word for word in words if word.lower() not in STOP_WORDS or len(words) <= 3]
     
     result = ' '.join(filtered_words)
-    logger.debug(f"Cleaned title: '{title}' -> '{result}'")
+    logger.debug("Cleaned title: '%s' -> '%s'", title, result, extra=PER_ITEM)
     return result
 
+def split_title_parts(title: str) -> tuple:
+    """
+    Split a video title on the first artist/song separator.
+    
+    Args:
+        title (str): Video title
+        
+    Returns:
+        tuple: (first_part, second_part) as they appear in the title,
+            or None if no separator is found
+    """
+    if not title:
+        return None
+    
+    for pattern in TITLE_SEPARATOR_PATTERNS:
+        match = pattern.match(title)
+        if match:
+            return match.groups()
+    
+    return None
+
 def extract_artist_from_title(title: str) -> tuple:
     """
     Try to extract artist name from video title.
@@ -59,27 +110,307 @@ def extract_artist_from_title(title: str) -> tuple:
     Returns:
         tuple: (cleaned_title, artist_name)
     """
-    # Common patterns for artist - song format
-    patterns = [
-        r'^(.+?)\s*-\s*(.+)$',  # Artist - Song
-        r'^(.+?)\s*:\s*(.+)$',  # Artist : Song
-        r'^(.+?)\s*by\s*(.+)$',  # Song by Artist
-    ]
-    
-    for pattern in patterns:
-        match = re.match(pattern, title, re.IGNORECASE)
-        if match:
-            part1, part2 = match.groups()
-            
-            # Heuristic: shorter part is usually the artist
-            if len(part1) < len(part2):
-                return clean_title(part2), clean_title(part1)
-            else:
-                return clean_title(part1), clean_title(part2)
+    parts = split_title_parts(title)
+    if parts:
+        part1, part2 = parts
+        
+        # Heuristic: shorter part is usually the artist
+        if len(part1) < len(part2):
+            return clean_title(part2), clean_title(part1)
+        else:
+            return clean_title(part1), clean_title(part2)
     
     # If no pattern matches, return the title without artist
     return clean_title(title), None
 
+def strip_channel_suffix(channel_title: str) -> str:
+    """
+    Reduce a YouTube channel name to the artist name it stands for.
+    
+    Handles auto-generated and label-style channels such as "ArtistVEVO",
+    "Artist - Topic" and "Artist Official".
+    
+    Args:
+        channel_title (str): YouTube channel name
+        
+    Returns:
+        str: Artist name, or an empty string if nothing is left
+    """
+    if not channel_title:
+        return ""
+    
+    stripped = channel_title.strip()
+    for pattern in CHANNEL_SUFFIX_PATTERNS:
+        stripped = pattern.sub('', stripped)
+    
+    return WHITESPACE_PATTERN.sub(' ', stripped).strip()
+
+def normalize_artist_name(name: str) -> str:
+    """
+    Reduce an artist name to a comparison key, ignoring case and spacing.
+    
+    Args:
+        name (str): Artist name, e.g. "TaylorSwift" or "Taylor Swift"
+        
+    Returns:
+        str: The key, e.g. "taylorswift" (empty for an empty name)
+    """
+    return ''.join((name or '').lower().split())
+
+def parse_youtube_music_description(description: str) -> Dict[str, Any]:
+    """
+    Parse the structured description of an auto-generated "Artist - Topic" video.
+    
+    These descriptions follow a fixed layout: a "Provided to YouTube by" line,
+    a "Track · Artist · Artist" line, the album name and, for most releases,
+    an ISRC line.
+    
+    Args:
+        description (str): Video description
+        
+    Returns:
+        Dict[str, Any]: Keys 'track', 'artists', 'album' and 'isrc' (any of
+            which may be None), or None if the description is not in this format
+    """
+    if not description or 'Provided to YouTube by' not in description:
+        return None
+    
+    blocks = [block.strip() for block in re.split(r'\n\s*\n', description) if block.strip()]
+    
+    metadata = {'track': None, 'artists': [], 'album': None, 'isrc': None}
+    for i, block in enumerate(blocks):
+        if '\u00b7' in block and metadata['track'] is None:
+            # "Track · Artist · Artist" line, followed by the album block
+            names = [name.strip() for name in block.split('\u00b7') if name.strip()]
+            if names:
+                metadata['track'] = names[0]
+                metadata['artists'] = names[1:]
+            if i + 1 < len(blocks) and not blocks[i + 1].startswith(('\u2117', '\u00a9', 'Released on')):
+                metadata['album'] = blocks[i + 1].splitlines()[0].strip()
+    
+    isrc_match = re.search(r'ISRC:?\s*([A-Z]{2}-?[A-Z0-9]{3}-?\d{2}-?\d{5})', description, re.IGNORECASE)
+    if isrc_match:
+        metadata['isrc'] = isrc_match.group(1).replace('-', '').upper()
+    
+    if not metadata['track'] and not metadata['isrc']:
+        return None
+    
+    return metadata
+
+def extract_video_metadata(video: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the fields used for matching from a playlist item.
+    
+    Args:
+        video (Dict[str, Any]): YouTube playlistItem resource
+        
+    Returns:
+        Dict[str, Any]: Video ID, title, uploading channel and any
+            YouTube Music metadata ('music' is None when absent)
+    """
+    snippet = video.get('snippet', {})
+    return {
+        'video_id': video.get('contentDetails', {}).get('videoId') or snippet.get('resourceId', {}).get('videoId'),
+        'title': snippet.get('title', ''),
+        # channelTitle is the playlist owner; videoOwnerChannelTitle is the uploader
+        'channel_title': snippet.get('videoOwnerChannelTitle') or snippet.get('channelTitle', ''),
+        'channel_id': snippet.get('videoOwnerChannelId') or snippet.get('channelId'),
+        'music': parse_youtube_music_description(snippet.get('description', ''))
+    }
+
+def slim_video(video: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Strip a playlist item down to the fields extract_video_metadata() reads.
+    
+    Args:
+        video (Dict[str, Any]): YouTube playlistItem resource
+        
+    Returns:
+        Dict[str, Any]: Smaller playlistItem with the same metadata
+    """
+    snippet = video.get('snippet', {})
+    return {
+        'contentDetails': {'videoId': extract_video_metadata(video)['video_id']},
+        'snippet': {
+            field: snippet[field]
+            for field in ('title', 'description', 'channelTitle', 'videoOwnerChannelTitle',
+                          'channelId', 'videoOwnerChannelId')
+            if field in snippet
+        }
+    }
+
+def normalize_match_key(title: str, artist: str = None) -> tuple:
+    """
+    Build a key that is equal for uploads of the same song.
+    
+    The official video, lyric video and audio upload of a track differ only
+    in noise that clean_title() removes. The two fields are sorted so that
+    "Artist - Song" and "Song - Artist" titles produce the same key.
+    
+    Args:
+        title (str): Song title (or full video title)
+        artist (str): Artist name, if known
+        
+    Returns:
+        tuple: Normalized key, or None if the title is empty
+    """
+    fields = []
+    for value in (title, artist):
+        cleaned = NON_WORD_PATTERN.sub(' ', clean_title(value or '').lower())
+        fields.append(WHITESPACE_PATTERN.sub(' ', cleaned).strip())
+    
+    if not fields[0]:
+        return None
+    return tuple(sorted(fields))
+
+def video_match_key(metadata: Dict[str, Any]) -> tuple:
+    """
+    Get the duplicate-detection key of a playlist item.
+    
+    Args:
+        metadata (Dict[str, Any]): Output of extract_video_metadata()
+        
+    Returns:
+        tuple: Normalized (title, artist) key, or None if it has no title
+    """
+    music = metadata.get('music')
+    if music and music['track']:
+        return normalize_match_key(music['track'], ', '.join(music['artists']))
+    
+    parts = split_title_parts(metadata['title'])
+    if parts:
+        return normalize_match_key(*parts)
+    return normalize_match_key(metadata['title'], strip_channel_suffix(metadata['channel_title']))
+
+def group_duplicate_videos(videos: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Group playlist items that refer to the same song.
+    
+    Items are grouped by video ID and by normalized (title, artist) key, so
+    repeated entries and alternate uploads of one track end up together.
+    
+    Args:
+        videos (List[Dict[str, Any]]): YouTube playlistItem resources
+        
+    Returns:
+        List[List[int]]: Indexes into videos, one list per group, in
+            order of first appearance
+    """
+    item_keys = []
+    for video in videos:
+        metadata = extract_video_metadata(video)
+        item_keys.append([('id', metadata['video_id']), ('song', video_match_key(metadata))])
+    return _group_by_keys(item_keys)
+
+def group_duplicate_tracks(tracks: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Group Spotify playlist tracks that refer to the same song.
+    
+    Tracks are grouped by track ID, by ISRC and by normalized (name, artist)
+    key, so repeats and re-releases of one recording end up together.
+    
+    Args:
+        tracks (List[Dict[str, Any]]): Tracks from SpotifyService.get_playlist_tracks_page()
+        
+    Returns:
+        List[List[int]]: Indexes into tracks, one list per group, in
+            order of first appearance
+    """
+    item_keys = []
+    for track in tracks:
+        artist = track['artists'][0] if track['artists'] else None
+        item_keys.append([
+            ('id', track['id']),
+            ('isrc', track.get('isrc')),
+            ('song', normalize_match_key(track['name'], artist))
+        ])
+    return _group_by_keys(item_keys)
+
+def _group_by_keys(item_keys: List[List[tuple]]) -> List[List[int]]:
+    # Items that share any key with an earlier item join that item's group
+    groups = []
+    group_by_key = {}
+    
+    for index, keys in enumerate(item_keys):
+        keys = [key for key in keys if key[1]]
+        
+        group = next((group_by_key[key] for key in keys if key in group_by_key), None)
+        if group is None:
+            group = len(groups)
+            groups.append([])
+        
+        groups[group].append(index)
+        for key in keys:
+            group_by_key.setdefault(key, group)
+    
+    return groups
+
+def unique_track_ids(track_ids: List[str]) -> List[str]:
+    """
+    Drop repeated track IDs, keeping the first occurrence of each.
+    
+    Args:
+        track_ids (List[str]): Spotify track IDs in playlist order
+        
+    Returns:
+        List[str]: Track IDs without duplicates
+    """
+    return list(dict.fromkeys(track_ids))
+
+def diff_playlist_tracks(existing: List[Optional[str]], wanted: List[str],
+                         preserve_positions: bool = False) -> List[Tuple[Optional[int], List[str]]]:
+    """
+    Work out which wanted tracks a playlist is missing, and where they go.
+    
+    Tracks are matched as a multiset: a track wanted twice but present
+    once is added once more. With preserve_positions, each run of missing
+    tracks is inserted right after the wanted track before it, so a
+    playlist that holds a prefix or a subsequence of the wanted order ends
+    up in exactly that order; otherwise missing tracks are appended.
+    
+    Args:
+        existing (List[Optional[str]]): Track IDs in the playlist, in order
+            (None for items without an ID, such as local files)
+        wanted (List[str]): Track IDs the playlist should contain, in order
+        preserve_positions (bool): Insert missing tracks in place instead of appending
+        
+    Returns:
+        List[Tuple[Optional[int], List[str]]]: (insert position, or None to
+            append; track IDs) for each run of missing tracks, in upload order
+    """
+    positions = {}
+    for position, track_id in enumerate(existing):
+        if track_id:
+            positions.setdefault(track_id, deque()).append(position)
+    
+    runs = []
+    run = None
+    inserted = 0
+    anchor = -1  # Current position of the last wanted track already in place
+    for track_id in wanted:
+        if positions.get(track_id):
+            # Earlier inserts all went in before this track if the orders agree
+            anchor = positions[track_id].popleft() + inserted
+            run = None
+            continue
+        
+        if run is None:
+            run = (anchor + 1 if preserve_positions else None, [])
+            runs.append(run)
+        run[1].append(track_id)
+        inserted += 1
+        anchor += 1
+    
+    if not preserve_positions and runs:
+        # Appended tracks need no separate runs
+        return [(None, [track_id for _, track_ids in runs for track_id in track_ids])]
+    return runs
+
+# Confidence adjustments: artist named in the video title, and titles of very different length
+ARTIST_IN_TITLE_BONUS = 0.2
+LENGTH_MISMATCH_RATIO = 0.5
+LENGTH_MISMATCH_PENALTY = 0.1
+
 def calculate_match_confidence(youtube_title: str, spotify_title: str, spotify_artist: str = None) -> float:
     """
     Calculate confidence score for track matching.
@@ -116,13 +447,13 @@ def calculate_match_confidence(youtube_title: str, spotify_title: str, spotify_a
     if spotify_artist:
         artist_clean = spotify_artist.lower()
         if artist_clean in yt_clean:
-            artist_bonus = 0.2
+            artist_bonus = ARTIST_IN_TITLE_BONUS
     
     # Penalty for significant length difference
     length_penalty = 0.0
     length_ratio = min(len(yt_clean), len(sp_clean)) / max(len(yt_clean), len(sp_clean))
-    if length_ratio < 0.5:
-        length_penalty = 0.1
+    if length_ratio < LENGTH_MISMATCH_RATIO:
+        length_penalty = LENGTH_MISMATCH_PENALTY
     
     confidence = jaccard_score + artist_bonus - length_penalty
     return min(1.0, max(0.0, confidence))
@@ -177,12 +508,28 @@ def validate_youtube_url(url: str) -> bool:
     
     return any(re.search(pattern, url, re.IGNORECASE) for pattern in youtube_patterns)
 
-def generate_playlist_name(youtube_title: str = None) -> str:
+def validate_spotify_url(url: str) -> bool:
+    """
+    Validate Spotify playlist URL.
+    
+    Args:
+        url (str): URL or spotify:playlist: URI to validate
+        
+    Returns:
+        bool: True if valid Spotify playlist URL
+    """
+    if not url:
+        return False
+    
+    return bool(SPOTIFY_PLAYLIST_PATTERN.search(url))
+
+def generate_playlist_name(youtube_title: str = None, source: str = 'YouTube') -> str:
     """
-    Generate a Spotify playlist name based on YouTube playlist title.
+    Generate a playlist name based on the source playlist title.
     
     Args:
-        youtube_title (str): Original YouTube playlist title
+        youtube_title (str): Original playlist title
+        source (str): Service the playlist is converted from
         
     Returns:
         str: Generated playlist name
@@ -196,9 +543,9 @@ def generate_playlist_name(youtube_title: str = None) -> str:
         if len(cleaned) > 100:
             cleaned = cleaned[:97] + "..."
         
-        return f"{cleaned} (from YouTube)"
+        return f"{cleaned} (from {source})"
     
-    return "Converted from YouTube"
+    return f"Converted from {source}"
 
 def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     """
@@ -0,0 +1,130 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict
+from config.settings import Config
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Fields taken from the log context and written as top-level JSON keys
+CONTEXT_FIELDS = ('job_id', 'user_id', 'stage', 'task')
+
+# Pass as extra= on records logged once per playlist item, so they can be sampled
+PER_ITEM = {'per_item': True}
+
+_context = threading.local()
+_listener = None
+_configured = False
+
+def get_log_context() -> Dict[str, Any]:
+    """Get the log context fields of the current thread."""
+    return getattr(_context, 'fields', {})
+
+@contextmanager
+def log_context(**fields: Any):
+    """Add fields to every record logged on this thread inside the block."""
+    previous = get_log_context()
+    _context.fields = dict(previous, **fields)
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+def set_log_context(**fields: Any) -> None:
+    """Update fields of the current log context, e.g. the stage of a running job."""
+    _context.fields = dict(get_log_context(), **fields)
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps records with the log context of the thread that logged them.
+    
+    Per-item records below WARNING are sampled: only one in every
+    sample_every passes, so log volume stays bounded on big playlists.
+    """
+    
+    def __init__(self, sample_every: int = 1):
+        super().__init__()
+        self.sample_every = max(1, sample_every)
+        self._items = itertools.count()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'per_item', False) and record.levelno < logging.WARNING:
+            if next(self._items) % self.sample_every:
+                return False
+        for name, value in get_log_context().items():
+            if not hasattr(record, name):
+                setattr(record, name, value)
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for name in CONTEXT_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records never leave the process, so they need not be flattened first
+        return record
+
+def setup_logging() -> None:
+    """
+    Configure the root logger from LOG_FORMAT and LOG_LEVEL.
+    
+    Text mode is the plain synchronous format used so far. JSON mode adds
+    the log context and per-item sampling, and hands records to a queue
+    so formatting and writing happen on a background listener thread.
+    """
+    global _listener, _configured
+    if _configured:
+        return
+    _configured = True
+    
+    config = Config()
+    root = logging.getLogger()
+    root.setLevel(config.LOG_LEVEL)
+    stream_handler = logging.StreamHandler()
+    
+    if config.LOG_FORMAT != 'json':
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(stream_handler)
+        return
+    
+    stream_handler.setFormatter(JsonFormatter())
+    queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(ContextFilter(config.LOG_ITEM_SAMPLE_EVERY))
+    root.addHandler(queue_handler)
+    
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+    os.register_at_fork(after_in_child=lambda: _restart_listener(queue_handler))
+
+def _restart_listener(queue_handler: logging.handlers.QueueHandler) -> None:
+    # The listener thread does not survive a fork (gunicorn --preload); give
+    # the child a fresh queue and thread of its own
+    queue_handler.queue = queue.SimpleQueue()
+    _listener.queue = queue_handler.queue
+    _listener._thread = None
+    _listener.start()
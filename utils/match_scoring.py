@@ -0,0 +1,158 @@
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence, Tuple
+from utils.helpers import (
+    clean_title, ARTIST_IN_TITLE_BONUS, LENGTH_MISMATCH_RATIO, LENGTH_MISMATCH_PENALTY
+)
+
+# Titles a long-lived scorer keeps before limit_cache() starts over
+MAX_CACHED_TITLES = 20000
+
+class TitleTokens(NamedTuple):
+    """A title normalized once for scoring."""
+    text: str
+    token_ids: FrozenSet[int]
+
+class BatchScorer:
+    """
+    Scores many title pairs with the rules of calculate_match_confidence().
+    
+    Each distinct title is cleaned, lower-cased and split once per batch,
+    and its words are interned as integer IDs, so scoring a pair is one
+    small integer-set intersection plus arithmetic. Scores are identical
+    to calculate_match_confidence() for the same inputs.
+    
+    A scorer pays off when it is reused: each service keeps one per job,
+    so a video title scored against several search results, or a
+    catalogue track scored against many videos, is tokenized once.
+    """
+    
+    def __init__(self):
+        self._token_ids: Dict[str, int] = {}
+        self._youtube: Dict[str, TitleTokens] = {}
+        self._spotify: Dict[str, TitleTokens] = {}
+    
+    def youtube_title(self, title: str) -> TitleTokens:
+        """Tokenize a YouTube title (cleaned like calculate_match_confidence() does)."""
+        tokens = self._youtube.get(title)
+        if tokens is None:
+            tokens = self._tokenize(clean_title(title).lower() if title else '')
+            self._youtube[title] = tokens
+        return tokens
+    
+    def spotify_title(self, title: str) -> TitleTokens:
+        """Tokenize a Spotify track title."""
+        tokens = self._spotify.get(title)
+        if tokens is None:
+            tokens = self._tokenize(title.lower() if title else '')
+            self._spotify[title] = tokens
+        return tokens
+    
+    def score(self, youtube: TitleTokens, spotify: TitleTokens, artist: Optional[str] = None) -> float:
+        """
+        Score one pair of tokenized titles.
+        
+        Args:
+            youtube (TitleTokens): From youtube_title()
+            spotify (TitleTokens): From spotify_title()
+            artist (str): Spotify artist name
+            
+        Returns:
+            float: Confidence score (0.0 to 1.0)
+        """
+        if not youtube.token_ids or not spotify.token_ids:
+            return 0.0
+        
+        intersection = len(youtube.token_ids & spotify.token_ids)
+        union = len(youtube.token_ids) + len(spotify.token_ids) - intersection
+        confidence = intersection / union
+        
+        if artist and artist.lower() in youtube.text:
+            confidence += ARTIST_IN_TITLE_BONUS
+        
+        length_ratio = min(len(youtube.text), len(spotify.text)) / max(len(youtube.text), len(spotify.text))
+        if length_ratio < LENGTH_MISMATCH_RATIO:
+            confidence -= LENGTH_MISMATCH_PENALTY
+        
+        return min(1.0, max(0.0, confidence))
+    
+    def score_pair(self, youtube_title: str, spotify_title: str, artist: Optional[str] = None) -> float:
+        """
+        Score one YouTube title against one Spotify track, like calculate_match_confidence().
+        
+        Args:
+            youtube_title (str): YouTube video title (or a query taken from it)
+            spotify_title (str): Spotify track title
+            artist (str): Spotify artist name
+            
+        Returns:
+            float: Confidence score (0.0 to 1.0)
+        """
+        return self.score(self.youtube_title(youtube_title), self.spotify_title(spotify_title), artist)
+    
+    def limit_cache(self, max_titles: int = MAX_CACHED_TITLES) -> None:
+        """
+        Forget every cached title once more than max_titles are held.
+        
+        Tokens from before the reset can't be scored against tokens from
+        after it, so call this between pieces of work, never while holding
+        TitleTokens.
+        """
+        if len(self._youtube) + len(self._spotify) > max_titles:
+            self._token_ids.clear()
+            self._youtube.clear()
+            self._spotify.clear()
+    
+    def score_matrix(self, youtube_titles: Sequence[str],
+                     candidates: Sequence[Sequence[Tuple[str, Optional[str]]]]) -> List[List[float]]:
+        """
+        Score every video against its own list of Spotify candidates.
+        
+        Args:
+            youtube_titles (Sequence[str]): One title per video
+            candidates (Sequence[Sequence[Tuple[str, Optional[str]]]]):
+                (track title, artist) pairs for each video, in the same order
+                
+        Returns:
+            List[List[float]]: Scores shaped like candidates
+        """
+        scores = []
+        for youtube_title, video_candidates in zip(youtube_titles, candidates):
+            youtube = self.youtube_title(youtube_title)
+            scores.append([self.score(youtube, self.spotify_title(title), artist)
+                           for title, artist in video_candidates])
+        return scores
+    
+    def score_videos(self, youtube_titles: Sequence[str], spotify_title: str,
+                     artist: Optional[str] = None) -> List[float]:
+        """
+        Score several YouTube videos against one Spotify track.
+        
+        Args:
+            youtube_titles (Sequence[str]): Video titles
+            spotify_title (str): Spotify track title
+            artist (str): Spotify artist name
+            
+        Returns:
+            List[float]: One score per video, in order
+        """
+        spotify = self.spotify_title(spotify_title)
+        return [self.score(self.youtube_title(title), spotify, artist) for title in youtube_titles]
+    
+    def _tokenize(self, text: str) -> TitleTokens:
+        token_ids = self._token_ids
+        return TitleTokens(text, frozenset(token_ids.setdefault(word, len(token_ids)) for word in text.split()))
+
+def batch_match_confidence(youtube_titles: Sequence[str],
+                           candidates: Sequence[Sequence[Tuple[str, Optional[str]]]]) -> List[List[float]]:
+    """
+    Score match candidates for many videos at once.
+    
+    Args:
+        youtube_titles (Sequence[str]): One title per video
+        candidates (Sequence[Sequence[Tuple[str, Optional[str]]]]):
+            (track title, artist) pairs for each video, in the same order
+            
+    Returns:
+        List[List[float]]: calculate_match_confidence() of every pair,
+            shaped like candidates
+    """
+    return BatchScorer().score_matrix(youtube_titles, candidates)
@@ -0,0 +1,172 @@
+import logging
+import threading
+from typing import List, Optional, NamedTuple
+from utils.helpers import clean_title, split_title_parts, strip_channel_suffix
+
+logger = logging.getLogger(__name__)
+
+# Strategies in their default order, used until enough hits have been observed
+STRATEGIES = [
+    'explicit_artist',  # track:<title> artist:<artist> with a caller-supplied artist
+    'channel_match',  # title split where one side matches the channel name
+    'split_fields',  # track:<longer part> artist:<shorter part>
+    'split_swapped',  # same split with the order heuristic reversed
+    'channel_fields',  # track:<title> artist:<stripped channel name>
+    'free_text',  # plain "<song> <artist>" query without field filters
+    'title_only',  # cleaned title alone
+]
+
+# Unfiltered strategies almost always return something, so their hit rate says
+# little about match quality; they are only ever tried after the filtered ones
+FALLBACK_STRATEGIES = {'free_text', 'title_only'}
+
+class SearchQuery(NamedTuple):
+    """A single candidate query produced by the planner."""
+    strategy: str
+    query: str
+
+class QueryPlanner:
+    """
+    Build ordered Spotify search queries for a YouTube video.
+
+    The planner keeps per-strategy hit counts and orders the field-filtered
+    candidates by their observed hit rate, so the strategy that usually
+    succeeds is tried first. Unfiltered fallbacks always come last.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._attempts = {strategy: 0 for strategy in STRATEGIES}
+        self._hits = {strategy: 0 for strategy in STRATEGIES}
+        self._planned = 0
+        self._searches = 0
+
+    def plan(self, title: str, channel_title: str = None, artist: str = None,
+             max_queries: int = None) -> List[SearchQuery]:
+        """
+        Build the candidate queries for a video, best strategy first.
+
+        Args:
+            title (str): Video or song title
+            channel_title (str): Channel that uploaded the video
+            artist (str): Artist name, if already known
+            max_queries (int): Keep only this many of the best-ranked
+                candidates (all by default), which bounds the searches a
+                video that is not on Spotify can cost
+
+        Returns:
+            List[SearchQuery]: De-duplicated candidate queries
+        """
+        candidates = {}
+
+        def add(strategy, query):
+            query = query.strip()
+            if query and query not in candidates.values():
+                candidates.setdefault(strategy, query)
+
+        full_title = clean_title(title)
+        channel_artist = strip_channel_suffix(channel_title) if channel_title else ""
+        parts = split_title_parts(title)
+
+        if artist:
+            add('explicit_artist', _fields(full_title, clean_title(artist) or artist))
+
+        song = full_title
+        song_artist = artist or channel_artist
+        if parts:
+            part1, part2 = [clean_title(part) for part in parts]
+            if part1 and part2:
+                # Heuristic from extract_artist_from_title: shorter part is usually the artist
+                longer, shorter = (part2, part1) if len(part1) < len(part2) else (part1, part2)
+
+                if channel_artist and _same_name(channel_artist, part1):
+                    add('channel_match', _fields(part2, channel_artist))
+                    song = part2
+                elif channel_artist and _same_name(channel_artist, part2):
+                    add('channel_match', _fields(part1, channel_artist))
+                    song = part1
+                else:
+                    song, song_artist = longer, shorter
+
+                add('split_fields', _fields(longer, shorter))
+                add('split_swapped', _fields(shorter, longer))
+
+        if channel_artist:
+            add('channel_fields', _fields(song, channel_artist))
+
+        if song_artist:
+            add('free_text', f"{song} {song_artist}")
+        add('title_only', full_title)
+
+        ranked = self._rank(list(candidates))[:max_queries]
+        return [SearchQuery(strategy, candidates[strategy]) for strategy in ranked]
+
+    def record(self, strategy: str, hit: bool):
+        """
+        Record the outcome of one search issued for a strategy.
+
+        Args:
+            strategy (str): Strategy name from SearchQuery.strategy
+            hit (bool): Whether the search returned a track that is
+                confident enough to be used
+        """
+        with self._lock:
+            self._attempts[strategy] = self._attempts.get(strategy, 0) + 1
+            self._searches += 1
+            if hit:
+                self._hits[strategy] = self._hits.get(strategy, 0) + 1
+
+    def record_plan(self):
+        """Count one planned item, for the searches-per-item statistic."""
+        with self._lock:
+            self._planned += 1
+
+    def get_stats(self) -> dict:
+        """
+        Get planner statistics.
+
+        Returns:
+            dict: Per-strategy hit rates and average searches per item
+        """
+        with self._lock:
+            return {
+                'items': self._planned,
+                'searches': self._searches,
+                'searches_per_item': self._searches / self._planned if self._planned else 0.0,
+                'strategies': {
+                    strategy: {
+                        'attempts': self._attempts[strategy],
+                        'hits': self._hits[strategy],
+                        'hit_rate': self._hit_rate(strategy)
+                    }
+                    for strategy in self._attempts
+                }
+            }
+
+    def _hit_rate(self, strategy: str) -> float:
+        # Laplace smoothing keeps untried strategies in the running
+        return (self._hits.get(strategy, 0) + 1) / (self._attempts.get(strategy, 0) + 2)
+
+    def _rank(self, strategies: List[str]) -> List[str]:
+        with self._lock:
+            return sorted(
+                strategies,
+                key=lambda strategy: (
+                    strategy in FALLBACK_STRATEGIES,
+                    -self._hit_rate(strategy),
+                    STRATEGIES.index(strategy)
+                )
+            )
+
+def _fields(track: str, artist: Optional[str]) -> str:
+    """Build a field-filtered Spotify query."""
+    if not track:
+        return ""
+    if not artist:
+        return f"track:{track}"
+    return f"track:{track} artist:{artist}"
+
+def _same_name(a: str, b: str) -> bool:
+    """Loose comparison of two artist names."""
+    a, b = a.lower().replace(' ', ''), b.lower().replace(' ', '')
+    return bool(a) and bool(b) and (a == b or a in b or b in a)
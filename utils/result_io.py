@@ -0,0 +1,230 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import re
+import zlib
+from typing import List, Dict, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Column order of exported conversion results; 'position' is the item's index in the source playlist
+EXPORT_FIELDS = [
+    'status', 'position', 'video_id', 'title', 'artist',
+    'track_id', 'track_name', 'track_artist',
+    'confidence', 'method', 'reason'
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'columnar': ('application/gzip', 'columns.json.gz'),
+}
+
+COLUMNAR_VERSION = 1
+
+# Largest columnar export accepted once decompressed; the compressed upload
+# itself is capped by MAX_CONTENT_LENGTH, but gzip can expand over 1000x
+MAX_DECOMPRESSED_BYTES = 64 * 1024 * 1024
+# zlib window bits that accept the gzip header and trailer
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+SPOTIFY_TRACK_ID_PATTERN = re.compile(r'^[0-9A-Za-z]{22}$')
+
+def iter_result_rows(result_store, job_id: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over every stored result row of a conversion, in playlist order.
+    
+    Rows are stored in the order they were searched (by group, or by
+    chunk as queue workers finish them), so they are read page by page
+    and sorted by position. Rows without a position keep their stored
+    order, after the others.
+    
+    Args:
+        result_store: MemoryResultStore or RedisResultStore
+        job_id (str): Conversion job ID
+        page_size (int): Rows fetched from the store per call
+    
+    Yields:
+        Dict[str, Any]: Result rows with a 'status' field added
+    """
+    rows = []
+    for kind in ('successful', 'failed'):
+        page = 1
+        while True:
+            result = result_store.get_page(job_id, kind, page, page_size)
+            for row in result['items']:
+                rows.append(dict(row, status='matched' if kind == 'successful' else 'not_found'))
+            if page >= result['pages']:
+                break
+            page += 1
+    yield from sorted(rows, key=_position_key)
+
+def export_csv(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Serialize result rows as CSV, one line at a time.
+    
+    Args:
+        rows (Iterable[Dict[str, Any]]): Result rows
+    
+    Yields:
+        str: CSV lines, header first
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+    
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    # Header only, for an empty result
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def export_jsonl(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """
+    Serialize result rows as JSON Lines.
+    
+    Args:
+        rows (Iterable[Dict[str, Any]]): Result rows
+    
+    Yields:
+        str: One JSON object per line
+    """
+    for row in rows:
+        yield json.dumps({field: row.get(field) for field in EXPORT_FIELDS}) + '\n'
+
+def export_columnar(rows: Iterable[Dict[str, Any]]) -> bytes:
+    """
+    Serialize result rows as gzip-compressed column arrays.
+    
+    Storing each field as one array keeps repeated values (status, method,
+    artist) next to each other, which compresses far better than row formats.
+    
+    Args:
+        rows (Iterable[Dict[str, Any]]): Result rows
+    
+    Returns:
+        bytes: Gzip-compressed JSON document
+    """
+    columns = {field: [] for field in EXPORT_FIELDS}
+    for row in rows:
+        for field in EXPORT_FIELDS:
+            columns[field].append(row.get(field))
+    
+    document = {'version': COLUMNAR_VERSION, 'fields': EXPORT_FIELDS, 'columns': columns}
+    return gzip.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+
+def load_results(data: bytes, max_size: int = MAX_DECOMPRESSED_BYTES) -> List[Dict[str, Any]]:
+    """
+    Parse an exported result file, detecting its format.
+    
+    Args:
+        data (bytes): Contents of a CSV, JSON Lines or columnar export
+        max_size (int): Largest decompressed size accepted for a columnar export
+    
+    Returns:
+        List[Dict[str, Any]]: Result rows
+    
+    Raises:
+        ValueError: If the data is not a recognized export, is malformed, or
+            has a track ID that is not a Spotify track ID
+    """
+    if data[:2] == b'\x1f\x8b':
+        rows = _load_columnar(_decompress(data, max_size))
+    else:
+        text = data.decode('utf-8-sig')
+        if text.lstrip().startswith('{'):
+            rows = _load_jsonl(text)
+        else:
+            reader = csv.DictReader(io.StringIO(text))
+            if not reader.fieldnames or 'track_id' not in reader.fieldnames:
+                raise ValueError("Unrecognized export format")
+            rows = [row for row in reader]
+    
+    for number, row in enumerate(rows, 1):
+        track_id = row.get('track_id')
+        if track_id and not (isinstance(track_id, str) and SPOTIFY_TRACK_ID_PATTERN.match(track_id)):
+            raise ValueError(f"Row {number} has an invalid Spotify track ID")
+        
+        # CSV has no types, and exports from before positions were stored have none
+        position = row.get('position')
+        if position in (None, ''):
+            row['position'] = None
+        elif isinstance(position, str) and position.isdigit():
+            row['position'] = int(position)
+        elif not (isinstance(position, int) and not isinstance(position, bool) and position >= 0):
+            raise ValueError(f"Row {number} has an invalid position")
+    return rows
+
+def _decompress(data: bytes, max_size: int) -> bytes:
+    """Gunzip data, refusing to produce more than max_size bytes."""
+    decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    try:
+        text = decompressor.decompress(data, max_size + 1)
+    except zlib.error as e:
+        raise ValueError(f"Invalid columnar export: {e}")
+    
+    if len(text) > max_size:
+        raise ValueError(f"Columnar export is larger than {max_size} bytes when decompressed")
+    if not decompressor.eof:
+        raise ValueError("Invalid columnar export: truncated gzip data")
+    return text
+
+def _load_columnar(text: bytes) -> List[Dict[str, Any]]:
+    try:
+        document = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"Invalid columnar export: {e}")
+    
+    fields = document.get('fields') if isinstance(document, dict) else None
+    columns = document.get('columns') if isinstance(document, dict) else None
+    if not isinstance(fields, list) or not all(isinstance(field, str) for field in fields) \
+            or not isinstance(columns, dict):
+        raise ValueError("Invalid columnar export: missing fields or columns")
+    
+    lengths = {len(columns[field]) if isinstance(columns.get(field), list) else None for field in fields}
+    if None in lengths or len(lengths) > 1:
+        raise ValueError("Invalid columnar export: every field needs a column of the same length")
+    
+    length = lengths.pop() if lengths else 0
+    return [{field: columns[field][i] for field in fields} for i in range(length)]
+
+def _load_jsonl(text: str) -> List[Dict[str, Any]]:
+    rows = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON Lines export: {e}")
+        if not isinstance(row, dict):
+            raise ValueError(f"Invalid JSON Lines export: line {number} is not an object")
+        rows.append(row)
+    return rows
+
+def is_matched(row: Dict[str, Any]) -> bool:
+    """Check whether an imported result row maps to a Spotify track."""
+    return bool(row.get('track_id')) and row.get('status', 'matched') == 'matched'
+
+def matched_track_ids(rows: Iterable[Dict[str, Any]]) -> List[str]:
+    """
+    Get the Spotify track IDs of matched rows, in playlist order.
+    
+    Args:
+        rows (Iterable[Dict[str, Any]]): Result rows, ordered by their
+            'position' where they have one
+    
+    Returns:
+        List[str]: Track IDs
+    """
+    return [row['track_id'] for row in sorted(rows, key=_position_key) if is_matched(row)]
+
+def _position_key(row: Dict[str, Any]):
+    # Positioned rows first, by position; a stable sort keeps the rest in order
+    position = row.get('position')
+    return (position is None, position or 0)
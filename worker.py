@@ -0,0 +1,64 @@
+"""
+Queue worker for distributed conversions (the `worker` process type).
+
+Runs WORKER_THREADS task loops against the Redis task queue. Start as many
+worker processes, on as many nodes, as the search load needs.
+"""
+import logging
+import signal
+import sys
+import threading
+from config.settings import Config
+from services.youtube_service import YouTubeService, load_discovery_document
+from services.spotify_service import SpotifyService
+from services.transfer_service import TransferService
+from services.result_store import create_result_store
+from services.task_queue import TaskQueue
+from services.transfer_tasks import TransferTasks
+from utils.logging_setup import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+def main():
+    config = Config()
+    if not config.REDIS_URL:
+        logger.error("REDIS_URL must be set to run a queue worker")
+        sys.exit(1)
+    
+    try:
+        Config.validate_tuning()
+    except ValueError as e:
+        logger.error("Configuration error: %s", e)
+        sys.exit(1)
+    
+    queue = TaskQueue(config.REDIS_URL, config.RESULT_TTL_SECONDS, config.SSE_MAX_EVENTS)
+    adopted = queue.adopt_legacy_tasks()
+    if adopted:
+        logger.info("Moved %s tasks from the old single queue onto their jobs' queues", adopted)
+    result_store = create_result_store()
+    load_discovery_document()
+    
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_event.set())
+    
+    # Each thread gets its own service clients; tasks are I/O bound
+    threads = []
+    for i in range(config.WORKER_THREADS):
+        transfer_service = TransferService(YouTubeService(), SpotifyService(), result_store)
+        tasks = TransferTasks(queue, transfer_service)
+        thread = threading.Thread(target=tasks.work, args=(stop_event,), name=f"task-worker-{i}")
+        thread.start()
+        threads.append(thread)
+    
+    logger.info("Queue worker started with %s threads", config.WORKER_THREADS)
+    
+    # Finish in-flight tasks on shutdown; queued ones are left for other workers
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    logger.info("Queue worker stopped")
+
+if __name__ == '__main__':
+    main()